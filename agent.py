@@ -1,5 +1,4 @@
 import os
-import google.generativeai as genai
 from datetime import date, datetime, timedelta
 from typing import Optional
 from system import HotelSystem
@@ -11,6 +10,8 @@ class HospitalityAI:
         self.api_key = api_key
         if self.api_key:
             try:
+                # Imported here so the CLI and workers don't pay for the Gemini SDK without a key
+                import google.generativeai as genai
                 genai.configure(api_key=self.api_key)
                 # Use gemini-1.5-flash (works with free Google AI Studio keys)
                 self.model = genai.GenerativeModel('gemini-1.5-flash')
@@ -0,0 +1,249 @@
+"""
+Room allocation optimizer. Guests book a room type in practice, so future
+reservations that aren't locked to a room can be repacked within their type
+to close the one- and two-night gaps that make longer stays unsellable.
+
+The packing is greedy interval partitioning (the optimal colouring of an
+interval graph) with a best-fit choice: each stay, in arrival order, goes to
+the room that became free most recently before it, so stays line up
+back-to-back and free nights gather into long blocks. Checked-in, arriving
+today and room-locked stays stay where they are and act as barriers.
+
+    python allocation.py                 # show the move plan
+    python allocation.py --apply
+"""
+import argparse
+import bisect
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+from models import Room, RoomType, RoomStatus, Reservation, ReservationStatus, RoomMove, PlannedMove, AllocationPlan, ChangeKind, DEFAULT_PROPERTY
+from ids import new_id, short_id
+from queries import ACTIVE_STATUSES, BOOKING_TRANSACTION
+from changefeed import change, log_changes
+
+# Gaps of this many nights or fewer between two stays count as fragmentation
+DEFAULT_SHORT_GAP_NIGHTS = 2
+
+_NEVER = 10 ** 9
+
+
+def assign_rooms(rooms: Sequence[str], fixed: Sequence[Tuple[str, int, int]],
+                 movable: Sequence[Tuple[str, str, int, int]], start: int) -> Optional[Dict[str, str]]:
+    """Best-fit interval partitioning of `movable` stays over `rooms`.
+
+    Days are ordinals. `fixed` is (room_id, check_in, check_out) for stays
+    that can't move; `movable` is (reservation_id, current_room_id, check_in,
+    check_out). Returns reservation_id -> room_id, or None when the greedy
+    pass can't place every stay around the fixed ones.
+    """
+    index = {room: i for i, room in enumerate(rooms)}
+    free_from = [start] * len(rooms)
+    barriers: List[List[int]] = [[] for _ in rooms]
+    events = []
+    for room, check_in, check_out in fixed:
+        i = index[room]
+        if check_in <= start:
+            free_from[i] = max(free_from[i], check_out)
+        else:
+            barriers[i].append(check_in)
+            # Fixed stays sort before movable ones arriving the same day
+            events.append((check_in, 0, 0, i, check_out))
+    for reservation_id, current, check_in, check_out in movable:
+        # Longer stays first on a shared arrival day; they are the hardest to fit
+        events.append((check_in, 1, check_in - check_out, reservation_id, (index.get(current, -1), check_out)))
+    for b in barriers:
+        b.sort()
+    events.sort()
+
+    next_barrier = [0] * len(rooms)
+    # (free_from, room index), kept sorted
+    order = sorted((f, i) for i, f in enumerate(free_from))
+    assignment = {}
+    for check_in, kind, _, key, value in events:
+        if kind == 0:
+            i, check_out = key, value
+            order.pop(bisect.bisect_left(order, (free_from[i], i)))
+            free_from[i] = max(free_from[i], check_out)
+            bisect.insort(order, (free_from[i], i))
+            next_barrier[i] += 1
+            continue
+
+        current, check_out = value
+        best = None
+        pos = bisect.bisect_right(order, (check_in, _NEVER)) - 1
+        while pos >= 0:
+            i = order[pos][1]
+            b = barriers[i]
+            if next_barrier[i] >= len(b) or b[next_barrier[i]] >= check_out:
+                best = pos
+                break
+            pos -= 1
+        if best is None:
+            return None
+        # Among equally good rooms, keep the guest where they are
+        if current >= 0 and current != order[best][1] and free_from[current] == order[best][0]:
+            b = barriers[current]
+            if next_barrier[current] >= len(b) or b[next_barrier[current]] >= check_out:
+                best = bisect.bisect_left(order, (free_from[current], current))
+        _, i = order.pop(best)
+        free_from[i] = check_out
+        bisect.insort(order, (check_out, i))
+        assignment[key] = rooms[i]
+    return assignment
+
+
+def count_short_gaps(stays: Sequence[Tuple[str, int, int]], short_gap_nights: int) -> int:
+    """Free gaps of 1..short_gap_nights nights between consecutive stays in the same room"""
+    by_room = defaultdict(list)
+    for room, check_in, check_out in stays:
+        by_room[room].append((check_in, check_out))
+    gaps = 0
+    for intervals in by_room.values():
+        intervals.sort()
+        for (_, end), (next_start, _) in zip(intervals, intervals[1:]):
+            if 0 < next_start - end <= short_gap_nights:
+                gaps += 1
+    return gaps
+
+
+class RoomAllocator:
+    """Plans and applies room reassignments for one property"""
+
+    def __init__(self, engine, property_id: str = DEFAULT_PROPERTY,
+                 short_gap_nights: int = DEFAULT_SHORT_GAP_NIGHTS):
+        self.engine = engine
+        self.property_id = property_id
+        self.short_gap_nights = short_gap_nights
+
+    def _load(self, session: Session, room_type: Optional[RoomType]):
+        rooms = select(Room.id, Room.type, Room.status).where(Room.property_id == self.property_id)
+        stays = (
+            select(Reservation.id, Reservation.room_id, Reservation.check_in, Reservation.check_out,
+                   Reservation.status, Reservation.room_locked)
+            .join(Room, Reservation.room_id == Room.id)
+            .where(
+                Reservation.property_id == self.property_id,
+                Reservation.status.in_(ACTIVE_STATUSES),
+                Reservation.check_out > date.today(),
+            )
+        )
+        if room_type:
+            rooms = rooms.where(Room.type == room_type)
+            stays = stays.where(Room.type == room_type)
+        return session.exec(rooms).all(), session.exec(stays).all()
+
+    def plan(self, room_type: Optional[RoomType] = None, session: Optional[Session] = None) -> AllocationPlan:
+        """Compute the move plan without changing anything"""
+        if session is None:
+            with Session(self.engine) as session:
+                return self.plan(room_type, session)
+
+        started = time.perf_counter()
+        today = date.today().toordinal()
+        rooms, stays = self._load(session, room_type)
+        plan = AllocationPlan(plan_id=new_id(), property_id=self.property_id, reservations=len(stays))
+
+        room_types = {room_id: r_type for room_id, r_type, _ in rooms}
+        out_of_order = {room_id for room_id, _, status in rooms if status == RoomStatus.MAINTENANCE}
+        rooms_by_type, blocked_by_type = defaultdict(list), defaultdict(list)
+        for room_id, r_type, _ in sorted(rooms):
+            rooms_by_type[r_type].append(room_id)
+            if room_id in out_of_order:
+                # Never a target; its own stays stay put
+                blocked_by_type[r_type].append((room_id, today, _NEVER))
+        fixed_by_type, movable_by_type = defaultdict(list), defaultdict(list)
+        dates = {}
+        for res_id, room_id, check_in, check_out, status, locked in stays:
+            r_type = room_types[room_id]
+            ci, co = check_in.toordinal(), check_out.toordinal()
+            dates[res_id] = (check_in, check_out)
+            # Only stays arriving after today that nobody pinned to a room can move
+            if status == ReservationStatus.CONFIRMED and ci > today and not locked and room_id not in out_of_order:
+                movable_by_type[r_type].append((res_id, room_id, ci, co))
+            else:
+                fixed_by_type[r_type].append((room_id, ci, co))
+
+        before, after = [], []
+        for r_type, rooms in rooms_by_type.items():
+            fixed, movable = fixed_by_type[r_type], movable_by_type[r_type]
+            before += fixed + [(room, ci, co) for _, room, ci, co in movable]
+            assignment = assign_rooms(rooms, fixed + blocked_by_type[r_type], movable, today) if movable else {}
+            if assignment is None:
+                plan.skipped_types.append(r_type)
+                assignment = {res_id: room for res_id, room, _, _ in movable}
+            after += fixed + [(assignment[res_id], ci, co) for res_id, _, ci, co in movable]
+            for res_id, current, _, _ in movable:
+                if assignment[res_id] != current:
+                    check_in, check_out = dates[res_id]
+                    plan.moves.append(PlannedMove(
+                        reservation_id=res_id, from_room_id=current, to_room_id=assignment[res_id],
+                        check_in=check_in, check_out=check_out,
+                    ))
+
+        plan.short_gaps_before = count_short_gaps(before, self.short_gap_nights)
+        plan.short_gaps_after = count_short_gaps(after, self.short_gap_nights)
+        plan.duration_ms = (time.perf_counter() - started) * 1000
+        return plan
+
+    def optimize(self, room_type: Optional[RoomType] = None) -> AllocationPlan:
+        """Plan and apply in one transaction, with the rooms locked against concurrent bookings"""
+        with Session(self.engine) as session:
+            rooms = select(Room.id).where(Room.property_id == self.property_id)
+            if room_type:
+                rooms = rooms.where(Room.type == room_type)
+            # Hold the rooms so a concurrent booking cannot land in a gap being filled
+            session.connection(execution_options=BOOKING_TRANSACTION)
+            session.exec(rooms.order_by(Room.id).with_for_update()).all()
+
+            plan = self.plan(room_type, session)
+            if not plan.moves or plan.short_gaps_after >= plan.short_gaps_before:
+                plan.moves = []
+                session.rollback()
+                return plan
+            applied_at = datetime.now()
+            session.execute(update(Reservation), [
+                {"id": move.reservation_id, "room_id": move.to_room_id} for move in plan.moves
+            ])
+            session.execute(insert(RoomMove), [
+                {"id": new_id(), "plan_id": plan.plan_id, "property_id": self.property_id,
+                 "applied_at": applied_at, **move.model_dump()}
+                for move in plan.moves
+            ])
+            log_changes(session, [
+                change(ChangeKind.ALLOCATION, self.property_id, move.reservation_id, room_type, move.check_in, move.check_out)
+                for move in plan.moves
+            ])
+            session.commit()
+            plan.applied = True
+            return plan
+
+
+def format_plan(plan: AllocationPlan) -> str:
+    line = (f"Allocation {plan.property_id}: {len(plan.moves)} moves over {plan.reservations} stays, "
+            f"short gaps {plan.short_gaps_before} -> {plan.short_gaps_after} "
+            f"({plan.duration_ms:.1f} ms{', applied' if plan.applied else ''})")
+    if plan.skipped_types:
+        line += f"; left unchanged: {', '.join(t.value for t in plan.skipped_types)}"
+    return line
+
+
+if __name__ == "__main__":
+    from system import HotelSystem
+
+    parser = argparse.ArgumentParser(description="Repack future reservations to reduce short gaps")
+    parser.add_argument("--room-type", type=RoomType)
+    parser.add_argument("--apply", action="store_true", help="Move the reservations (default: only show the plan)")
+    parser.add_argument("--property", default=DEFAULT_PROPERTY)
+    args = parser.parse_args()
+
+    system = HotelSystem(db_url=os.environ.get("DATABASE_URL"), property_id=args.property)
+    allocator = RoomAllocator(system.engine, system.property_id)
+    plan = allocator.optimize(args.room_type) if args.apply else allocator.plan(args.room_type)
+    print(format_plan(plan))
+    for move in plan.moves[:50]:
+        print(f"  {short_id(move.reservation_id)} {move.check_in}..{move.check_out}: {short_id(move.from_room_id)} -> {short_id(move.to_room_id)}")
@@ -0,0 +1,222 @@
+"""
+Headless JSON API over the booking system, for mobile and partner channels.
+The Streamlit app (app.py) stays the web UI; both share the same database.
+
+Run with several workers; tokens are stateless, so any worker can serve any request:
+    DATABASE_URL=... API_TOKEN_SECRET=... uvicorn api:app --workers 4
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel
+from async_system import AsyncHotelSystem
+from auth import AuthManager
+from models import RoomType, ReservationView, ReservationSummary
+
+logger = logging.getLogger(__name__)
+
+
+class RegisterRequest(BaseModel):
+    email: str
+    password: str
+    full_name: str
+
+
+class LoginRequest(BaseModel):
+    email: str
+    password: str
+
+
+class TokenResponse(BaseModel):
+    token: str
+    user_id: str
+    full_name: str
+
+
+class BookingRequest(BaseModel):
+    room_id: str
+    check_in: date
+    check_out: date
+
+
+class RoomOffer(BaseModel):
+    id: str
+    number: str
+    type: RoomType
+    price_per_night: float
+    total_price: float
+
+
+class ReservationPage(BaseModel):
+    reservations: List[ReservationSummary]
+    next_after_check_in: Optional[date] = None
+    next_after_id: Optional[str] = None
+
+
+def _token_secret() -> str:
+    secret = os.environ.get("API_TOKEN_SECRET")
+    if not secret:
+        raise RuntimeError("API_TOKEN_SECRET must be set; every worker needs the same value")
+    return secret
+
+
+# How often each worker reads the inventory change feed, and the longest wait after failures
+CHANGE_POLL_SECONDS = 2.0
+CHANGE_POLL_MAX_BACKOFF_SECONDS = 60.0
+
+
+async def _follow_changes(system: AsyncHotelSystem):
+    delay = CHANGE_POLL_SECONDS
+    while True:
+        try:
+            await system.sync_changes()
+            delay = CHANGE_POLL_SECONDS
+        except Exception:
+            # A failed poll leaves the cursor where it was; a later one catches up
+            delay = min(delay * 2, CHANGE_POLL_MAX_BACKOFF_SECONDS)
+            logger.exception("Reading the change feed failed; retrying in %.0f s", delay)
+        await asyncio.sleep(delay)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.system = await AsyncHotelSystem.create(os.environ.get("DATABASE_URL"))
+    app.state.token_secret = _token_secret()
+    follower = asyncio.create_task(_follow_changes(app.state.system))
+    yield
+    follower.cancel()
+    await app.state.system.close()
+
+
+app = FastAPI(title="Hospitality AI API", lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+
+def get_system(request: Request) -> AsyncHotelSystem:
+    return request.app.state.system
+
+
+def current_user_id(request: Request, authorization: str = Header(default="")) -> str:
+    scheme, _, token = authorization.partition(" ")
+    user_id = AuthManager.verify_api_token(token, request.app.state.token_secret) if scheme.lower() == "bearer" else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Missing or invalid token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user_id
+
+
+def _validate_stay(check_in: date, check_out: date):
+    if (check_out - check_in).days < 1:
+        raise HTTPException(status_code=422, detail="Stay must be at least 1 night")
+
+
+async def _offers(system: AsyncHotelSystem, rooms, check_in: date, check_out: date) -> List[RoomOffer]:
+    totals = await system.quote_rooms(rooms, check_in, check_out)
+    return [
+        RoomOffer(id=r.id, number=r.number, type=r.type, price_per_night=r.price_per_night, total_price=t)
+        for r, t in zip(rooms, totals)
+    ]
+
+
+# ==== AUTH ====
+
+@app.post("/auth/register", response_model=TokenResponse, status_code=201)
+async def register(body: RegisterRequest, request: Request, system: AsyncHotelSystem = Depends(get_system)):
+    if len(body.password) < 6:
+        raise HTTPException(status_code=422, detail="Password must be at least 6 characters")
+    user = await system.create_user(body.email, body.password, body.full_name)
+    if not user:
+        raise HTTPException(status_code=409, detail="Email already registered")
+    # Email verification is disabled in the web app too
+    await system.auto_verify_user(user.id)
+    token = AuthManager.issue_api_token(user.id, request.app.state.token_secret)
+    return TokenResponse(token=token, user_id=user.id, full_name=user.full_name)
+
+
+@app.post("/auth/login", response_model=TokenResponse)
+async def login(body: LoginRequest, request: Request, system: AsyncHotelSystem = Depends(get_system)):
+    user = await system.verify_login(body.email, body.password)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    token = AuthManager.issue_api_token(user.id, request.app.state.token_secret)
+    return TokenResponse(token=token, user_id=user.id, full_name=user.full_name)
+
+
+# ==== SEARCH & QUOTE ====
+
+@app.get("/availability", response_model=List[RoomOffer])
+async def availability(
+    request: Request,
+    check_in: date,
+    check_out: date,
+    room_type: Optional[RoomType] = None,
+    system: AsyncHotelSystem = Depends(get_system),
+):
+    _validate_stay(check_in, check_out)
+    rooms = await system.check_availability(check_in, check_out, room_type)
+    offers = await _offers(system, rooms, check_in, check_out)
+
+    # Clients re-polling the same search get a 304 when nothing changed
+    body = json.dumps([o.model_dump(mode="json") for o in offers], separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/quote", response_model=List[RoomOffer])
+async def quote(
+    check_in: date,
+    check_out: date,
+    room_type: Optional[RoomType] = None,
+    system: AsyncHotelSystem = Depends(get_system),
+):
+    """Stay totals for every room (available or not)"""
+    _validate_stay(check_in, check_out)
+    return await _offers(system, await system.get_rooms(room_type), check_in, check_out)
+
+
+# ==== RESERVATIONS ====
+
+@app.post("/reservations", response_model=ReservationSummary, status_code=201)
+async def book(
+    body: BookingRequest,
+    user_id: str = Depends(current_user_id),
+    system: AsyncHotelSystem = Depends(get_system),
+):
+    _validate_stay(body.check_in, body.check_out)
+    user = await system.get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unknown user")
+    guest = await system.get_or_create_guest_for_user(user.id, user.full_name, user.email)
+    try:
+        reservation = await system.create_reservation(guest.id, body.room_id, body.check_in, body.check_out)
+    except ValueError as e:
+        # Unknown room, already booked or held for a group; checked under the room lock
+        raise HTTPException(status_code=409, detail=str(e))
+    return await system.get_reservation_summary(reservation.id)
+
+
+@app.get("/reservations", response_model=ReservationPage)
+async def reservations(
+    view: Optional[ReservationView] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    after_check_in: Optional[date] = None,
+    after_id: Optional[str] = None,
+    user_id: str = Depends(current_user_id),
+    system: AsyncHotelSystem = Depends(get_system),
+):
+    after = (after_check_in, after_id) if after_check_in and after_id else None
+    rows = await system.get_user_reservations(user_id, view, limit, after)
+    page = ReservationPage(reservations=rows)
+    if len(rows) == limit:
+        page.next_after_check_in, page.next_after_id = rows[-1].cursor
+    return page
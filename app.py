@@ -1,25 +1,30 @@
 import streamlit as st
-import uuid
 from datetime import date, timedelta
 from system import HotelSystem
 from agent import HospitalityAI
-from models import RoomType, Guest
-from sqlmodel import select
+from models import RoomType
+from ids import short_id
 
 # --- CONFIGURATION & SETUP ---
 st.set_page_config(page_title="HOSPITALITY-AI", page_icon="🏨", layout="wide")
 
 # Initialize System
-@st.cache_resource(ttl=3600)  # Refresh cache every hour
+@st.cache_resource  # One per app instance; sync_changes() keeps its caches current
 def get_system():
     db_url = st.secrets.get("DATABASE_URL")
+    replica_urls = st.secrets.get("DATABASE_REPLICA_URLS", [])
     try:
-        return HotelSystem(db_url=db_url)
+        system = HotelSystem(db_url=db_url, replica_urls=list(replica_urls))
     except Exception as e:
         st.error(f"🚨 Database Connection Error: {e}")
         st.stop()
+    # Load the guest search index now rather than on the first lookup
+    system.guest_search.warm()
+    return system
 
 system = get_system()
+# Pick up rate and inventory changes made through other app instances since the last rerun
+system.sync_changes()
 
 # Initialize AI
 api_key = st.secrets.get("GEMINI_API_KEY")
@@ -131,14 +136,19 @@ with st.sidebar:
     if AuthManager.is_logged_in():
         # Show logged-in user info
         user_data = AuthManager.get_current_user()
+        # Keep this user's reads on the primary right after they book
+        system.set_session_key(user_data['id'])
         st.success(f"👤 {user_data['name']}")
         st.caption(user_data['email'])
         if st.button("Logout", use_container_width=True):
             AuthManager.logout()
+            system.set_session_key(None)
             st.rerun()
         st.markdown("---")
-        role = st.selectbox("Select Role", ["Guest", "Manager"])
+        role = st.selectbox("Select Role", ["Guest", "Staff", "Manager"])
     else:
+        # A reused script thread must not keep the previous user's key
+        system.set_session_key(None)
         # Show login/registration forms
         auth_tab = st.radio("", ["Login", "Register"], horizontal=True)
         
@@ -305,6 +315,9 @@ if role == "Guest":
                         
                         # Store available rooms in session state for booking
                         st.session_state.available_rooms = available
+                        st.session_state.available_totals = dict(
+                            zip([r.id for r in available], system.quote_rooms(available, check_in, check_out))
+                        )
                         st.session_state.booking_check_in = check_in
                         st.session_state.booking_check_out = check_out
                     else:
@@ -321,6 +334,9 @@ if role == "Guest":
                             col_a, col_b = st.columns([3, 1])
                             col_a.markdown(f"**🛏️ Room {room.number}**")
                             col_b.markdown(f"**₹{room.price_per_night}/night**")
+                            total = st.session_state.get('available_totals', {}).get(room.id)
+                            if total is not None:
+                                col_b.caption(f"₹{total:,.2f} total")
                             
                             # Image Gallery
                             img_prefix = room.type.value.lower()
@@ -336,24 +352,9 @@ if role == "Guest":
                                     user_data = AuthManager.get_current_user()
                                     
                                     # Create or get guest for this user
-                                    from sqlmodel import Session
-                                    
-                                    with Session(system.engine) as session:
-                                        # Check if guest exists for this user
-                                        guest = session.exec(select(Guest).where(Guest.user_id == user_data['id'])).first()
-                                        
-                                        if not guest:
-                                            # Create new guest
-                                            g_id = str(uuid.uuid4())
-                                            guest = Guest(
-                                                id=g_id,
-                                                user_id=user_data['id'],
-                                                name=user_data['name'],
-                                                email=user_data['email']
-                                            )
-                                            session.add(guest)
-                                            session.commit()
-                                            session.refresh(guest)
+                                    guest = system.get_or_create_guest_for_user(
+                                        user_data['id'], user_data['name'], user_data['email']
+                                    )
                                     
                                     # Create reservation
                                     res = system.create_reservation(
@@ -376,7 +377,21 @@ if role == "Guest":
 
 elif role == "Staff":
     st.header("🛡️ Staff Operations")
-    st.info("Staff module is currently under maintenance for the upgrade.")
+
+    st.markdown("### Guest Lookup")
+    query = st.text_input("Name, email or phone", placeholder="e.g. jo smi, anna@, 98765")
+    if query:
+        matches = system.search_guests(query)
+        if matches:
+            st.dataframe([{
+                "Name": m.name,
+                "Email": m.email,
+                "Phone": m.phone,
+                "Type": m.type.value,
+                "Guest": short_id(m.id),
+            } for m in matches], use_container_width=True)
+        else:
+            st.caption("No matching guests.")
 
 elif role == "Manager":
     st.header("📊 Manager Dashboard")
@@ -403,11 +418,38 @@ elif role == "Manager":
     reservations = system.get_all_reservations()
     if reservations:
         data = [{
-            "ID": r.id[:8],
-            "Guest": r.guest_id[:8],
-            "Room": r.room_id[:8],
+            "ID": short_id(r.id),
+            "Guest": short_id(r.guest_id),
+            "Room": short_id(r.room_id),
             "Check-in": r.check_in,
             "Status": r.status
         } for r in reservations]
         st.dataframe(data, use_container_width=True)
 
+    with st.expander("🛠️ Query Profiler"):
+        if system.profiler is None:
+            st.caption("Profiling is off. It records SQL statements and timings for every HotelSystem call.")
+            if st.button("Enable Profiling"):
+                system.enable_profiling()
+                st.rerun()
+        else:
+            snapshot = system.profiler.snapshot()
+            if snapshot:
+                st.dataframe(
+                    [{"Method": name, **stats} for name, stats in snapshot.items()],
+                    use_container_width=True
+                )
+                for name, stats in snapshot.items():
+                    if stats["n_plus_one_calls"]:
+                        st.warning(f"Possible N+1 in `{name}`: {stats['last_repeated_statement']}")
+            else:
+                st.info("No calls recorded yet.")
+            st.code(system.profiler.to_prometheus(), language="text")
+            c1, c2 = st.columns(2)
+            if c1.button("Reset Stats", use_container_width=True):
+                system.profiler.reset()
+                st.rerun()
+            if c2.button("Disable Profiling", use_container_width=True):
+                system.disable_profiling()
+                st.rerun()
+
@@ -0,0 +1,136 @@
+"""
+Hot/cold split for reservations: closed stays (checked out or cancelled) that
+ended before a horizon move from `reservation` to `reservation_archive`, so the
+live table availability and day sheets scan stays roughly the size of the
+forward booking window. History views read both tables (queries.reservation_history).
+
+Run from cron after the night audit:
+    python archive.py
+    python archive.py --horizon-days 365 --batch-size 5000
+    python archive.py --dry-run
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, insert, literal
+from sqlmodel import Session, select
+from models import Reservation, ReservationStatus, ArchivedReservation, ArchiveReport, DEFAULT_PROPERTY
+
+CLOSED_STATUSES = [ReservationStatus.CHECKED_OUT, ReservationStatus.CANCELLED]
+
+# Stays that ended more than this many days ago are archived
+DEFAULT_HORIZON_DAYS = 180
+DEFAULT_BATCH_SIZE = 1000
+
+# Columns copied as-is; the archive adds archived_at
+COLUMNS = ["id", "property_id", "guest_id", "room_id", "check_in", "check_out", "total_price", "status", "created_at"]
+
+
+class ReservationArchiver:
+    """Moves closed reservations into the archive table in bounded batches.
+
+    Each batch copies and deletes the same rows in one transaction, so a
+    crashed run leaves every reservation in exactly one table and a re-run
+    simply continues. Small batches keep row locks and WAL bursts short while
+    bookings are being written.
+    """
+
+    def __init__(self, engine, property_id: str = DEFAULT_PROPERTY,
+                 horizon_days: int = DEFAULT_HORIZON_DAYS, batch_size: int = DEFAULT_BATCH_SIZE):
+        if horizon_days < 1:
+            raise ValueError("horizon_days must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.engine = engine
+        self.property_id = property_id
+        self.horizon_days = horizon_days
+        self.batch_size = batch_size
+
+    def cutoff(self, today: Optional[date] = None) -> date:
+        """Stays that checked out before this date are archived"""
+        return (today or date.today()) - timedelta(days=self.horizon_days)
+
+    def _closed_before(self, cutoff: date):
+        return (
+            Reservation.property_id == self.property_id,
+            Reservation.status.in_(CLOSED_STATUSES),
+            Reservation.check_out < cutoff,
+        )
+
+    def eligible(self, cutoff: date) -> int:
+        """Live reservations an archive run with this cutoff would move"""
+        with Session(self.engine) as session:
+            return session.exec(select(func.count(Reservation.id)).where(*self._closed_before(cutoff))).one()
+
+    def archive_batch(self, cutoff: date) -> int:
+        """Move up to batch_size reservations; returns how many moved"""
+        with Session(self.engine) as session:
+            # SKIP LOCKED lets two archivers (or a slow booking) proceed without waiting on each other
+            ids = session.exec(
+                select(Reservation.id)
+                .where(*self._closed_before(cutoff))
+                .order_by(Reservation.check_out, Reservation.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not ids:
+                return 0
+            source = select(*(getattr(Reservation, c) for c in COLUMNS), literal(datetime.now()).label("archived_at"))
+            session.execute(insert(ArchivedReservation).from_select(
+                COLUMNS + ["archived_at"], source.where(Reservation.id.in_(ids))
+            ))
+            session.execute(delete(Reservation).where(Reservation.id.in_(ids)))
+            session.commit()
+            return len(ids)
+
+    def run(self, cutoff: Optional[date] = None, max_batches: Optional[int] = None,
+            pause_seconds: float = 0.0) -> ArchiveReport:
+        """Archive everything closed before `cutoff` (default: today minus the horizon)"""
+        cutoff = cutoff or self.cutoff()
+        started = time.perf_counter()
+        report = ArchiveReport(property_id=self.property_id, cutoff=cutoff)
+        while max_batches is None or report.batches < max_batches:
+            moved = self.archive_batch(cutoff)
+            if not moved:
+                break
+            report.rows += moved
+            report.batches += 1
+            if moved < self.batch_size:
+                break
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        if max_batches is not None and report.batches == max_batches:
+            report.remaining = self.eligible(cutoff)
+        report.duration_ms = (time.perf_counter() - started) * 1000
+        return report
+
+
+def format_report(report: ArchiveReport) -> str:
+    line = (f"Archive {report.property_id} before {report.cutoff}: {report.rows} reservations "
+            f"in {report.batches} batches, {report.duration_ms:.1f} ms")
+    if report.remaining:
+        line += f" ({report.remaining} left for the next run)"
+    return line
+
+
+if __name__ == "__main__":
+    from system import HotelSystem
+
+    parser = argparse.ArgumentParser(description="Archive closed reservations out of the live table")
+    parser.add_argument("--horizon-days", type=int, default=DEFAULT_HORIZON_DAYS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--property", default=DEFAULT_PROPERTY)
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+    args = parser.parse_args()
+
+    system = HotelSystem(db_url=os.environ.get("DATABASE_URL"), property_id=args.property)
+    archiver = ReservationArchiver(system.engine, system.property_id, args.horizon_days, args.batch_size)
+    if args.dry_run:
+        cutoff = archiver.cutoff()
+        print(f"{archiver.eligible(cutoff)} reservations of {args.property} closed before {cutoff} would be archived")
+    else:
+        print(format_report(archiver.run(max_batches=args.max_batches, pause_seconds=args.pause)))
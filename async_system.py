@@ -0,0 +1,543 @@
+"""
+AsyncHotelSystem: the HotelSystem API on SQLAlchemy's asyncio engine
+(aiosqlite for SQLite, asyncpg for Postgres).
+
+Independent queries can run concurrently on one event loop:
+
+    system = await AsyncHotelSystem.create(db_url)
+    stats, departures, recent = await asyncio.gather(
+        system.get_room_stats(),
+        system.get_checkouts(date.today()),
+        system.get_all_reservations(),
+    )
+
+Queries come from the same builders as HotelSystem (queries.py), and the rate
+calendar and night audit run their sync code through `run_sync`, so results
+match the sync implementation (see verify_async.py).
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import insert, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Room, RoomType, RoomStatus, Guest, GuestType, Reservation, ReservationStatus, User, DEFAULT_PROPERTY, ReservationView, ReservationSummary, DaySheet, RoomRate, RateRule, NightAuditReport, ArchiveReport, ExportReport, AllocationPlan, AllotmentBlock, ChangeKind, InventoryChange, GuestMatch
+from ids import new_id
+import queries
+from rates import RateCalendar
+from night_audit import NightAudit
+from archive import ReservationArchiver, DEFAULT_HORIZON_DAYS
+import export
+from allocation import RoomAllocator
+from changefeed import ChangeFeed, ChangeCursor, change, log_changes, rate_rule_change
+from auth import AuthManager
+import guest_search
+from system import DEMO_ROOMS
+
+
+def _async_url(db_url: str):
+    """Map a sync database URL to its async driver and connect args"""
+    url = make_url(db_url)
+    connect_args = {}
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif url.get_backend_name() == "postgresql":
+        # asyncpg takes `ssl` instead of libpq's sslmode; Supabase needs it on by default
+        sslmode = url.query.get("sslmode", "require")
+        url = url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+        if sslmode != "disable":
+            connect_args = {"ssl": sslmode}
+    return url, connect_args
+
+
+class AsyncHotelSystem:
+    """Async counterpart of HotelSystem; build it with `await AsyncHotelSystem.create(...)`"""
+
+    def __init__(self, db_url: Optional[str] = None, property_id: str = DEFAULT_PROPERTY,
+                 schema: Optional[str] = None):
+        self.property_id = property_id
+        self.schema = schema
+        url, connect_args = _async_url(db_url or "sqlite:///hotel_inr.db")
+        self.engine = create_async_engine(url, connect_args=connect_args)
+        queries.begin_sqlite_transactions(self.engine.sync_engine)
+        if schema:
+            self.engine = self.engine.execution_options(schema_translate_map={None: schema})
+        # Loaded through run_sync with the caller's session, so it needs no engine of its own
+        self.rates = RateCalendar(None, property_id)
+        self.changes = ChangeCursor(ChangeFeed(None, property_id))
+        self.changes.subscribe(self._apply_changes)
+        # Searched the same way; the engine only picks the backend
+        self.guest_search = guest_search.for_engine(self.engine.sync_engine)
+
+    @classmethod
+    async def create(cls, db_url: Optional[str] = None, property_id: str = DEFAULT_PROPERTY,
+                     schema: Optional[str] = None) -> "AsyncHotelSystem":
+        system = cls(db_url, property_id, schema)
+        await system._create_db_and_tables()
+        await system._initialize_mock_data()
+        return system
+
+    async def close(self):
+        await self.engine.dispose()
+
+    def _session(self) -> AsyncSession:
+        # Objects stay usable after commit without a lazy reload on a closed session
+        return AsyncSession(self.engine, expire_on_commit=False)
+
+    async def _create_db_and_tables(self):
+        async with self.engine.begin() as conn:
+            if self.schema:
+                await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{self.schema}"'))
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    async def _initialize_mock_data(self):
+        async with self._session() as session:
+            statement = select(Room).where(Room.property_id == self.property_id)
+            if (await session.exec(statement)).first():
+                return
+            for prefix, count, r_type, price in DEMO_ROOMS:
+                for i in range(1, count + 1):
+                    session.add(Room(id=new_id(), property_id=self.property_id,
+                                     number=f"{prefix}{i:02d}", type=r_type, price_per_night=price))
+            await session.commit()
+
+    async def find_guest_by_name(self, name: str) -> Optional[Guest]:
+        async with self._session() as session:
+            return (await session.exec(select(Guest).where(Guest.name == name))).first()
+
+    async def create_guest(self, name: str, guest_type: GuestType = GuestType.WALK_IN) -> Guest:
+        existing = await self.find_guest_by_name(name)
+        if existing:
+            return existing
+        async with self._session() as session:
+            guest = Guest(id=new_id(), name=name, type=guest_type)
+            session.add(guest)
+            await session.run_sync(log_changes, [change(ChangeKind.GUEST, self.property_id, guest.id)])
+            await session.commit()
+            self.guest_search.add([guest])
+            return guest
+
+    async def search_guests(self, query: str, limit: int = guest_search.DEFAULT_LIMIT) -> List[GuestMatch]:
+        """Best matches for a partial name, email or phone number, as typed at the front desk"""
+        async with self._session() as session:
+            return await session.run_sync(lambda s: self.guest_search.search(query, limit, session=s))
+
+    async def get_rooms(self, room_type: Optional[RoomType] = None) -> List[Room]:
+        """All rooms of this property, optionally of one type"""
+        async with self._session() as session:
+            statement = select(Room).where(Room.property_id == self.property_id)
+            if room_type:
+                statement = statement.where(Room.type == room_type)
+            return (await session.exec(statement.order_by(Room.number))).all()
+
+    async def check_availability(self, check_in: date, check_out: date,
+                                 room_type: Optional[RoomType] = None) -> List[Room]:
+        async with self._session() as session:
+            statement = queries.available_rooms(self.property_id, check_in, check_out, room_type)
+            rooms = (await session.exec(statement)).all()
+            holds = (await session.exec(queries.active_holds(self.property_id, check_in, check_out, date.today()))).all()
+            return queries.without_held(rooms, queries.held_by_type(holds, check_in, check_out))
+
+    async def create_reservation(self, guest_id: str, room_id: str, check_in: date, check_out: date) -> Reservation:
+        async with self._session() as session:
+            # The row lock (BEGIN IMMEDIATE on SQLite) serializes concurrent bookings of the same room
+            await session.connection(execution_options=queries.BOOKING_TRANSACTION)
+            room = (await session.exec(select(Room).where(Room.id == room_id).with_for_update())).first()
+            if not room or room.property_id != self.property_id:
+                raise ValueError("Room not found")
+
+            nights = (check_out - check_in).days
+            if nights < 1:
+                raise ValueError("Stay must be at least 1 night")
+            if (await session.exec(queries.room_conflicts(room_id, check_in, check_out))).first():
+                raise ValueError("Room is already booked for these dates")
+            holds = (await session.exec(queries.active_holds(self.property_id, check_in, check_out, date.today()))).all()
+            held = queries.held_by_type(holds, check_in, check_out).get(room.type, 0)
+            if held:
+                free = (await session.exec(queries.available_rooms(self.property_id, check_in, check_out, room.type))).all()
+                if len(free) <= held:
+                    raise ValueError("The remaining rooms of this type are held for a group")
+
+            total_price = await session.run_sync(
+                lambda s: self.rates.quote(room.type, check_in, check_out, room.price_per_night, session=s)
+            )
+            res_id = new_id()
+            reservation = Reservation(
+                id=res_id,
+                property_id=self.property_id,
+                guest_id=guest_id,
+                room_id=room_id,
+                check_in=check_in,
+                check_out=check_out,
+                total_price=total_price
+            )
+            session.add(reservation)
+            await session.run_sync(log_changes, [
+                change(ChangeKind.RESERVATION, self.property_id, res_id, room.type, check_in, check_out)
+            ])
+            await session.commit()
+            return reservation
+
+    async def _free_after_holds(self, session: AsyncSession, requested: Dict[RoomType, int], check_in: date,
+                                check_out: date, exclude_group: Optional[str] = None) -> List[Room]:
+        """Lock the requested types' rooms, then list those free for the stay and not held"""
+        await session.connection(execution_options=queries.BOOKING_TRANSACTION)
+        await session.exec(queries.lock_rooms(self.property_id, list(requested)))
+        available = (await session.exec(queries.available_rooms(self.property_id, check_in, check_out))).all()
+        holds = (await session.exec(queries.active_holds(
+            self.property_id, check_in, check_out, date.today(), exclude_group=exclude_group
+        ))).all()
+        return queries.without_held(available, queries.held_by_type(holds, check_in, check_out))
+
+    async def book_group(self, guest_id: str, check_in: date, check_out: date, rooms: Dict[RoomType, int],
+                         group_id: Optional[str] = None) -> List[Reservation]:
+        """Book several rooms for the same dates, all or nothing, in one batched insert"""
+        requested = {t: n for t, n in rooms.items() if n > 0}
+        if not requested:
+            raise ValueError("Request at least one room")
+        if (check_out - check_in).days < 1:
+            raise ValueError("Stay must be at least 1 night")
+
+        async with self._session() as session:
+            chosen = queries.pick_rooms(
+                await self._free_after_holds(session, requested, check_in, check_out, group_id), requested
+            )
+            n = len(chosen)
+            prices = await session.run_sync(lambda s: self.rates.quote_many(
+                [r.type for r in chosen], [check_in] * n, [check_out] * n,
+                [r.price_per_night for r in chosen], session=s,
+            ))
+            group_id = group_id or new_id()
+            rows = [
+                dict(id=new_id(), property_id=self.property_id, guest_id=guest_id, room_id=room.id,
+                     check_in=check_in, check_out=check_out, total_price=float(price),
+                     status=ReservationStatus.CONFIRMED, group_id=group_id, created_at=datetime.now())
+                for room, price in zip(chosen, prices)
+            ]
+            await session.execute(insert(Reservation), rows)
+            await session.run_sync(log_changes, [
+                change(ChangeKind.RESERVATION, self.property_id, row["id"], room.type, check_in, check_out)
+                for row, room in zip(rows, chosen)
+            ])
+
+            blocks = (await session.exec(select(AllotmentBlock).where(
+                AllotmentBlock.property_id == self.property_id, AllotmentBlock.group_id == group_id
+            ))).all()
+            for block in blocks:
+                block.rooms_picked_up = min(block.rooms_held, block.rooms_picked_up + requested.get(block.room_type, 0))
+                session.add(block)
+            await session.commit()
+            return [Reservation(**row) for row in rows]
+
+    async def create_block(self, guest_id: str, check_in: date, check_out: date, rooms: Dict[RoomType, int],
+                           release_date: date, name: str = "") -> List[AllotmentBlock]:
+        """Hold rooms for a group until `release_date`; book them later with book_group(group_id=...)"""
+        requested = {t: n for t, n in rooms.items() if n > 0}
+        if not requested:
+            raise ValueError("Request at least one room")
+        if (check_out - check_in).days < 1:
+            raise ValueError("Stay must be at least 1 night")
+        if release_date > check_in:
+            raise ValueError("Release date must be on or before check-in")
+
+        async with self._session() as session:
+            queries.pick_rooms(await self._free_after_holds(session, requested, check_in, check_out), requested)
+            group_id = new_id()
+            blocks = [
+                AllotmentBlock(id=new_id(), property_id=self.property_id, group_id=group_id, name=name,
+                               guest_id=guest_id, room_type=room_type, check_in=check_in, check_out=check_out,
+                               rooms_held=count, release_date=release_date)
+                for room_type, count in requested.items()
+            ]
+            session.add_all(blocks)
+            await session.run_sync(log_changes, [
+                change(ChangeKind.BLOCK, self.property_id, block.id, block.room_type, check_in, check_out)
+                for block in blocks
+            ])
+            await session.commit()
+            return blocks
+
+    async def get_checkouts(self, day: date) -> List[Reservation]:
+        async with self._session() as session:
+            statement = select(Reservation).where(
+                Reservation.property_id == self.property_id,
+                Reservation.check_out == day,
+                Reservation.status == ReservationStatus.CHECKED_IN
+            )
+            return (await session.exec(statement)).all()
+
+    async def get_day_sheet(self, day: date) -> DaySheet:
+        """Arrivals, departures, in-house stays and no-shows for one date"""
+        sheets = [sheet async for sheet in self.iter_day_sheets(day, day)]
+        return sheets[0]
+
+    async def iter_day_sheets(self, start: date, end: date, with_rows: bool = True) -> AsyncIterator[DaySheet]:
+        """Stream one DaySheet per date from start to end (inclusive); see HotelSystem.iter_day_sheets"""
+        today = date.today()
+        statement = queries.day_sheet_rows(self.property_id, start, end).execution_options(yield_per=500)
+
+        async with self._session() as session:
+            result = await session.stream(statement)
+            rows = result.__aiter__()
+
+            async def next_row() -> Optional[ReservationSummary]:
+                row = await anext(rows, None)
+                return ReservationSummary(**row._mapping) if row is not None else None
+
+            upcoming = await next_row()
+            active: List[ReservationSummary] = []
+            day = start
+            while day <= end:
+                while upcoming is not None and upcoming.check_in <= day:
+                    active.append(upcoming)
+                    upcoming = await next_row()
+                active = [r for r in active if r.check_out >= day]
+                yield queries.build_day_sheet(active, day, today, with_rows)
+                day += timedelta(days=1)
+
+    async def run_night_audit(self, business_date: Optional[date] = None,
+                              auto_check_in: bool = True) -> NightAuditReport:
+        """Close a business date (defaults to yesterday); safe to re-run"""
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(
+                lambda sync_conn: NightAudit(sync_conn, self.property_id, auto_check_in).run(business_date)
+            )
+
+    async def archive_reservations(self, horizon_days: int = DEFAULT_HORIZON_DAYS,
+                                   max_batches: Optional[int] = None) -> ArchiveReport:
+        """Move closed stays older than the horizon to the archive table; safe to re-run"""
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(
+                lambda sync_conn: ReservationArchiver(sync_conn, self.property_id, horizon_days).run(max_batches=max_batches)
+            )
+
+    async def export_reservations(self, path: str, start: Optional[date] = None, end: Optional[date] = None,
+                                  statuses: Optional[List[ReservationStatus]] = None, **options) -> ExportReport:
+        """Stream reservations with guest and room details to CSV/JSONL/Parquet (see export.py)"""
+        # Like the archive run, the file is written from the event loop's thread
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(lambda sync_conn: export.export_reservations(
+                sync_conn, path, property_id=self.property_id, start=start, end=end, statuses=statuses, **options
+            ))
+
+    async def optimize_allocation(self, room_type: Optional[RoomType] = None, apply: bool = False) -> AllocationPlan:
+        """Repack unlocked future stays within their room type to close short gaps"""
+        async with self.engine.connect() as conn:
+            def run(sync_conn):
+                allocator = RoomAllocator(sync_conn, self.property_id)
+                return allocator.optimize(room_type) if apply else allocator.plan(room_type)
+            return await conn.run_sync(run)
+
+    async def set_room_lock(self, reservation_id: str, locked: bool = True) -> bool:
+        """Pin a reservation to its room so the allocation optimizer leaves it there"""
+        async with self._session() as session:
+            reservation = await session.get(Reservation, reservation_id)
+            if not reservation or reservation.property_id != self.property_id:
+                return False
+            reservation.room_locked = locked
+            session.add(reservation)
+            await session.commit()
+            return True
+
+    async def get_all_reservations(self) -> List[Reservation]:
+        """Live reservations of this property (archived stays are excluded)"""
+        async with self._session() as session:
+            statement = select(Reservation).where(Reservation.property_id == self.property_id)
+            return (await session.exec(statement)).all()
+
+    async def get_room_stats(self):
+        async with self._session() as session:
+            total = (await session.exec(select(Room).where(Room.property_id == self.property_id))).all()
+            occupied = [r for r in total if r.status == RoomStatus.OCCUPIED]
+            return len(occupied), len(total)
+
+    # ==== RATE MANAGEMENT METHODS ====
+
+    async def quote_rooms(self, rooms: List[Room], check_in: date, check_out: date) -> List[float]:
+        """Total stay price for each room, in the same order"""
+        n = len(rooms)
+        async with self._session() as session:
+            totals = await session.run_sync(lambda s: self.rates.quote_many(
+                [r.type for r in rooms], [check_in] * n, [check_out] * n,
+                [r.price_per_night for r in rooms], session=s,
+            ))
+        return totals.tolist()
+
+    async def set_room_rate(self, room_type: RoomType, day: date, price: float) -> RoomRate:
+        """Set (or replace) the nightly rate of a room type on one date"""
+        async with self._session() as session:
+            rate = (await session.exec(
+                select(RoomRate).where(
+                    RoomRate.property_id == self.property_id,
+                    RoomRate.room_type == room_type,
+                    RoomRate.day == day,
+                )
+            )).first()
+            if rate:
+                rate.price = price
+            else:
+                rate = RoomRate(id=new_id(), property_id=self.property_id,
+                                room_type=room_type, day=day, price=price)
+            session.add(rate)
+            await session.run_sync(log_changes, [
+                change(ChangeKind.RATE, self.property_id, rate.id, room_type, day, day + timedelta(days=1))
+            ])
+            await session.commit()
+        self.rates.invalidate()
+        return rate
+
+    async def add_rate_rule(self, multiplier: float, room_type: Optional[RoomType] = None,
+                            weekday: Optional[int] = None, start_date: Optional[date] = None,
+                            end_date: Optional[date] = None, min_nights: Optional[int] = None) -> RateRule:
+        """Add a weekday, season or length-of-stay multiplier"""
+        rule = RateRule(
+            id=new_id(),
+            property_id=self.property_id,
+            room_type=room_type,
+            weekday=weekday,
+            start_date=start_date,
+            end_date=end_date,
+            min_nights=min_nights,
+            multiplier=multiplier,
+        )
+        async with self._session() as session:
+            session.add(rule)
+            await session.run_sync(log_changes, [rate_rule_change(rule)])
+            await session.commit()
+        self.rates.invalidate()
+        return rule
+
+    async def remove_rate_rule(self, rule_id: str) -> bool:
+        """Delete a rate rule"""
+        async with self._session() as session:
+            rule = await session.get(RateRule, rule_id)
+            if not rule or rule.property_id != self.property_id:
+                return False
+            await session.delete(rule)
+            await session.run_sync(log_changes, [rate_rule_change(rule)])
+            await session.commit()
+        self.rates.invalidate()
+        return True
+
+    # ==== CHANGE FEED ====
+
+    async def sync_changes(self) -> List[InventoryChange]:
+        """Apply changes committed since the last call (by any worker) to local caches and the guest index"""
+        async with self._session() as session:
+            changes = await session.run_sync(lambda s: self.changes.poll(session=s))
+            guest_ids = [c.entity_id for c in changes if c.kind == ChangeKind.GUEST]
+            if guest_ids:
+                self.guest_search.add((await session.exec(select(Guest).where(Guest.id.in_(guest_ids)))).all())
+            return changes
+
+    def _apply_changes(self, changes: List[InventoryChange]):
+        if any(c.kind == ChangeKind.RATE for c in changes):
+            self.rates.invalidate()
+
+    # ==== USER MANAGEMENT METHODS ====
+
+    async def create_user(self, email: str, password: str, full_name: str) -> Optional[User]:
+        """Create a new user account"""
+        async with self._session() as session:
+            existing = (await session.exec(select(User).where(User.email == email))).first()
+            if existing:
+                return None  # Email already registered
+            user = User(
+                id=new_id(),
+                email=email,
+                password_hash=AuthManager.hash_password(password),
+                full_name=full_name
+            )
+            session.add(user)
+            await session.commit()
+            return user
+
+    async def auto_verify_user(self, user_id: str) -> bool:
+        """Auto-verify user without email verification"""
+        async with self._session() as session:
+            user = await session.get(User, user_id)
+            if not user:
+                return False
+            user.email_verified = True
+            session.add(user)
+            await session.commit()
+            return True
+
+    async def verify_login(self, email: str, password: str) -> Optional[User]:
+        """Verify user login credentials"""
+        async with self._session() as session:
+            user = (await session.exec(select(User).where(User.email == email))).first()
+            if user and AuthManager.verify_password(password, user.password_hash):
+                return user
+            return None
+
+    async def get_user_by_id(self, user_id: str) -> Optional[User]:
+        """Get user by ID"""
+        async with self._session() as session:
+            return await session.get(User, user_id)
+
+    async def get_or_create_guest_for_user(self, user_id: str, name: str, email: Optional[str] = None) -> Guest:
+        """Get the guest profile linked to a user account, creating it on first booking"""
+        async with self._session() as session:
+            guest = (await session.exec(select(Guest).where(Guest.user_id == user_id))).first()
+            if guest:
+                return guest
+            guest = Guest(id=new_id(), user_id=user_id, name=name, email=email)
+            session.add(guest)
+            # Lets app instances add the guest to their search index
+            await session.run_sync(log_changes, [change(ChangeKind.GUEST, self.property_id, guest.id)])
+            await session.commit()
+            self.guest_search.add([guest])
+            return guest
+
+    async def get_user_reservations(
+        self,
+        user_id: str,
+        view: Optional[ReservationView] = None,
+        limit: Optional[int] = 20,
+        after: Optional[Tuple[date, str]] = None,
+    ) -> List[ReservationSummary]:
+        """Get one page of a user's reservations; see HotelSystem.get_user_reservations"""
+        async with self._session() as session:
+            statement = queries.user_reservations(self.property_id, user_id, view, limit, after, date.today())
+            return [ReservationSummary(**row._mapping) for row in await session.exec(statement)]
+
+    async def get_reservation_summary(self, reservation_id: str) -> Optional[ReservationSummary]:
+        """A live reservation with its guest name and room; see HotelSystem.get_reservation_summary"""
+        async with self._session() as session:
+            row = (await session.exec(queries.reservation_summary(reservation_id))).first()
+            return ReservationSummary(**row._mapping) if row else None
+
+    async def send_verification_otp(self, user_id: str) -> bool:
+        """Generate and send OTP to user's email"""
+        from email_service import EmailService
+
+        async with self._session() as session:
+            user = await session.get(User, user_id)
+            if not user:
+                return False
+            otp = EmailService.generate_otp()
+            user.verification_otp = otp
+            user.otp_expires_at = EmailService.get_otp_expiry()
+            session.add(user)
+            await session.commit()
+
+        # SMTP is blocking; keep it off the event loop
+        return await asyncio.to_thread(EmailService.send_otp_email, user.email, otp, user.full_name)
+
+    async def verify_otp(self, user_id: str, otp: str) -> bool:
+        """Verify OTP code"""
+        async with self._session() as session:
+            user = await session.get(User, user_id)
+            if not user or user.verification_otp != otp:
+                return False
+            if user.otp_expires_at and user.otp_expires_at < datetime.now():
+                return False
+            user.email_verified = True
+            user.verification_otp = None
+            user.otp_expires_at = None
+            session.add(user)
+            await session.commit()
+            return True
@@ -1,9 +1,9 @@
 import hashlib
+import hmac
 import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Optional
-import streamlit as st
-import extra_streamlit_components as stx
 
 class AuthManager:
     """Handles user authentication and session management"""
@@ -11,6 +11,7 @@ class AuthManager:
     @staticmethod
     def get_cookie_manager():
         """Get cookie manager instance"""
+        import extra_streamlit_components as stx
         return stx.CookieManager()
     
     @staticmethod
@@ -35,14 +36,36 @@ class AuthManager:
         """Generate a secure session token"""
         return secrets.token_urlsafe(32)
     
+    @staticmethod
+    def issue_api_token(user_id: str, secret: str, ttl_seconds: int = 7 * 24 * 3600) -> str:
+        """Create a stateless signed API token: user_id.expiry.signature"""
+        expires = int(time.time()) + ttl_seconds
+        payload = f"{user_id}.{expires}"
+        signature = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+        return f"{payload}.{signature}"
+    
+    @staticmethod
+    def verify_api_token(token: str, secret: str) -> Optional[str]:
+        """Return the user id of a valid, unexpired API token"""
+        try:
+            user_id, expires, signature = token.split('.')
+            expected = hmac.new(secret.encode(), f"{user_id}.{expires}".encode(), hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(signature, expected) or int(expires) < time.time():
+                return None
+            return user_id
+        except ValueError:
+            return None
+    
     @staticmethod
     def is_logged_in() -> bool:
         """Check if user is logged in"""
+        import streamlit as st
         return 'user_id' in st.session_state and st.session_state.user_id is not None
     
     @staticmethod
     def get_current_user():
         """Get current logged-in user data"""
+        import streamlit as st
         if not AuthManager.is_logged_in():
             return None
         return {
@@ -54,6 +77,7 @@ class AuthManager:
     @staticmethod
     def login(user_data: dict, remember_me: bool = True):
         """Set user session data and optionally save to cookies"""
+        import streamlit as st
         st.session_state.user_id = user_data['id']
         st.session_state.user_email = user_data['email']
         st.session_state.user_name = user_data['name']
@@ -75,6 +99,7 @@ class AuthManager:
     @staticmethod
     def auto_login():
         """Check cookies and auto-login if valid session exists"""
+        import streamlit as st
         if AuthManager.is_logged_in():
             return True  # Already logged in
         
@@ -95,6 +120,7 @@ class AuthManager:
     @staticmethod
     def logout():
         """Clear user session and cookies"""
+        import streamlit as st
         # Clear session state
         if 'user_id' in st.session_state:
             del st.session_state.user_id
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the HotelSystem hot paths.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.hot_paths --rooms 1000 --reservations 1000000 --output bench.json
+"""
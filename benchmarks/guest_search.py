@@ -0,0 +1,139 @@
+"""
+Typeahead latency of guest search. Fills a database with synthetic guest
+profiles, then replays what the front desk types: every prefix of a full
+name, email prefixes, phone digits and names with a typo. Fails if the p95
+latency of a keystroke exceeds the budget.
+
+    python -m benchmarks.guest_search
+    python -m benchmarks.guest_search --guests 500000 --budget-ms 20
+    python -m benchmarks.guest_search --db-url postgresql://.../bench    # pg_trgm backend (run migrate.py first)
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from sqlalchemy import func, insert
+from sqlmodel import Session, SQLModel, create_engine, select
+from models import Guest, GuestType
+from ids import new_id
+import guest_search
+
+FIRST_NAMES = """
+aarav aditi ahmed aisha alejandro alexander amelia ana andrea ankit anna arjun ava benjamin camila carlos
+charlotte chen chloe daniel david diego divya elena elijah emily emma ethan fatima felipe gabriel grace
+hana hannah harper henry hiroshi isabella ivan jack james jessica john jose julia kavya kenji lakshmi
+laura leo liam lucas lucia maria mateo mei mia michael mohammed nadia neha noah olivia omar oscar
+pablo priya rahul ravi rohan sakura samuel sara sebastian sofia sophia suresh takeshi tanvi thomas
+valentina victoria vikram william wei yuki zara zoe
+""".split()
+
+LAST_NAMES = """
+agarwal ahmed ali anderson bauer becker brown chen chopra cohen costa das davis desai dubois fernandez
+fischer garcia gonzalez gupta hernandez hoffmann ito iyer jackson jain johnson jones kapoor khan kim
+kobayashi kumar lee lopez martin martinez mehta menon meyer miller moore muller nair nakamura nguyen
+patel pereira perez reddy rodriguez rossi russo sanchez santos sato schmidt schneider sharma silva
+singh smith suzuki taylor thomas thompson tanaka verma wagner wang white williams wilson wong yamamoto
+yang zhang
+""".split()
+
+
+def generate_guests(engine, count: int, seed: int = 42) -> List[dict]:
+    rng = random.Random(seed)
+    SQLModel.metadata.create_all(engine)
+    rows = []
+    for n in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append({
+            "id": new_id(),
+            "name": f"{first.title()} {last.title()}",
+            "email": f"{first}.{last}{n}@example.com" if rng.random() < 0.8 else None,
+            "phone": f"+91 {rng.randint(70000, 99999)} {rng.randint(10000, 99999)}" if rng.random() < 0.7 else None,
+            "type": rng.choice(list(GuestType)),
+            "loyalty_points": 0,
+        })
+    with Session(engine) as session:
+        for i in range(0, len(rows), 10_000):
+            session.execute(insert(Guest), rows[i:i + 10_000])
+        session.commit()
+    return rows
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    # A dropped letter; trigram similarity forgives that, not every transposition
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def keystrokes(sample: List[dict], rng: random.Random) -> Dict[str, List[str]]:
+    """Queries by kind, as they would arrive while typing"""
+    queries = {"name": [], "email": [], "phone": [], "typo": []}
+    for guest in sample:
+        name = guest["name"].lower()
+        queries["name"] += [name[:n] for n in range(guest_search.MIN_QUERY_LENGTH, len(name) + 1)]
+        if guest["email"]:
+            queries["email"] += [guest["email"][:n] for n in range(3, 12)]
+        if guest["phone"]:
+            digits = guest["phone"].replace(" ", "")
+            queries["phone"] += [digits[:n] for n in range(4, len(digits) + 1)]
+        first, last = name.split()
+        if len(last) >= 5:
+            queries["typo"].append(f"{first} {_typo(last, rng)}")
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure typeahead guest search latency")
+    parser.add_argument("--db-url", help="Database with guests, or empty to fill (default: a temporary SQLite file)")
+    parser.add_argument("--guests", type=int, default=500_000, help="Profiles to generate into an empty database")
+    parser.add_argument("--sample", type=int, default=200, help="Guests whose details are typed")
+    parser.add_argument("--limit", type=int, default=guest_search.DEFAULT_LIMIT)
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="Fail if p95 per keystroke exceeds this")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "guests.db"))
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        existing = session.exec(select(func.count(Guest.id))).one()
+    if not existing:
+        started = time.perf_counter()
+        generate_guests(engine, args.guests, args.seed)
+        print(f"Generated {args.guests:,} guests in {time.perf_counter() - started:.1f} s")
+    with Session(engine) as session:
+        sample = [
+            {"name": g.name, "email": g.email, "phone": g.phone}
+            for g in session.exec(select(Guest).order_by(func.random()).limit(args.sample)).all()
+        ]
+
+    search = guest_search.for_engine(engine)
+    if isinstance(search, guest_search.MemoryGuestSearch):
+        search.build()
+        print(f"Built in-memory index in {search.build_ms:.0f} ms")
+
+    rng = random.Random(args.seed)
+    worst = 0.0
+    for kind, queries in keystrokes(sample, rng).items():
+        timings, empty = [], 0
+        for query in queries:
+            started = time.perf_counter()
+            if not search.search(query, args.limit):
+                empty += 1
+            timings.append((time.perf_counter() - started) * 1000)
+        if not timings:
+            continue
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        worst = max(worst, p95)
+        print(f"{kind:<6} {len(queries):>6} queries   p50 {statistics.median(timings):6.2f} ms   "
+              f"p95 {p95:6.2f} ms   max {max(timings):7.2f} ms   no match {empty}")
+
+    if worst > args.budget_ms:
+        print(f"REGRESSION p95 {worst:.2f} ms exceeds budget {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
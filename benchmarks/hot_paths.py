@@ -0,0 +1,169 @@
+"""
+Times the HotelSystem hot paths against a synthetic property and writes the
+results as JSON for regression comparison.
+
+    python -m benchmarks.hot_paths --rooms 1000 --reservations 1000000 --output bench.json
+    python -m benchmarks.hot_paths --db-url "postgresql://localhost/hotel_bench?sslmode=disable"
+    python -m benchmarks.hot_paths --compare bench.json
+
+The target database must be empty; without --db-url a fresh SQLite file is
+created in a temporary directory.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlmodel import create_engine
+from benchmarks.synthetic import FORWARD_DAYS, generate_property
+
+# Default repeats per operation; the listing calls are much heavier than the rest
+DEFAULT_REPEATS = {
+    "check_availability": 20,
+    "create_reservation": 50,
+    "get_room_stats": 20,
+    "get_all_reservations": 3,
+    "get_user_reservations": 50,
+    "verify_login": 50,
+}
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    k = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(k, len(ordered) - 1)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Millisecond statistics for a list of durations in seconds"""
+    ms = [s * 1000 for s in samples]
+    return {
+        "runs": len(ms),
+        "min_ms": round(min(ms), 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p95_ms": round(_percentile(ms, 95), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def time_op(fn: Callable[[int], object], repeats: int) -> Dict[str, float]:
+    samples = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def run(db_url: str, rooms: int, reservations: int, ops: Optional[List[str]] = None,
+        repeats: Optional[int] = None, seed: int = 42) -> dict:
+    from system import HotelSystem
+
+    connect_args = {"sslmode": "require"} if "postgresql" in db_url and "sslmode=" not in db_url else {}
+    started = time.perf_counter()
+    meta = generate_property(create_engine(db_url, connect_args=connect_args), rooms, reservations, seed=seed)
+    generate_seconds = time.perf_counter() - started
+
+    system = HotelSystem(db_url=db_url)
+    rng = random.Random(seed)
+    today = date.today()
+    password = "bench-password"
+    login_user = system.create_user("login@bench.example", password, "Login Bench")
+    room_ids = [r.id for r in system.check_availability(today + timedelta(days=FORWARD_DAYS + 30),
+                                                         today + timedelta(days=FORWARD_DAYS + 31))]
+    guest_id = system.create_guest("Bench Booker").id
+
+    def check_availability(i):
+        start = today + timedelta(days=rng.randint(1, 60))
+        system.check_availability(start, start + timedelta(days=rng.randint(1, 5)))
+
+    def create_reservation(i):
+        # Past the generated book, one room per call, so bookings never collide
+        start = today + timedelta(days=FORWARD_DAYS + 30 + i * 3)
+        system.create_reservation(guest_id, room_ids[i % len(room_ids)], start, start + timedelta(days=2))
+
+    operations = {
+        "check_availability": check_availability,
+        "create_reservation": create_reservation,
+        "get_room_stats": lambda i: system.get_room_stats(),
+        "get_all_reservations": lambda i: system.get_all_reservations(),
+        "get_user_reservations": lambda i: system.get_user_reservations(meta["heavy_user_id"]),
+        "verify_login": lambda i: system.verify_login(login_user.email, password),
+    }
+
+    results = {}
+    for name in ops or list(operations):
+        results[name] = time_op(operations[name], repeats or DEFAULT_REPEATS[name])
+        print(f"{name:<24} median {results[name]['median_ms']:>10.3f} ms   p95 {results[name]['p95_ms']:>10.3f} ms")
+
+    return {
+        "meta": {
+            "dialect": system.engine.dialect.name,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "generate_seconds": round(generate_seconds, 2),
+            **meta,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Operations whose median got slower than the baseline by more than `tolerance`"""
+    regressions = []
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        if stats["median_ms"] > base["median_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: median {stats['median_ms']:.3f} ms vs baseline {base['median_ms']:.3f} ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HotelSystem hot paths on a synthetic hotel")
+    parser.add_argument("--db-url", help="Empty target database (default: temporary SQLite file)")
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--reservations", type=int, default=100_000)
+    parser.add_argument("--ops", nargs="+", choices=list(DEFAULT_REPEATS), help="Only time these operations")
+    parser.add_argument("--repeats", type=int, help="Override the per-operation repeat count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline JSON; exit non-zero on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    db_url = args.db_url
+    if not db_url:
+        db_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="hotel_bench_"), "bench.db")
+        print(f"Using {db_url}")
+
+    report = run(db_url, args.rooms, args.reservations, args.ops, args.repeats, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
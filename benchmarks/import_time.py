@@ -0,0 +1,112 @@
+"""
+Guards the import cost of the domain layer. Each module is imported in a fresh
+interpreter with `-X importtime`; the run fails if a UI/LLM/heavy dependency
+gets pulled in at import time or if the median import time exceeds the budget.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --modules system night_audit --budget-ms 400
+    python -m benchmarks.import_time --output imports.json --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Modules the CLI, scripts and workers import without the web UI
+DEFAULT_MODULES = ["models", "system", "async_system", "night_audit"]
+
+# Must only load on first use (Streamlit pages, Gemini chat, rate pricing)
+FORBIDDEN = ["streamlit", "extra_streamlit_components", "google.generativeai", "numpy"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds of every module loaded by `import module`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    loaded = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        loaded[name.strip()] = int(cumulative_us)
+    return loaded
+
+
+def run(modules: List[str], repeats: int) -> dict:
+    results = {}
+    for module in modules:
+        samples = [measure(module) for _ in range(repeats)]
+        loaded = samples[0]
+        median_ms = statistics.median(s[module] for s in samples) / 1000
+        results[module] = {
+            "median_ms": round(median_ms, 1),
+            "modules_loaded": len(loaded),
+            "forbidden": [name for name in FORBIDDEN if name in loaded],
+        }
+        print(f"{module:<16} median {median_ms:>8.1f} ms   {len(loaded):>5} modules")
+    return {
+        "meta": {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def check(report: dict, budget_ms: Optional[float], baseline: Optional[dict], tolerance: float) -> List[str]:
+    """Everything that should fail the run"""
+    problems = []
+    for module, stats in report["results"].items():
+        if stats["forbidden"]:
+            problems.append(f"{module}: imports {', '.join(stats['forbidden'])} at load time")
+        if budget_ms is not None and stats["median_ms"] > budget_ms:
+            problems.append(f"{module}: {stats['median_ms']:.1f} ms exceeds budget {budget_ms:.1f} ms")
+        base = (baseline or {}).get("results", {}).get(module)
+        if base and stats["median_ms"] > base["median_ms"] * (1 + tolerance):
+            problems.append(f"{module}: {stats['median_ms']:.1f} ms vs baseline {base['median_ms']:.1f} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and guard domain-layer import time")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="Fail if a module's median import time exceeds this")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline JSON; exit non-zero on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = run(args.modules, args.repeats)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    problems = check(report, args.budget_ms, baseline, args.tolerance)
+    for line in problems:
+        print(f"REGRESSION {line}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Compares primary-key layouts on a reservation-shaped table: random UUIDv4
+strings (the old keys), UUIDv7 strings and UUIDv7 in UUIDKey columns (the
+current keys). Rows go in as booking-sized transactions; the report has
+insert throughput and the size of the table and each index.
+
+    python -m benchmarks.key_layout
+    python -m benchmarks.key_layout --rows 2000000 --db-url postgresql://.../bench
+    python -m benchmarks.key_layout --output keys.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict
+from sqlalchemy import Column, Date, Float, Index, MetaData, String, Table, create_engine, insert, text
+from ids import UUIDKey, new_id
+
+# name -> (column type, id factory)
+LAYOUTS: Dict[str, tuple] = {
+    "uuid4-text": (String, lambda: str(uuid.uuid4())),
+    "uuid7-text": (String, new_id),
+    "uuid7-key": (UUIDKey, new_id),
+}
+
+
+def _table(metadata: MetaData, name: str, key_type) -> Table:
+    # Same key columns and indexes as Reservation
+    table_name = f"keybench_{name.replace('-', '_')}"
+    return Table(
+        table_name, metadata,
+        Column("id", key_type, primary_key=True),
+        Column("guest_id", key_type, nullable=False),
+        Column("room_id", key_type, nullable=False),
+        Column("check_in", Date, nullable=False),
+        Column("check_out", Date, nullable=False),
+        Column("total_price", Float, nullable=False),
+        Index(f"ix_{table_name}_guest_id", "guest_id"),
+        Index(f"ix_{table_name}_room_dates", "room_id", "check_in", "check_out"),
+    )
+
+
+def _sizes(conn, table: Table) -> Dict[str, int]:
+    """Bytes used by the table and each of its indexes"""
+    if conn.dialect.name == "postgresql":
+        rows = conn.execute(text(
+            "SELECT c.relname, pg_relation_size(c.oid) FROM pg_class c "
+            "WHERE c.relname = :t OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = CAST(:t AS regclass))"
+        ), {"t": table.name})
+    else:
+        # SQLite names the primary key index sqlite_autoindex_<table>_1
+        rows = conn.execute(text(
+            "SELECT d.name, SUM(d.pgsize) FROM dbstat d JOIN sqlite_schema s ON s.name = d.name "
+            "WHERE s.tbl_name = :t GROUP BY d.name"
+        ), {"t": table.name})
+    return {name: int(size) for name, size in rows}
+
+
+def run_layout(engine, name: str, rows: int, batch_size: int, guests: int, rooms: int, seed: int) -> dict:
+    key_type, make_id = LAYOUTS[name]
+    metadata = MetaData()
+    table = _table(metadata, name, key_type)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    rng = random.Random(seed)
+    guest_ids = [make_id() for _ in range(guests)]
+    room_ids = [make_id() for _ in range(rooms)]
+    start = date.today()
+    elapsed = 0.0
+    for offset in range(0, rows, batch_size):
+        batch = []
+        for _ in range(min(batch_size, rows - offset)):
+            check_in = start + timedelta(days=rng.randrange(365))
+            batch.append({
+                "id": make_id(), "guest_id": rng.choice(guest_ids), "room_id": rng.choice(room_ids),
+                "check_in": check_in, "check_out": check_in + timedelta(days=rng.randint(1, 7)),
+                "total_price": 800.0,
+            })
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(insert(table), batch)
+        elapsed += time.perf_counter() - started
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"ANALYZE {table.name}"))
+        sizes = _sizes(conn, table)
+    metadata.drop_all(engine)
+    table_bytes = sizes.pop(table.name, 0)
+    result = {
+        "rows_per_s": round(rows / elapsed),
+        "table_bytes": table_bytes,
+        "index_bytes": sum(sizes.values()),
+        "indexes": sizes,
+    }
+    print(f"{name:<12} {result['rows_per_s']:>9,} rows/s   table {table_bytes / 2**20:>8.1f} MiB   "
+          f"indexes {result['index_bytes'] / 2**20:>8.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare key layouts by insert throughput and index size")
+    parser.add_argument("--db-url", help="Database to benchmark in (default: a temporary SQLite file)")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per transaction")
+    parser.add_argument("--guests", type=int, default=100_000)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS), choices=list(LAYOUTS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    db_url = args.db_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "keys.db")
+    engine = create_engine(db_url)
+    results = {
+        name: run_layout(engine, name, args.rows, args.batch_size, args.guests, args.rooms, args.seed)
+        for name in args.layouts
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "meta": {
+                    "generated_at": datetime.now().isoformat(timespec="seconds"),
+                    "dialect": engine.dialect.name,
+                    "python": platform.python_version(),
+                    "rows": args.rows,
+                    "batch_size": args.batch_size,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
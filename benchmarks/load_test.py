@@ -0,0 +1,228 @@
+"""
+Concurrent booking load generator.
+
+Simulated guests arrive as a Poisson process and each one registers, logs in,
+searches availability, books a room and views their reservations. Reports
+p50/p95/p99 latency per operation, bookings per second, lock waits and
+double-booking violations.
+
+    python -m benchmarks.load_test --guests 500 --rate 50 --workers 16
+    python -m benchmarks.load_test --mode process --db-url "postgresql://localhost/hotel_load?sslmode=disable"
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from benchmarks.hot_paths import _percentile
+from models import Reservation, ReservationStatus, RoomType
+
+OPERATIONS = ["register", "login", "search", "guest", "book", "history"]
+
+# Error text that means "waited on a lock" rather than a real failure
+LOCK_ERRORS = ("database is locked", "deadlock detected", "could not serialize", "lock timeout")
+
+_worker_system = None
+
+
+def _init_worker(db_url: str):
+    global _worker_system
+    from system import HotelSystem
+    _worker_system = HotelSystem(db_url=db_url)
+
+
+def _is_lock_error(exc: Exception) -> bool:
+    return any(text in str(exc).lower() for text in LOCK_ERRORS)
+
+
+def simulate_guest(guest_no: int, run_id: str, window_days: int, max_retries: int = 5, system=None) -> dict:
+    """One guest's full journey; returns timings and counters"""
+    system = system or _worker_system
+    rng = random.Random(f"{run_id}-{guest_no}")
+    samples: List[Tuple[str, float, bool]] = []
+    outcome = {"samples": samples, "lock_waits": 0, "lock_wait_seconds": 0.0, "booked": False}
+
+    def timed(op: str, fn):
+        for attempt in range(max_retries + 1):
+            started = time.perf_counter()
+            try:
+                result = fn()
+                samples.append((op, time.perf_counter() - started, True))
+                return result
+            except OperationalError as e:
+                if not _is_lock_error(e) or attempt == max_retries:
+                    samples.append((op, time.perf_counter() - started, False))
+                    return None
+                waited = time.perf_counter() - started
+                backoff = 0.01 * (2 ** attempt) * rng.random()
+                time.sleep(backoff)
+                outcome["lock_waits"] += 1
+                outcome["lock_wait_seconds"] += waited + backoff
+            except Exception:
+                samples.append((op, time.perf_counter() - started, False))
+                return None
+
+    email = f"load-{run_id}-{guest_no}@load.example"
+    password = "load-test-pw"
+    name = f"Load Guest {guest_no}"
+    user = timed("register", lambda: system.create_user(email, password, name))
+    if not user:
+        return outcome
+    if not timed("login", lambda: system.verify_login(email, password)):
+        return outcome
+
+    check_in = date.today() + timedelta(days=rng.randint(1, window_days))
+    check_out = check_in + timedelta(days=rng.choice([1, 1, 2, 2, 3, 4, 7]))
+    room_type = rng.choice(list(RoomType))
+    rooms = timed("search", lambda: system.check_availability(check_in, check_out, room_type))
+    if rooms:
+        # Several guests pick from the same short list, which is what creates contention
+        room = rng.choice(rooms[:3])
+        guest = timed("guest", lambda: system.get_or_create_guest_for_user(user.id, name, email))
+        if not guest:
+            return outcome
+        booking = timed("book", lambda: system.create_reservation(guest.id, room.id, check_in, check_out))
+        outcome["booked"] = booking is not None
+
+    timed("history", lambda: system.get_user_reservations(user.id))
+    return outcome
+
+
+def count_double_bookings(engine) -> int:
+    """Pairs of active reservations that overlap on the same room"""
+    other = aliased(Reservation)
+    active = [ReservationStatus.CONFIRMED, ReservationStatus.CHECKED_IN]
+    statement = select(func.count()).select_from(Reservation).join(other, and_(
+        Reservation.room_id == other.room_id,
+        Reservation.id < other.id,
+        Reservation.check_in < other.check_out,
+        other.check_in < Reservation.check_out,
+    )).where(Reservation.status.in_(active), other.status.in_(active))
+    with Session(engine) as session:
+        return session.exec(statement).one()
+
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in samples]
+    if not ms:
+        return {"count": 0}
+    return {
+        "count": len(ms),
+        "p50_ms": round(_percentile(ms, 50), 3),
+        "p95_ms": round(_percentile(ms, 95), 3),
+        "p99_ms": round(_percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def run(db_url: str, guests: int, rate: float, workers: int, mode: str = "thread",
+        window_days: int = 30, seed_rooms: Optional[int] = None) -> dict:
+    from system import HotelSystem
+
+    if seed_rooms:
+        from benchmarks.synthetic import generate_property
+        generate_property(_engine_for(db_url), rooms=seed_rooms, reservations=0)
+    system = HotelSystem(db_url=db_url)
+    before = count_double_bookings(system.engine)
+
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(run_id)
+    executor: Executor
+    if mode == "process":
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(db_url,))
+        submit = lambda i: executor.submit(simulate_guest, i, run_id, window_days)
+    else:
+        executor = ThreadPoolExecutor(workers)
+        submit = lambda i: executor.submit(simulate_guest, i, run_id, window_days, system=system)
+
+    started = time.perf_counter()
+    futures = []
+    with executor:
+        for i in range(guests):
+            futures.append(submit(i))
+            if rate > 0:
+                time.sleep(rng.expovariate(rate))
+        outcomes = [f.result() for f in as_completed(futures)]
+    elapsed = time.perf_counter() - started
+
+    by_op: Dict[str, List[float]] = {op: [] for op in OPERATIONS}
+    errors: Dict[str, int] = {op: 0 for op in OPERATIONS}
+    for outcome in outcomes:
+        for op, seconds, ok in outcome["samples"]:
+            by_op[op].append(seconds)
+            if not ok:
+                errors[op] += 1
+
+    bookings = sum(o["booked"] for o in outcomes)
+    return {
+        "meta": {
+            "dialect": system.engine.dialect.name,
+            "mode": mode,
+            "workers": workers,
+            "guests": guests,
+            "arrival_rate": rate,
+            "elapsed_seconds": round(elapsed, 3),
+        },
+        "latency": {op: {**_latency(by_op[op]), "errors": errors[op]} for op in OPERATIONS},
+        "bookings": bookings,
+        "bookings_per_second": round(bookings / elapsed, 2) if elapsed else 0,
+        "lock_waits": sum(o["lock_waits"] for o in outcomes),
+        "lock_wait_seconds": round(sum(o["lock_wait_seconds"] for o in outcomes), 3),
+        "double_bookings": count_double_bookings(system.engine) - before,
+    }
+
+
+def _engine_for(db_url: str):
+    from sqlmodel import create_engine
+    connect_args = {"sslmode": "require"} if "postgresql" in db_url and "sslmode=" not in db_url else {}
+    return create_engine(db_url, connect_args=connect_args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive HotelSystem with concurrent simulated guests")
+    parser.add_argument("--db-url", help="Target database (default: temporary SQLite file)")
+    parser.add_argument("--guests", type=int, default=200, help="Simulated guests in the run")
+    parser.add_argument("--rate", type=float, default=20.0, help="Mean guest arrivals per second (0 = all at once)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--window-days", type=int, default=30, help="Guests book within this many days")
+    parser.add_argument("--seed-rooms", type=int, help="Seed an empty database with this many rooms")
+    parser.add_argument("--output", help="Write the report JSON here")
+    args = parser.parse_args()
+
+    db_url = args.db_url
+    if not db_url:
+        db_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="hotel_load_"), "load.db")
+        print(f"Using {db_url}")
+
+    report = run(db_url, args.guests, args.rate, args.workers, args.mode, args.window_days, args.seed_rooms)
+
+    print(f"{'operation':<10} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'errors':>7}")
+    for op, stats in report["latency"].items():
+        if stats["count"]:
+            print(f"{op:<10} {stats['count']:>7} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} "
+                  f"{stats['p99_ms']:>10.2f} {stats['errors']:>7}")
+    print(f"Bookings: {report['bookings']} ({report['bookings_per_second']}/s over {report['meta']['elapsed_seconds']}s)")
+    print(f"Lock waits: {report['lock_waits']} ({report['lock_wait_seconds']}s)")
+    print(f"Double bookings: {report['double_bookings']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if report["double_bookings"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Synthetic hotel generator: rooms, guests, users and a multi-year reservation
+history with realistic stay lengths, gaps and statuses, bulk-inserted in chunks.
+"""
+import random
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, select
+from models import Room, RoomType, Guest, GuestType, Reservation, ReservationStatus, User
+from ids import new_id
+
+CHUNK_SIZE = 10_000
+
+# (share of rooms, base price)
+ROOM_MIX = [
+    (RoomType.STANDARD, 0.6, 800.0),
+    (RoomType.DELUXE, 0.3, 1200.0),
+    (RoomType.SUITE, 0.1, 2000.0),
+]
+
+# Most stays are short; weights for 1..14 nights
+STAY_WEIGHTS = [30, 25, 15, 10, 6, 4, 4, 1, 1, 1, 1, 1, 0.5, 0.5]
+MEAN_STAY = sum((i + 1) * w for i, w in enumerate(STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+MEAN_GAP = 1.5
+
+# How far ahead of today the generated book runs
+FORWARD_DAYS = 180
+
+
+def _insert_chunks(session: Session, model, rows: List[dict]):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        session.execute(insert(model), rows[i:i + CHUNK_SIZE])
+
+
+def generate_property(engine, rooms: int = 1000, reservations: int = 1_000_000,
+                      guests: Optional[int] = None, seed: int = 42) -> dict:
+    """Fill an empty database with a synthetic property.
+
+    Each room gets back-to-back stays with short random gaps, ending about
+    FORWARD_DAYS ahead of today, so there are no double bookings and the
+    history depth grows with the reservation count. Past stays are checked
+    out (a few cancelled), current ones checked in and future ones confirmed.
+    Returns the ids the benchmarks need (a heavy user, sample rooms).
+    """
+    rng = random.Random(seed)
+    guests = guests or max(reservations // 5, 1)
+    today = date.today()
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        if session.exec(select(Room.id).limit(1)).first():
+            raise ValueError("Target database already has rooms; use an empty database")
+
+        room_rows = []
+        for r_type, share, price in ROOM_MIX:
+            for _ in range(max(int(rooms * share), 1)):
+                room_rows.append({"type": r_type, "price_per_night": price})
+        room_rows = room_rows[:rooms]
+        for i, row in enumerate(room_rows):
+            floor, slot = divmod(i, 50)
+            row.update(id=new_id(), number=f"{floor + 1}{slot + 1:02d}", features="")
+        _insert_chunks(session, Room, room_rows)
+
+        # Half the guest profiles belong to registered users
+        user_rows, guest_rows = [], []
+        for i in range(guests):
+            user_id = None
+            if i % 2 == 0:
+                user_id = new_id()
+                user_rows.append({
+                    "id": user_id,
+                    "email": f"user{i}@bench.example",
+                    "password_hash": "x$x",
+                    "full_name": f"Bench User {i}",
+                    "created_at": datetime.now(),
+                    "email_verified": True,
+                })
+            guest_rows.append({
+                "id": new_id(),
+                "user_id": user_id,
+                "name": f"Bench Guest {i}",
+                "email": f"guest{i}@bench.example",
+                "type": rng.choice(list(GuestType)),
+                "loyalty_points": 0,
+            })
+        _insert_chunks(session, User, user_rows)
+        _insert_chunks(session, Guest, guest_rows)
+
+        # A loyalty guest gets a skewed share of stays, for the history benchmark
+        heavy_guest = guest_rows[0]["id"]
+        guest_ids = [g["id"] for g in guest_rows]
+
+        per_room = max(reservations // len(room_rows), 1)
+        span = int(per_room * (MEAN_STAY + MEAN_GAP))
+        first_day = today + timedelta(days=FORWARD_DAYS - span)
+        stay_lengths = list(range(1, len(STAY_WEIGHTS) + 1))
+
+        batch, written = [], 0
+        for room in room_rows:
+            day = first_day + timedelta(days=rng.randint(0, 3))
+            for _ in range(per_room):
+                if written >= reservations:
+                    break
+                nights = rng.choices(stay_lengths, STAY_WEIGHTS)[0]
+                check_in, check_out = day, day + timedelta(days=nights)
+                if check_out <= today:
+                    status = ReservationStatus.CANCELLED if rng.random() < 0.08 else ReservationStatus.CHECKED_OUT
+                elif check_in <= today:
+                    status = ReservationStatus.CHECKED_IN
+                else:
+                    status = ReservationStatus.CONFIRMED
+                batch.append({
+                    "id": new_id(),
+                    "guest_id": heavy_guest if rng.random() < 0.001 else rng.choice(guest_ids),
+                    "room_id": room["id"],
+                    "check_in": check_in,
+                    "check_out": check_out,
+                    "total_price": room["price_per_night"] * nights,
+                    "status": status,
+                    "created_at": datetime.combine(check_in - timedelta(days=rng.randint(0, 90)), datetime.min.time()),
+                })
+                written += 1
+                day = check_out + timedelta(days=int(rng.expovariate(1 / MEAN_GAP)))
+                if len(batch) >= CHUNK_SIZE:
+                    _insert_chunks(session, Reservation, batch)
+                    batch = []
+        _insert_chunks(session, Reservation, batch)
+        session.commit()
+
+    return {
+        "rooms": len(room_rows),
+        "guests": len(guest_rows),
+        "users": len(user_rows),
+        "reservations": written,
+        "heavy_user_id": guest_rows[0]["user_id"],
+        "first_day": first_day.isoformat(),
+    }
@@ -0,0 +1,239 @@
+"""
+Inventory change feed. Every write that changes availability or prices, or
+creates a guest, adds InventoryChange rows in its own transaction, so the
+log never disagrees with the data. Replicas of the app keep a ChangeCursor
+and poll the log from the last sequence they saw; what comes back tells
+their in-process caches (the rate calendar, the guest search index,
+anything subscribed) exactly what to update.
+
+On Postgres each logging transaction also sends a NOTIFY, which is delivered
+on commit; `ChangeFeed.wait()` blocks on it so a follower can poll right
+away instead of on a timer. Elsewhere `wait()` just sleeps.
+
+    python changefeed.py --follow            # print changes as they happen
+    python changefeed.py --prune-days 7      # from cron: drop old entries
+"""
+import argparse
+import os
+import select as io_select
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import delete, func, insert, text
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from models import InventoryChange, ChangeKind, RoomType, RateRule, DEFAULT_PROPERTY
+from ids import short_id
+
+# Postgres NOTIFY channel; the payload is the property id
+CHANNEL = "inventory_changes"
+
+# A missing sequence number is waited for this long before it counts as a rollback
+DEFAULT_GAP_SECONDS = 30.0
+
+# Beyond this a jump in sequence numbers is not tracked as gaps (Postgres skips ahead after a crash)
+_MAX_GAP = 1000
+
+
+def change(kind: ChangeKind, property_id: str, entity_id: Optional[str] = None, room_type: Optional[RoomType] = None,
+           check_in: Optional[date] = None, check_out: Optional[date] = None) -> dict:
+    """One log row, for log_changes"""
+    return {
+        "property_id": property_id, "kind": kind, "entity_id": entity_id, "room_type": room_type,
+        "check_in": check_in, "check_out": check_out, "changed_at": datetime.now(),
+    }
+
+
+def rate_rule_change(rule: RateRule) -> dict:
+    """Log row for adding or removing a rate rule; the rule's end_date is inclusive"""
+    check_out = rule.end_date + timedelta(days=1) if rule.end_date else None
+    return change(ChangeKind.RATE, rule.property_id, rule.id, rule.room_type, rule.start_date, check_out)
+
+
+def log_changes(session, changes: List[dict]):
+    """Append `changes` inside the caller's transaction (Session or Connection); commit is the caller's"""
+    if not changes:
+        return
+    session.execute(insert(InventoryChange), changes)
+    dialect = session.get_bind().dialect if isinstance(session, OrmSession) else session.dialect
+    if dialect.name == "postgresql":
+        # Queued until commit and dropped on rollback, like the rows themselves
+        for property_id in {c["property_id"] for c in changes}:
+            session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": property_id})
+
+
+class ChangeFeed:
+    """Reads one property's change log.
+
+    Like RateCalendar, reads take an optional session so AsyncHotelSystem can
+    run them through `run_sync` (it passes engine=None).
+    """
+
+    def __init__(self, engine, property_id: str = DEFAULT_PROPERTY):
+        self.engine = engine
+        self.property_id = property_id
+        self.is_postgres = engine is not None and engine.dialect.name == "postgresql"
+        self._listener = None
+
+    def head(self, session: Optional[Session] = None) -> int:
+        """Latest sequence number (0 for an empty log)"""
+        if session is None:
+            with Session(self.engine) as session:
+                return self.head(session)
+        return session.exec(select(func.max(InventoryChange.seq))).one() or 0
+
+    def since(self, seq: int, limit: int = 1000, session: Optional[Session] = None) -> List[InventoryChange]:
+        """Changes of every property after `seq`, oldest first.
+
+        The sequence is shared by all properties in the database, so readers
+        need every entry to tell a gap from another property's change.
+        """
+        if session is None:
+            with Session(self.engine) as session:
+                return self.since(seq, limit, session)
+        return session.exec(
+            select(InventoryChange).where(InventoryChange.seq > seq).order_by(InventoryChange.seq).limit(limit)
+        ).all()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until a change is announced or `timeout` passes; True if one was announced.
+
+        Uses LISTEN on a dedicated connection on Postgres (psycopg2); sleeps elsewhere.
+        """
+        if not self.is_postgres:
+            time.sleep(timeout)
+            return False
+        if self._listener is None:
+            raw = self.engine.raw_connection()
+            raw.driver_connection.autocommit = True
+            with raw.driver_connection.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            self._listener = raw
+        conn = self._listener.driver_connection
+        if not conn.notifies and io_select.select([conn], [], [], timeout) == ([], [], []):
+            return False
+        conn.poll()
+        mine = any(n.payload == self.property_id for n in conn.notifies)
+        conn.notifies.clear()
+        return mine
+
+    def close(self):
+        if self._listener is not None:
+            # Invalidate rather than return it: the pool must not hand out a LISTENing connection
+            self._listener.invalidate()
+            self._listener = None
+
+    def prune(self, before: datetime) -> int:
+        """Drop entries logged before `before`; cursors that far behind should resync from head()"""
+        with Session(self.engine) as session:
+            rows = session.execute(delete(InventoryChange).where(
+                InventoryChange.property_id == self.property_id,
+                InventoryChange.changed_at < before,
+            )).rowcount
+            session.commit()
+            return rows
+
+
+class ChangeCursor:
+    """Incremental reader of one property's changes for one process.
+
+    Sequence numbers are taken at insert but become visible at commit, so a
+    slow transaction can commit a lower number after a higher one was read.
+    Skipped numbers are re-checked on every poll until they show up or
+    `gap_seconds` passes (a rolled-back transaction never fills its gap).
+
+    Several threads may poll one cursor (Streamlit reruns share a system);
+    each new entry is returned to exactly one of them.
+    """
+
+    def __init__(self, feed: ChangeFeed, after: Optional[int] = None, gap_seconds: float = DEFAULT_GAP_SECONDS):
+        self.feed = feed
+        # None: start from the head at the first poll
+        self.last_seq = after
+        self.gap_seconds = gap_seconds
+        # missing seq -> when it was first noticed
+        self._gaps: Dict[int, float] = {}
+        # Covers last_seq and _gaps only, never a read: async callers poll through run_sync,
+        # where waiting on a lock held across a query would block the event loop
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[List[InventoryChange]], None]] = []
+
+    def subscribe(self, callback: Callable[[List[InventoryChange]], None]):
+        """Call `callback` with every non-empty batch returned by poll()"""
+        self._listeners.append(callback)
+
+    def poll(self, limit: int = 1000, session: Optional[Session] = None) -> List[InventoryChange]:
+        """Changes committed since the last poll, oldest first"""
+        with self._lock:
+            last_seq = self.last_seq
+            floor = min(self._gaps) - 1 if self._gaps else last_seq
+        if last_seq is None:
+            head = self.feed.head(session)
+            with self._lock:
+                if self.last_seq is None:
+                    self.last_seq = head
+            return []
+        entries = self.feed.since(floor, limit, session)
+        now = time.monotonic()
+        fresh = []
+        with self._lock:
+            # Another poll may have applied some of these already; those are skipped here
+            for entry in entries:
+                if entry.seq <= self.last_seq:
+                    if self._gaps.pop(entry.seq, None) is None:
+                        continue
+                else:
+                    if entry.seq - self.last_seq <= _MAX_GAP:
+                        for missing in range(self.last_seq + 1, entry.seq):
+                            self._gaps[missing] = now
+                    self.last_seq = entry.seq
+                if entry.property_id == self.feed.property_id:
+                    fresh.append(entry)
+            self._gaps = {seq: seen for seq, seen in self._gaps.items() if now - seen < self.gap_seconds}
+        if fresh:
+            for callback in self._listeners:
+                callback(fresh)
+        return fresh
+
+
+def format_change(entry: InventoryChange) -> str:
+    span = f" {entry.check_in}..{entry.check_out or ''}" if entry.check_in else ""
+    room_type = f" {entry.room_type.value}" if entry.room_type else ""
+    entity = f" {short_id(entry.entity_id)}" if entry.entity_id else ""
+    return f"#{entry.seq} {entry.changed_at:%H:%M:%S} {entry.kind.value}{room_type}{span}{entity}"
+
+
+if __name__ == "__main__":
+    from system import HotelSystem
+
+    parser = argparse.ArgumentParser(description="Follow or prune the inventory change log")
+    parser.add_argument("--follow", action="store_true", help="Print new changes until interrupted")
+    parser.add_argument("--after", type=int, help="Start after this sequence (default: current head)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between polls without NOTIFY")
+    parser.add_argument("--prune-days", type=int, help="Delete entries older than this many days")
+    parser.add_argument("--property", default=DEFAULT_PROPERTY)
+    args = parser.parse_args()
+
+    system = HotelSystem(db_url=os.environ.get("DATABASE_URL"), property_id=args.property)
+    feed = ChangeFeed(system.engine, system.property_id)
+    if args.prune_days is not None:
+        rows = feed.prune(datetime.now() - timedelta(days=args.prune_days))
+        print(f"Pruned {rows} change log entries older than {args.prune_days} days")
+    if args.follow:
+        cursor = ChangeCursor(feed, args.after)
+        if args.after is None:
+            # The first poll only finds the head; with --after it returns entries to print
+            cursor.poll()
+        print(f"Following {args.property} from #{cursor.last_seq}")
+        try:
+            while True:
+                for entry in cursor.poll():
+                    print(format_change(entry))
+                feed.wait(args.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            feed.close()
+    elif args.prune_days is None:
+        print(f"{args.property}: change log head #{feed.head()}")
@@ -4,7 +4,6 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from typing import Optional
-import streamlit as st
 
 class EmailService:
     """Handles email sending for OTP verification"""
@@ -18,6 +17,7 @@ class EmailService:
     def send_otp_email(recipient_email: str, otp: str, user_name: str) -> bool:
         """Send OTP verification email via Gmail SMTP"""
         try:
+            import streamlit as st
             # Get email credentials from Streamlit secrets
             smtp_server = st.secrets.get("email", {}).get("smtp_server", "smtp.gmail.com")
             smtp_port = st.secrets.get("email", {}).get("smtp_port", 587)
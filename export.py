@@ -0,0 +1,233 @@
+"""
+Streaming reservation export for accounting: Reservation joined with Guest and
+Room, written as CSV, JSONL or Parquet while rows arrive from a server-side
+cursor. Memory stays flat regardless of row count.
+
+    python export.py --output reservations.csv.gz --from 2026-01-01 --to 2026-01-31
+    python export.py --output departures.jsonl --status "Checked Out" --live-only
+    python export.py --output extract.parquet --date-field created_at
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from models import Guest, Room, Reservation, ReservationStatus, ExportReport, DEFAULT_PROPERTY
+import queries
+
+FORMATS = ["csv", "jsonl", "parquet"]
+
+# Rows fetched per round trip, and written per chunk / Parquet row group
+DEFAULT_CHUNK_SIZE = 10_000
+
+COLUMNS = [
+    "reservation_id", "property_id", "status", "check_in", "check_out", "nights", "total_price", "created_at",
+    "guest_id", "guest_name", "guest_email", "guest_phone", "guest_type",
+    "room_id", "room_number", "room_type", "room_price_per_night",
+]
+
+
+def _bound(day: date, date_field: str):
+    # created_at is a timestamp; compare it against midnight
+    return datetime.combine(day, datetime.min.time()) if date_field == "created_at" else day
+
+
+def export_statement(property_id: str, start: Optional[date] = None, end: Optional[date] = None,
+                     statuses: Optional[Sequence[ReservationStatus]] = None,
+                     date_field: str = "check_out", include_archived: bool = True):
+    """Reservation x Guest x Room rows for one property, filtered on `date_field` in [start, end]"""
+    if date_field not in ("check_in", "check_out", "created_at"):
+        raise ValueError("date_field must be check_in, check_out or created_at")
+    r = queries.reservation_history() if include_archived else Reservation.__table__
+    statement = (
+        select(
+            r.c.id, r.c.property_id, r.c.status, r.c.check_in, r.c.check_out, r.c.total_price, r.c.created_at,
+            Guest.id, Guest.name, Guest.email, Guest.phone, Guest.type,
+            Room.id, Room.number, Room.type, Room.price_per_night,
+        )
+        .select_from(r)
+        .join(Guest, r.c.guest_id == Guest.id)
+        .join(Room, r.c.room_id == Room.id)
+        .where(r.c.property_id == property_id)
+    )
+    column = r.c[date_field]
+    if start:
+        statement = statement.where(column >= _bound(start, date_field))
+    if end:
+        statement = statement.where(column < _bound(end + timedelta(days=1), date_field))
+    if statuses:
+        statement = statement.where(r.c.status.in_(list(statuses)))
+    # A stable order makes consecutive extracts diffable
+    return statement.order_by(column, r.c.id)
+
+
+# Enum columns (status, guest type, room type) in export_statement's select
+_ENUMS = (2, 11, 14)
+
+
+def _records(chunk, as_text: bool) -> List[list]:
+    """Plain values in COLUMNS order; dates become ISO strings for the text formats"""
+    records = []
+    for row in chunk:
+        values = list(row)
+        for i in _ENUMS:
+            values[i] = values[i].value
+        check_in, check_out, created_at = values[3], values[4], values[6]
+        values.insert(5, (check_out - check_in).days)
+        if as_text:
+            values[3], values[4] = check_in.isoformat(), check_out.isoformat()
+            values[7] = created_at.isoformat() if created_at else None
+        records.append(values)
+    return records
+
+
+class _CsvWriter:
+    def __init__(self, f):
+        self.writer = csv.writer(f)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, records: List[list]):
+        self.writer.writerows(records)
+
+
+class _JsonlWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, records: List[list]):
+        self.f.writelines(
+            json.dumps(dict(zip(COLUMNS, record)), ensure_ascii=False) + "\n"
+            for record in records
+        )
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, compression: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+        self.pa = pa
+        string, day, money = pa.string(), pa.date32(), pa.float64()
+        self.schema = pa.schema([
+            ("reservation_id", string), ("property_id", string), ("status", string),
+            ("check_in", day), ("check_out", day), ("nights", pa.int32()), ("total_price", money),
+            ("created_at", pa.timestamp("us")),
+            ("guest_id", string), ("guest_name", string), ("guest_email", string), ("guest_phone", string),
+            ("guest_type", string),
+            ("room_id", string), ("room_number", string), ("room_type", string), ("room_price_per_night", money),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, records: List[list]):
+        columns = list(zip(*records))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+def format_for(path: str) -> str:
+    """Infer the export format from a file name like extract.csv.gz"""
+    name = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(name)[1].lstrip(".")
+    if ext not in FORMATS:
+        raise ValueError(f"Cannot infer export format from {path!r}; use one of {', '.join(FORMATS)}")
+    return ext
+
+
+def write_export(chunks: Iterable, path: str, fmt: str, compress: bool = False) -> int:
+    """Write row chunks to `path`; the file only appears once it is complete"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; use one of {', '.join(FORMATS)}")
+    tmp_path = path + ".partial"
+    rows = 0
+    try:
+        if fmt == "parquet":
+            # Parquet compresses per column chunk; wrapping it in gzip would make it unreadable
+            writer = _ParquetWriter(tmp_path, "gzip" if compress else "snappy")
+            try:
+                for chunk in chunks:
+                    records = _records(chunk, as_text=False)
+                    if records:
+                        writer.write(records)
+                        rows += len(records)
+            finally:
+                writer.close()
+        else:
+            opener = gzip.open if compress else open
+            with opener(tmp_path, "wt", encoding="utf-8", newline="") as f:
+                writer = _CsvWriter(f) if fmt == "csv" else _JsonlWriter(f)
+                for chunk in chunks:
+                    records = _records(chunk, as_text=True)
+                    writer.write(records)
+                    rows += len(records)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return rows
+
+
+def export_reservations(engine, path: str, fmt: Optional[str] = None, property_id: str = DEFAULT_PROPERTY,
+                        start: Optional[date] = None, end: Optional[date] = None,
+                        statuses: Optional[Sequence[ReservationStatus]] = None,
+                        date_field: str = "check_out", include_archived: bool = True,
+                        compress: Optional[bool] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ExportReport:
+    """Stream matching reservations to a file.
+
+    `engine` may also be an open connection, as inside AsyncConnection.run_sync.
+    Rows come from a server-side cursor (`stream_results`) in chunks of
+    `chunk_size`, and each chunk is written before the next is fetched.
+    The format defaults to the file extension, and a `.gz` suffix turns on compression.
+    """
+    fmt = fmt or format_for(path)
+    compress = path.endswith(".gz") if compress is None else compress
+    statement = export_statement(property_id, start, end, statuses, date_field, include_archived)
+    started = time.perf_counter()
+    with nullcontext(engine) if isinstance(engine, Connection) else engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(statement)
+        rows = write_export(result.partitions(), path, fmt, compress)
+    return ExportReport(
+        path=path,
+        format=fmt,
+        compressed=compress,
+        rows=rows,
+        bytes=os.path.getsize(path),
+        duration_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+if __name__ == "__main__":
+    from system import HotelSystem
+
+    parser = argparse.ArgumentParser(description="Export reservations for accounting")
+    parser.add_argument("--output", required=True, help="File to write; format from extension (.csv, .jsonl, .parquet, optional .gz)")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="First date (inclusive)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="Last date (inclusive)")
+    parser.add_argument("--date-field", default="check_out", choices=["check_in", "check_out", "created_at"])
+    parser.add_argument("--status", action="append", type=ReservationStatus, help="Repeat for several statuses")
+    parser.add_argument("--live-only", action="store_true", help="Skip archived reservations")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Compress (implied by a .gz output)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--property", default=DEFAULT_PROPERTY)
+    args = parser.parse_args()
+
+    system = HotelSystem(db_url=os.environ.get("DATABASE_URL"), property_id=args.property)
+    report = export_reservations(
+        system.replicas.for_read(), args.output, args.format, system.property_id, args.start, args.end,
+        args.status, args.date_field, not args.live_only, args.gzip, args.chunk_size,
+    )
+    print(f"Exported {report.rows} reservations to {report.path} ({report.bytes:,} bytes) in {report.duration_ms:.1f} ms")
@@ -0,0 +1,456 @@
+"""
+Typeahead guest search for the front desk: partial name, email or phone,
+ranked, top-k.
+
+A guest matches when every word of the query starts a word of their name
+or, for digits, appears anywhere in their phone number; a one-word query
+may also start their email address (an address is typed as one word). One
+word must be at least MIN_QUERY_LENGTH characters long. A shorter word only
+matches the start of the name or of a part of it after a space, the starts
+trigram indexes can find. Both backends find the same matches and rank them
+with the same tiers. Only when fewer than `limit` guests match do they add
+typo matches, each with its own similarity measure.
+  - PostgresGuestSearch: pg_trgm GIN indexes on guest name and email
+    (migration 0007) and on the phone's digits (migration 0010) serve the
+    word-prefix regexes, ILIKE and LIKE; `<%` finds typos.
+  - MemoryGuestSearch: for SQLite. It keeps a sorted token list for prefix
+    matches, every phone number's digits in one string for substring matches
+    and a trigram index over the name vocabulary for typos. It is built on
+    the first search and updated with add() when guests are created, locally
+    or (through the change feed) by another instance.
+
+    python guest_search.py "jo smi"
+"""
+import abc
+import argparse
+import bisect
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import and_, case, false, func, literal, literal_column, or_, select, text
+from sqlmodel import Session
+from models import Guest, GuestMatch
+
+# Shortest word a query needs (trigram indexes cannot serve shorter ones), and the default number of matches
+MIN_QUERY_LENGTH = 3
+DEFAULT_LIMIT = 10
+
+# How many matches are ranked for an unselective query
+MAX_CANDIDATES = 500
+
+# Ranking tiers shared by both backends; fuzzy matches score their similarity (< 1)
+EXACT, NAME_PREFIX, WORD_PREFIX, CONTACT_PREFIX, CONTAINS = 4.0, 3.0, 2.5, 2.0, 1.0
+
+# pg_trgm's default similarity threshold
+FUZZY_THRESHOLD = 0.3
+
+_WORD = re.compile(r"[^\W_]+")
+_DIGITS = re.compile(r"\D")
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def query_words(q: str) -> List[str]:
+    """The words of a normalized query that each have to match, the same for both backends"""
+    digits = _DIGITS.sub("", q)
+    if digits and not re.search(r"[^\d\s()+.-]", q):
+        # A phone number typed with spaces, dashes or brackets is one word of digits
+        return [digits]
+    if "@" in q or ("." in q and " " not in q):
+        # So is an email address
+        return [q]
+    return _WORD.findall(q) or [q]
+
+
+def is_name_word(word: str) -> bool:
+    """Whether a query word can start a name word (email addresses cannot)"""
+    return _WORD.fullmatch(word) is not None
+
+
+def trigrams(word: str) -> Set[str]:
+    """pg_trgm-style trigrams: the word padded with two spaces in front and one behind"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class GuestSearch(abc.ABC):
+    """Ranked guest lookup; see for_engine()"""
+
+    @abc.abstractmethod
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, session: Optional[Session] = None) -> List[GuestMatch]:
+        """Best matches for a partial name, email or phone number, through `session` if given"""
+
+    def add(self, guests: Iterable[Guest]):
+        """Make newly created guests searchable (no-op where the database indexes them)"""
+
+    def warm(self):
+        """Get ready for the first search in the background (no-op where there is nothing to load)"""
+
+
+def phone_digits(phone=Guest.phone):
+    """A phone number as digits only, as typed "555 0101" and stored "(555) 0101" differ.
+
+    Rendered without bind parameters so it matches the expression index of migration 0010.
+    """
+    return func.regexp_replace(phone, literal_column("'[^0-9]'"), literal_column("''"), literal_column("'g'"))
+
+
+LIKE_ESCAPE = "\\"
+
+
+def _escape_like(value: str) -> str:
+    """Typed text as a LIKE pattern fragment that matches only itself"""
+    return value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+
+
+def _starts_word(name, word: str):
+    """`word` starts one of the words of `name`; pg_trgm indexes serve the regex"""
+    if len(word) < MIN_QUERY_LENGTH:
+        # `\mjo` yields no trigram, but LIKE pads a word after the start or a space
+        return or_(name.ilike(f"{word}%"), name.ilike(f"% {word}%"))
+    return name.op("~*")(rf"\m{word}")
+
+
+class PostgresGuestSearch(GuestSearch):
+    """Queries the guest table through pg_trgm GIN indexes"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._has_trgm: Optional[bool] = None
+
+    def _trgm(self, session: Session) -> bool:
+        # Without the extension (migration 0007 not run yet) search degrades to scans without typo matches
+        if self._has_trgm is None:
+            self._has_trgm = session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+        return self._has_trgm
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, session: Optional[Session] = None) -> List[GuestMatch]:
+        q = normalize(query)
+        words = query_words(q)
+        if max(len(w) for w in words) < MIN_QUERY_LENGTH:
+            return []
+        e, esc = _escape_like, LIKE_ESCAPE
+        # Conditions on the name alone share one index scan, which intersects them
+        matches = [
+            or_(
+                *([_starts_word(Guest.name, w)] if is_name_word(w) else []),
+                *([Guest.email.ilike(f"{e(w)}%", escape=esc)] if len(words) == 1 else []),
+                *([phone_digits().like(f"%{w}%")] if w.isdigit() and len(w) >= MIN_QUERY_LENGTH else []),
+            )
+            for w in words
+        ]
+        candidates = (
+            select(Guest.id, Guest.name, Guest.email, Guest.phone, Guest.type)
+            .where(*matches)
+            .limit(MAX_CANDIDATES)
+            .subquery()
+        )
+        c = candidates.c
+        name = func.lower(c.name)
+        typed_digits = _DIGITS.sub("", q)
+        contact = [func.lower(c.email).like(f"{e(q)}%", escape=esc)]
+        if typed_digits:
+            contact.append(phone_digits(c.phone).like(f"{typed_digits}%"))
+        word_prefix = and_(*(_starts_word(c.name, w) for w in words)) if all(map(is_name_word, words)) else false()
+        score = case(
+            (name == q, EXACT),
+            (name.like(f"{e(q)}%", escape=esc), NAME_PREFIX),
+            (word_prefix, WORD_PREFIX),
+            (or_(*contact), CONTACT_PREFIX),
+            else_=CONTAINS,
+        ).label("score")
+
+        with nullcontext(session) if session else Session(self.engine) as session:
+            rows = session.execute(
+                select(c.id, c.name, c.email, c.phone, c.type, score)
+                .order_by(score.desc(), func.length(c.name), c.name)
+                .limit(limit)
+            ).all()
+            typed = words[-1]
+            if len(rows) < limit and typed.isalpha() and len(typed) >= MIN_QUERY_LENGTH and self._trgm(session):
+                # Typo tolerance for the word being typed; earlier words still have to match.
+                # Similarity (< 1) ranks these below every tier.
+                similarity = func.word_similarity(typed, Guest.name).label("score")
+                rows += session.execute(
+                    select(Guest.id, Guest.name, Guest.email, Guest.phone, Guest.type, similarity)
+                    .where(*matches[:-1], literal(typed).op("<%")(Guest.name), Guest.id.not_in([r[0] for r in rows]))
+                    .order_by(similarity.desc(), func.length(Guest.name), Guest.name)
+                    .limit(limit - len(rows))
+                ).all()
+        return [GuestMatch(id=r[0], name=r[1], email=r[2], phone=r[3], type=r[4], score=float(r[5])) for r in rows]
+
+
+class MemoryGuestSearch(GuestSearch):
+    """In-process prefix, phone and trigram index over every guest.
+
+    Tokens are name words and the email address. They sit in one sorted list
+    next to the guest each came from, so a prefix is a bisect range. Phone
+    digits are kept in one newline-separated string that str.find scans for
+    a substring. Fuzzy matching looks up trigrams of distinct name words
+    only, which keeps that index small.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._built = False
+        # Guests added while build() reads the table, replayed into the new index; None when not building
+        self._pending: Optional[List[tuple]] = None
+        self.build_ms = 0.0
+        # (id, name, email, phone, type, tokens, phone digits)
+        self._guests: List[tuple] = []
+        self._known: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        self._owners = array("i")
+        self._phones = ""
+        self._phone_starts = array("i")
+        self._phone_owners = array("i")
+        self._name_words: Set[str] = set()
+        self._name_trigrams: Dict[str, Set[str]] = defaultdict(set)
+
+    @staticmethod
+    def _entry(guest_id, name: str, email: Optional[str], phone: Optional[str], guest_type) -> tuple:
+        tokens = dict.fromkeys(_WORD.findall(name.lower()))
+        if email:
+            tokens[email.lower()] = None
+        return guest_id, name, email, phone, guest_type, tuple(tokens), _DIGITS.sub("", phone or "")
+
+    @staticmethod
+    def _index_name_words(tokens: Iterable[str], name_words: Set[str], name_trigrams: Dict[str, Set[str]]):
+        # Email addresses stay out of the typo index
+        for word in tokens:
+            if word.isalpha() and word not in name_words:
+                name_words.add(word)
+                for gram in trigrams(word):
+                    name_trigrams[gram].add(word)
+
+    def build(self, session: Optional[Session] = None):
+        """(Re)load every guest; called by the first search"""
+        started = time.perf_counter()
+        with self._lock:
+            self._pending = []
+        try:
+            with nullcontext(session) if session else Session(self.engine) as session:
+                rows = session.execute(select(Guest.id, Guest.name, Guest.email, Guest.phone, Guest.type)).all()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        guests, known, tokens, owners = [], {}, [], []
+        phones, phone_starts, phone_owners, offset = [], array("i"), array("i"), 0
+        name_words, name_trigrams = set(), defaultdict(set)
+        for i, row in enumerate(rows):
+            guest = self._entry(*row)
+            guests.append(guest)
+            known[guest[0]] = i
+            tokens.extend(guest[5])
+            owners.extend([i] * len(guest[5]))
+            if guest[6]:
+                phones.append(guest[6] + "\n")
+                phone_starts.append(offset)
+                phone_owners.append(i)
+                offset += len(guest[6]) + 1
+            self._index_name_words(guest[5], name_words, name_trigrams)
+        # Sorting positions by token is cheaper than sorting (token, owner) pairs
+        order = sorted(range(len(tokens)), key=tokens.__getitem__)
+        with self._lock:
+            self._guests, self._known = guests, known
+            self._tokens = [tokens[at] for at in order]
+            self._owners = array("i", [owners[at] for at in order])
+            self._phones, self._phone_starts, self._phone_owners = "".join(phones), phone_starts, phone_owners
+            self._name_words, self._name_trigrams = name_words, name_trigrams
+            pending, self._pending = self._pending, None
+            self._add_locked(pending)
+            self._built = True
+        self.build_ms = (time.perf_counter() - started) * 1000
+
+    def add(self, guests: Iterable[Guest]):
+        rows = [(g.id, g.name, g.email, g.phone, g.type) for g in guests]
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(rows)
+            # Before the first build there is nothing to add to; build() will read them
+            if self._built:
+                self._add_locked(rows)
+
+    def _add_locked(self, rows: Iterable[tuple]):
+        for row in rows:
+            if row[0] in self._known:
+                continue
+            i = len(self._guests)
+            guest = self._entry(*row)
+            self._guests.append(guest)
+            self._known[guest[0]] = i
+            for token in guest[5]:
+                at = bisect.bisect_left(self._tokens, token)
+                self._tokens.insert(at, token)
+                self._owners.insert(at, i)
+            if guest[6]:
+                self._phone_starts.append(len(self._phones))
+                self._phone_owners.append(i)
+                self._phones += guest[6] + "\n"
+            self._index_name_words(guest[5], self._name_words, self._name_trigrams)
+
+    def _ensure_built(self, session: Optional[Session] = None):
+        with self._build_lock:
+            if not self._built:
+                self.build(session)
+
+    def warm(self):
+        if not self._built:
+            threading.Thread(target=self._ensure_built, name="guest-search-build", daemon=True).start()
+
+    def _prefix(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self._tokens, prefix)
+        return lo, bisect.bisect_left(self._tokens, prefix + "\uffff", lo)
+
+    def _owners_in(self, lo: int, hi: int, seen: Set[int]) -> Iterable[int]:
+        """Distinct guests owning tokens[lo:hi], until MAX_CANDIDATES have been seen"""
+        owners = self._owners
+        for at in range(lo, hi):
+            i = owners[at]
+            if i not in seen:
+                if len(seen) >= MAX_CANDIDATES:
+                    return
+                seen.add(i)
+                yield i
+
+    def _phone_owners_of(self, digits: str, seen: Set[int]) -> Iterable[int]:
+        """Distinct guests whose phone number contains `digits`, until MAX_CANDIDATES have been seen"""
+        phones, starts, owners = self._phones, self._phone_starts, self._phone_owners
+        at = phones.find(digits)
+        while at != -1:
+            i = owners[bisect.bisect_right(starts, at) - 1]
+            if i not in seen:
+                if len(seen) >= MAX_CANDIDATES:
+                    return
+                seen.add(i)
+                yield i
+            at = phones.find(digits, phones.index("\n", at) + 1)
+
+    def _candidates(self, words: Sequence[str], seen: Set[int]) -> Iterable[int]:
+        """Guests with a token starting the most selective of `words` (or, for digits, that phone number)"""
+        # Short words select by the tokens they start, a superset of their matches
+        ranges = [self._prefix(word) for word in words if not word.isdigit() and len(word) >= MIN_QUERY_LENGTH]
+        if ranges:
+            return self._owners_in(*min(ranges, key=lambda r: r[1] - r[0]), seen)
+        # Digits also match inside phone numbers; the longest run is the most selective
+        digits = max(words, key=len)
+        return itertools.chain(self._owners_in(*self._prefix(digits), seen), self._phone_owners_of(digits, seen))
+
+    @staticmethod
+    def _starts_word(name: str, word: str) -> bool:
+        """`word` starts a word of the lowercased `name`, as _starts_word() does in SQL"""
+        if len(word) < MIN_QUERY_LENGTH:
+            return any(part.startswith(word) for part in name.split())
+        return any(t.startswith(word) for t in _WORD.findall(name))
+
+    @classmethod
+    def _matches(cls, guest: tuple, word: str) -> bool:
+        """`word`, one of several, starts a word of the guest's name or, as digits, is in their phone number"""
+        if len(word) < MIN_QUERY_LENGTH:
+            return cls._starts_word(guest[1].lower(), word)
+        # The email address, when there is one, is the last token
+        names = guest[5][:-1] if guest[2] else guest[5]
+        return any(t.startswith(word) for t in names) or (word.isdigit() and word in guest[6])
+
+    @classmethod
+    def _score(cls, guest: tuple, q: str, words: Sequence[str]) -> float:
+        name = guest[1].lower()
+        if name == q:
+            return EXACT
+        if name.startswith(q):
+            return NAME_PREFIX
+        if all(is_name_word(word) and cls._starts_word(name, word) for word in words):
+            return WORD_PREFIX
+        typed_digits = _DIGITS.sub("", q)
+        if (guest[2] or "").lower().startswith(q) or (typed_digits and guest[6].startswith(typed_digits)):
+            return CONTACT_PREFIX
+        return CONTAINS
+
+    def _similar(self, word: str) -> Dict[str, float]:
+        """Name words at least FUZZY_THRESHOLD similar to `word`, most similar first"""
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._name_trigrams.get(gram, ()))
+        similar = {}
+        for candidate, common in shared.items():
+            similarity = common / (len(grams) + len(trigrams(candidate)) - common)
+            if similarity >= FUZZY_THRESHOLD:
+                similar[candidate] = similarity
+        return dict(sorted(similar.items(), key=lambda s: -s[1]))
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, session: Optional[Session] = None) -> List[GuestMatch]:
+        q = normalize(query)
+        words = query_words(q)
+        if max(len(w) for w in words) < MIN_QUERY_LENGTH:
+            return []
+        self._ensure_built(session)
+
+        with self._lock:
+            guests = self._guests
+            pool = self._candidates(words, set())
+            # Tokens include email addresses, which only a one-word query matches
+            rest = words if len(words) > 1 else []
+            scored = [
+                (self._score(guests[i], q, words), i)
+                for i in pool
+                if all(self._matches(guests[i], word) for word in rest)
+            ]
+
+            typed = words[-1]
+            if len(scored) < limit and typed.isalpha() and len(typed) >= MIN_QUERY_LENGTH:
+                # Typo tolerance for the word being typed; earlier words still have to match
+                similar = self._similar(typed)
+                seen = {i for _, i in scored}
+                rest = words[:-1]
+                if any(len(word) >= MIN_QUERY_LENGTH for word in words[:-1]):
+                    pool = self._candidates(words[:-1], seen)
+                else:
+                    pool = itertools.chain.from_iterable(
+                        self._owners_in(bisect.bisect_left(self._tokens, w), bisect.bisect_right(self._tokens, w), seen)
+                        for w in similar
+                    )
+                for i in pool:
+                    similarity = max((similar.get(t, 0.0) for t in guests[i][5]), default=0.0)
+                    if similarity and all(self._matches(guests[i], word) for word in rest):
+                        scored.append((similarity, i))
+            top = heapq.nsmallest(limit, scored, key=lambda s: (-s[0], len(guests[s[1]][1]), guests[s[1]][1]))
+            return [
+                GuestMatch(id=g[0], name=g[1], email=g[2], phone=g[3], type=g[4], score=score)
+                for score, g in ((score, guests[i]) for score, i in top)
+            ]
+
+
+def for_engine(engine) -> GuestSearch:
+    """The backend suited to the engine's database"""
+    if engine.dialect.name == "postgresql":
+        return PostgresGuestSearch(engine)
+    return MemoryGuestSearch(engine)
+
+
+if __name__ == "__main__":
+    from system import HotelSystem
+
+    parser = argparse.ArgumentParser(description="Search guests by partial name, email or phone")
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    system = HotelSystem(db_url=os.environ.get("DATABASE_URL"))
+    started = time.perf_counter()
+    matches = system.search_guests(args.query, args.limit)
+    print(f"{len(matches)} matches in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for match in matches:
+        print(f"  {match.score:4.2f}  {match.name:<30} {match.email or '':<32} {match.phone or ''}")
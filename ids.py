@@ -0,0 +1,116 @@
+"""
+Primary keys: time-ordered UUIDs (version 7, RFC 9562) stored compactly.
+
+A UUIDv7 starts with a millisecond timestamp, so new keys land at the right
+edge of their B-tree index instead of on a random page, and the ids of one
+process sort in creation order. The rest is random, so they remain safe to
+hand out in URLs and tokens.
+
+`UUIDKey` keeps ids as canonical strings in Python and stores them as a
+native 16-byte `uuid` on Postgres and a 16-byte BLOB on SQLite (instead of
+36 characters), which also shrinks every foreign key and index holding them.
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import LargeBinary, Uuid
+from sqlalchemy.types import TypeDecorator
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """A version 7 UUID; strictly increasing within this process.
+
+    The 12-bit rand_a field is a counter seeded randomly each millisecond
+    (RFC 9562 method 1); if it runs out the timestamp is borrowed forward.
+    """
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            # Leave headroom so a burst in one millisecond rarely overflows
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return uuid.UUID(int=(ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand_b)
+
+
+def new_id() -> str:
+    """Primary key for a new row"""
+    return str(uuid7())
+
+
+def short_id(value: str) -> str:
+    """Eight characters to show in listings; the tail, since UUIDv7s made together share their head"""
+    return value[-8:]
+
+
+def id_time(value: str) -> Optional[datetime]:
+    """Creation time embedded in a UUIDv7 id (None for other ids)"""
+    try:
+        u = uuid.UUID(value)
+    except ValueError:
+        return None
+    if u.version != 7:
+        return None
+    return datetime.fromtimestamp((u.int >> 80) / 1000)
+
+
+def _to_bytes(value: str) -> Optional[bytes]:
+    if len(value) == 36:
+        try:
+            raw = bytes.fromhex(value.replace("-", ""))
+        except ValueError:
+            return None
+        return raw if len(raw) == 16 else None
+    try:
+        return uuid.UUID(value).bytes
+    except ValueError:
+        return None
+
+
+def _to_str(raw: bytes) -> str:
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class UUIDKey(TypeDecorator):
+    """UUID string in Python; `uuid` on Postgres, BLOB(16) elsewhere.
+
+    A string that isn't a UUID binds as NULL, so looking it up finds nothing
+    rather than raising a driver error halfway through a request.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(Uuid(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        raw = _to_bytes(str(value))
+        if raw is None:
+            return None
+        return _to_str(raw) if dialect.name == "postgresql" else raw
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return _to_str(bytes(value))
@@ -0,0 +1,190 @@
+"""
+Per-method SQL instrumentation for HotelSystem.
+
+A QueryProfiler hooks the engine's cursor events and wraps the public methods
+of one HotelSystem instance, recording statements, database time and wall time
+per call and flagging N+1 patterns (the same statement repeated inside a call).
+Nothing is hooked until a profiler is attached, so a system without one pays
+no overhead.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from sqlalchemy import event
+
+
+class MethodStats:
+    """Aggregated numbers for one HotelSystem method"""
+
+    def __init__(self):
+        self.calls = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.db_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.n_plus_one_calls = 0
+        self.last_repeated_statement: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "statements": self.statements,
+            "max_statements": self.max_statements,
+            "avg_statements": round(self.statements / self.calls, 2) if self.calls else 0,
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "wall_ms": round(self.wall_seconds * 1000, 3),
+            "n_plus_one_calls": self.n_plus_one_calls,
+            "last_repeated_statement": self.last_repeated_statement,
+        }
+
+
+class _CallFrame:
+    def __init__(self, method: str):
+        self.method = method
+        self.statements: Counter = Counter()
+        self.db_seconds = 0.0
+
+
+class QueryProfiler:
+    """Collects per-method query counts and latencies for a HotelSystem"""
+
+    def __init__(self, n_plus_one_threshold: int = 5):
+        # A statement repeated this many times within one call is reported as N+1
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._stats: Dict[str, MethodStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._engines: List = []
+        self._originals: Dict[str, object] = {}
+        self._system = None
+
+    # ---- Wiring ----
+
+    def attach(self, system, engines: Optional[list] = None):
+        """Hook the system's engines and wrap its public methods"""
+        if self._system is not None:
+            raise ValueError("Profiler is already attached")
+        self._system = system
+        self._engines = engines or [system.engine]
+        for engine in self._engines:
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+        for name, member in inspect.getmembers(type(system), inspect.isfunction):
+            if name.startswith("_") or name in ("enable_profiling", "disable_profiling"):
+                continue
+            self._originals[name] = getattr(system, name)
+            setattr(system, name, self._wrap(name, self._originals[name]))
+
+    def detach(self):
+        """Remove every hook installed by attach"""
+        if self._system is None:
+            return
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+        for name in self._originals:
+            # Drop the instance attribute so the class method shows through again
+            delattr(self._system, name)
+        self._originals = {}
+        self._engines = []
+        self._system = None
+
+    def _wrap(self, name: str, method):
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator_wrapper(*args, **kwargs):
+                frame = self._enter(name)
+                started = time.perf_counter()
+                try:
+                    yield from method(*args, **kwargs)
+                finally:
+                    self._exit(frame, started)
+            return generator_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            frame = self._enter(name)
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._exit(frame, started)
+        return wrapper
+
+    def _enter(self, name: str) -> Optional[_CallFrame]:
+        # Nested calls (create_guest -> find_guest_by_name) count towards the outermost one
+        if getattr(self._local, "frame", None) is not None:
+            return None
+        frame = _CallFrame(name)
+        self._local.frame = frame
+        return frame
+
+    def _exit(self, frame: Optional[_CallFrame], started: float):
+        if frame is None:
+            return
+        wall = time.perf_counter() - started
+        self._local.frame = None
+        total = sum(frame.statements.values())
+        repeated = [s for s, n in frame.statements.items() if n >= self.n_plus_one_threshold]
+        with self._lock:
+            stats = self._stats.setdefault(frame.method, MethodStats())
+            stats.calls += 1
+            stats.statements += total
+            stats.max_statements = max(stats.max_statements, total)
+            stats.db_seconds += frame.db_seconds
+            stats.wall_seconds += wall
+            if repeated:
+                stats.n_plus_one_calls += 1
+                stats.last_repeated_statement = " ".join(repeated[0].split())[:300]
+
+    # ---- Engine events ----
+
+    # The start time rides on the statement's execution context, so a statement that fails
+    # leaves nothing behind and one already running when profiling was enabled is skipped
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profiler_started", None)
+        if started is None:
+            return
+        frame = getattr(self._local, "frame", None)
+        if frame is not None:
+            frame.db_seconds += time.perf_counter() - started
+            frame.statements[statement] += 1
+
+    # ---- Reporting ----
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current stats per method"""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def to_prometheus(self) -> str:
+        """Stats in the Prometheus text exposition format"""
+        metrics = [
+            ("hotel_method_calls_total", "counter", "Calls per HotelSystem method", "calls", 1),
+            ("hotel_method_sql_statements_total", "counter", "SQL statements executed", "statements", 1),
+            ("hotel_method_db_seconds_total", "counter", "Time spent in the database", "db_ms", 0.001),
+            ("hotel_method_wall_seconds_total", "counter", "Wall time spent in the method", "wall_ms", 0.001),
+            ("hotel_method_n_plus_one_total", "counter", "Calls that repeated a statement", "n_plus_one_calls", 1),
+            ("hotel_method_max_sql_statements", "gauge", "Most statements seen in one call", "max_statements", 1),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for metric, kind, help_text, key, scale in metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for method, stats in snapshot.items():
+                value = stats[key] * scale
+                lines.append(f'{metric}{{method="{method}"}} {value:g}')
+        return "\n".join(lines) + "\n"
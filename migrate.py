@@ -0,0 +1,260 @@
+"""
+Versioned schema migrations.
+
+Scripts live in migrations/ as NNNN_description.py and run in version order;
+every applied version is recorded in the schema_migrations table. A script
+defines `upgrade(op)` and uses the `Operations` helpers, which are idempotent,
+so a database built by `create_all` simply records the versions as applied.
+
+Scripts run inside one transaction each. A script that sets
+`TRANSACTIONAL = False` runs in autocommit instead, which is what lets
+Postgres build its indexes with CREATE INDEX CONCURRENTLY while bookings keep
+writing to the table.
+
+    python migrate.py                 # apply everything pending
+    python migrate.py --dry-run       # print the SQL without running it
+    python migrate.py --list
+    python migrate.py --target 2 --schema hotel_b
+"""
+import argparse
+import importlib.util
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Sequence
+from sqlalchemy import create_engine, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from models import SchemaMigration
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# pg_advisory_lock key, so two deploys starting at once don't race
+ADVISORY_LOCK_ID = 4_270_113
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+
+class Migration:
+    """One script in the migrations directory"""
+
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"migrations.m{self.version:04d}", self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "TRANSACTIONAL", True)
+
+    @property
+    def description(self) -> str:
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+
+class Operations:
+    """Schema changes available to a migration script, portable across Postgres and SQLite"""
+
+    def __init__(self, conn: Connection, transactional: bool, dry_run: bool = False):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.transactional = transactional
+        self.dry_run = dry_run
+        self.quote = conn.dialect.identifier_preparer.quote
+
+    def execute(self, sql: str, **params):
+        print(f"  {sql.strip()};")
+        if not self.dry_run:
+            return self.conn.execute(text(sql), params)
+
+    def skip(self, reason: str):
+        print(f"  -- skipped: {reason}")
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.conn).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in {c["name"] for c in inspect(self.conn).get_columns(table)}
+
+    def has_index(self, table: str, name: str) -> bool:
+        return name in {i["name"] for i in inspect(self.conn).get_indexes(table)}
+
+    def add_column(self, table: str, column: str, ddl: str):
+        """ALTER TABLE ... ADD COLUMN unless it exists.
+
+        Tables that don't exist yet are skipped: create_all builds them current.
+        On Postgres 11+ a constant DEFAULT makes this a metadata-only change.
+        """
+        if not self.has_table(table):
+            return self.skip(f"table {table} does not exist")
+        if self.has_column(table, column):
+            return self.skip(f"{table}.{column} exists")
+        self.execute(f"ALTER TABLE {self.quote(table)} ADD COLUMN {self.quote(column)} {ddl}")
+
+    def create_index(self, name: str, table: str, columns: Sequence[str], unique: bool = False,
+                     using: Optional[str] = None, ops: Optional[str] = None):
+        """CREATE INDEX, concurrently on Postgres when the script is non-transactional.
+
+        `using` (an index method such as gin) and `ops` (an operator class for
+        every column) are Postgres-only; other databases skip such indexes. A
+        column given in parentheses is an expression and is used as written.
+        """
+        if not self.has_table(table):
+            return self.skip(f"table {table} does not exist")
+        if (using or ops) and self.dialect != "postgresql":
+            return self.skip(f"index {name} is Postgres-only")
+        concurrently = self.dialect == "postgresql" and not self.transactional
+        if concurrently:
+            # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+            valid = self.conn.execute(text(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+            ), {"name": name}).scalar()
+            if valid is False:
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {self.quote(name)}")
+            elif valid:
+                return self.skip(f"index {name} exists")
+        elif self.has_index(table, name):
+            return self.skip(f"index {name} exists")
+        self.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX {'CONCURRENTLY ' if concurrently else ''}"
+            f"IF NOT EXISTS {self.quote(name)} ON {self.quote(table)} {f'USING {using} ' if using else ''}"
+            f"({', '.join((c if c.startswith('(') else self.quote(c)) + (f' {ops}' if ops else '') for c in columns)})"
+        )
+
+    def drop_index(self, name: str):
+        concurrently = "CONCURRENTLY " if self.dialect == "postgresql" and not self.transactional else ""
+        self.execute(f"DROP INDEX {concurrently}IF EXISTS {self.quote(name)}")
+
+
+class MigrationRunner:
+    """Applies pending migration scripts in version order"""
+
+    def __init__(self, engine: Engine, directory: str = MIGRATIONS_DIR, schema: Optional[str] = None,
+                 dry_run: bool = False, lock_timeout: str = "5s"):
+        self.engine = engine
+        self.directory = directory
+        self.schema = schema
+        self.dry_run = dry_run
+        # ALTERs give up instead of queueing behind long transactions and stalling bookings
+        self.lock_timeout = lock_timeout
+        self.is_postgres = engine.dialect.name == "postgresql"
+
+    def discover(self) -> List[Migration]:
+        migrations = []
+        for filename in sorted(os.listdir(self.directory)):
+            match = _FILENAME.match(filename)
+            if match:
+                migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(self.directory, filename)))
+        versions = [m.version for m in migrations]
+        if len(versions) != len(set(versions)):
+            raise ValueError(f"Duplicate migration versions in {self.directory}")
+        return migrations
+
+    @contextmanager
+    def _connect(self, autocommit: bool = False):
+        conn = self.engine.connect()
+        try:
+            if autocommit:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            if self.is_postgres and self.schema:
+                conn.execute(text(f"SET search_path TO {conn.dialect.identifier_preparer.quote(self.schema)}"))
+            yield conn
+        finally:
+            conn.close()
+
+    def applied(self) -> List[int]:
+        with self._connect() as conn:
+            if not inspect(conn).has_table(SchemaMigration.__tablename__):
+                return []
+            return list(conn.execute(select(SchemaMigration.version).order_by(SchemaMigration.version)).scalars())
+
+    def pending(self, target: Optional[int] = None) -> List[Migration]:
+        done = set(self.applied())
+        return [m for m in self.discover() if m.version not in done and (target is None or m.version <= target)]
+
+    @contextmanager
+    def _lock(self):
+        if not self.is_postgres or self.dry_run:
+            yield
+            return
+        with self._connect(autocommit=True) as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+    def _record(self, conn: Connection, migration: Migration, started: float):
+        conn.execute(insert(SchemaMigration.__table__).values(
+            version=migration.version,
+            name=migration.name,
+            applied_at=datetime.now(),
+            duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        ))
+
+    def _apply(self, migration: Migration):
+        started = time.perf_counter()
+        if migration.transactional:
+            # Closing without commit rolls the whole script back on error
+            with self._connect() as conn:
+                if self.is_postgres:
+                    conn.execute(text(f"SET LOCAL lock_timeout = '{self.lock_timeout}'"))
+                migration.module.upgrade(Operations(conn, True, self.dry_run))
+                if not self.dry_run:
+                    self._record(conn, migration, started)
+                    conn.commit()
+        else:
+            # Each statement commits on its own; the helpers are idempotent so a re-run resumes
+            with self._connect(autocommit=True) as conn:
+                migration.module.upgrade(Operations(conn, False, self.dry_run))
+                if not self.dry_run:
+                    self._record(conn, migration, started)
+
+    def run(self, target: Optional[int] = None) -> List[Migration]:
+        """Apply pending migrations up to `target` (default: all); returns the ones run"""
+        if not self.dry_run:
+            with self._connect() as conn:
+                SchemaMigration.__table__.create(conn, checkfirst=True)
+                conn.commit()
+        with self._lock():
+            # Re-read under the lock: another runner may have just finished
+            pending = self.pending(target)
+            for migration in pending:
+                mode = "transaction" if migration.transactional else "autocommit"
+                print(f"{'[dry run] ' if self.dry_run else ''}{migration.version:04d} {migration.description} ({mode})")
+                self._apply(migration)
+        return pending
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--db-url", default=os.environ.get("DATABASE_URL", "sqlite:///hotel_inr.db"))
+    parser.add_argument("--schema", help="Postgres schema of one property (see HotelSystem(schema=...))")
+    parser.add_argument("--target", type=int, help="Stop after this version")
+    parser.add_argument("--dry-run", action="store_true", help="Print the SQL without executing or recording it")
+    parser.add_argument("--list", action="store_true", help="Show applied and pending versions")
+    args = parser.parse_args()
+
+    connect_args = {}
+    if "postgresql" in args.db_url and "sslmode=" not in args.db_url:
+        connect_args = {"sslmode": "require"}
+    runner = MigrationRunner(create_engine(args.db_url, connect_args=connect_args), schema=args.schema, dry_run=args.dry_run)
+
+    if args.list:
+        done = set(runner.applied())
+        for m in runner.discover():
+            print(f"{'applied' if m.version in done else 'pending'}  {m.version:04d} {m.description}")
+    else:
+        ran = runner.run(args.target)
+        print(f"{len(ran)} migration(s) {'would be applied' if args.dry_run else 'applied'}")
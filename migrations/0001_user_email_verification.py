@@ -0,0 +1,7 @@
+"""Email verification columns on user (replaces migrate_user_table.py)"""
+
+
+def upgrade(op):
+    op.add_column("user", "email_verified", "BOOLEAN DEFAULT FALSE")
+    op.add_column("user", "verification_otp", "VARCHAR")
+    op.add_column("user", "otp_expires_at", "TIMESTAMP")
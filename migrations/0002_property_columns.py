@@ -0,0 +1,9 @@
+"""Property key on rooms, reservations, rates and audit runs (replaces migrate_property_columns.py)"""
+
+# Existing rows belong to the single property the app ran before
+TABLES = ["room", "reservation", "roomrate", "raterule", "nightauditrun"]
+
+
+def upgrade(op):
+    for table in TABLES:
+        op.add_column(table, "property_id", "VARCHAR NOT NULL DEFAULT 'main'")
@@ -0,0 +1,27 @@
+"""Indexes behind login, guest lookup, availability, listings and the night audit"""
+
+# Built with CREATE INDEX CONCURRENTLY on Postgres; bookings keep writing meanwhile
+TRANSACTIONAL = False
+
+# (name, table, columns, unique); names match what create_all gives new databases
+INDEXES = [
+    ("ix_user_email", "user", ["email"], True),
+    ("ix_guest_user_id", "guest", ["user_id"], False),
+    ("ix_guest_name", "guest", ["name"], False),
+    ("ix_room_property_id", "room", ["property_id"], False),
+    ("ix_reservation_property_id", "reservation", ["property_id"], False),
+    ("ix_reservation_guest_id", "reservation", ["guest_id"], False),
+    ("ix_reservation_check_in", "reservation", ["check_in"], False),
+    ("ix_reservation_check_out", "reservation", ["check_out"], False),
+    ("ix_reservation_status", "reservation", ["status"], False),
+    ("ix_reservation_room_dates", "reservation", ["room_id", "check_in", "check_out"], False),
+    ("ix_reservation_property_check_in", "reservation", ["property_id", "check_in"], False),
+    ("ix_roomrate_property_id", "roomrate", ["property_id"], False),
+    ("ix_raterule_property_id", "raterule", ["property_id"], False),
+    ("ix_nightauditrun_property_id", "nightauditrun", ["property_id"], False),
+]
+
+
+def upgrade(op):
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique)
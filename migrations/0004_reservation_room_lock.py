@@ -0,0 +1,5 @@
+"""Room lock flag on reservation for the allocation optimizer"""
+
+
+def upgrade(op):
+    op.add_column("reservation", "room_locked", "BOOLEAN NOT NULL DEFAULT FALSE")
@@ -0,0 +1,9 @@
+"""Group id on reservation for group bookings"""
+
+# Built with CREATE INDEX CONCURRENTLY on Postgres, after the column exists
+TRANSACTIONAL = False
+
+
+def upgrade(op):
+    op.add_column("reservation", "group_id", "VARCHAR")
+    op.create_index("ix_reservation_group_id", "reservation", ["group_id"])
@@ -0,0 +1,78 @@
+"""Store user, guest, room and reservation keys as 16-byte UUIDs instead of 36-character strings
+
+Postgres: the columns become native `uuid` (ALTER ... TYPE uuid USING col::uuid),
+with the foreign keys between them dropped and re-added around the change.
+Each ALTER rewrites its table under an exclusive lock, so run this in a quiet
+hour; with a large reservation table, archive first (archive.py).
+
+SQLite: the values are rewritten in place as 16-byte blobs. The declared
+column types stay VARCHAR, which SQLite never applies to blobs.
+
+Existing ids must be UUIDs (any version); the script stops and rolls back at
+the first one that isn't.
+"""
+import uuid
+from sqlalchemy import Uuid, inspect
+
+# table -> key columns, in foreign-key order
+COLUMNS = {
+    "user": ["id"],
+    "guest": ["id", "user_id"],
+    "room": ["id"],
+    "reservation": ["id", "guest_id", "room_id"],
+    "reservation_archive": ["id", "guest_id", "room_id"],
+    "allotmentblock": ["id", "guest_id"],
+    "roommove": ["id", "reservation_id", "from_room_id", "to_room_id"],
+}
+
+
+def _uuid_blob(value):
+    if value is None or isinstance(value, bytes):
+        return value
+    return uuid.UUID(value).bytes
+
+
+def _sqlite(op, tables):
+    if not op.dry_run:
+        op.conn.connection.driver_connection.create_function("uuid_blob", 1, _uuid_blob, deterministic=True)
+    for table, columns in tables.items():
+        q = op.quote
+        assignments = ", ".join(f"{q(c)} = uuid_blob({q(c)})" for c in columns)
+        pending = " OR ".join(f"typeof({q(c)}) = 'text'" for c in columns)
+        op.execute(f"UPDATE {q(table)} SET {assignments} WHERE {pending}")
+
+
+def _postgres(op, tables):
+    q = op.quote
+    inspector = inspect(op.conn)
+    todo = {
+        table: [c["name"] for c in inspector.get_columns(table) if c["name"] in columns and not isinstance(c["type"], Uuid)]
+        for table, columns in tables.items()
+    }
+    todo = {table: columns for table, columns in todo.items() if columns}
+    if not todo:
+        return op.skip("keys are already uuid")
+    # Both sides of a foreign key must change type together, so drop them for the duration
+    foreign_keys = [
+        (table, fk) for table in tables for fk in inspector.get_foreign_keys(table)
+        if fk["name"] and (fk["referred_table"] in todo or table in todo)
+    ]
+    for table, fk in foreign_keys:
+        op.execute(f"ALTER TABLE {q(table)} DROP CONSTRAINT {q(fk['name'])}")
+    for table, columns in todo.items():
+        changes = ", ".join(f"ALTER COLUMN {q(c)} TYPE uuid USING {q(c)}::uuid" for c in columns)
+        op.execute(f"ALTER TABLE {q(table)} {changes}")
+    for table, fk in foreign_keys:
+        op.execute(
+            f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(fk['name'])} "
+            f"FOREIGN KEY ({', '.join(q(c) for c in fk['constrained_columns'])}) "
+            f"REFERENCES {q(fk['referred_table'])} ({', '.join(q(c) for c in fk['referred_columns'])})"
+        )
+
+
+def upgrade(op):
+    tables = {table: columns for table, columns in COLUMNS.items() if op.has_table(table)}
+    if op.dialect == "postgresql":
+        _postgres(op, tables)
+    else:
+        _sqlite(op, tables)
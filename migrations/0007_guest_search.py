@@ -0,0 +1,26 @@
+"""Trigram indexes for typeahead guest search (Postgres) and the guest change kind
+
+SQLite deployments search an in-memory index instead (guest_search.py), so
+there is nothing to do there.
+"""
+
+# Built with CREATE INDEX CONCURRENTLY; ALTER TYPE ... ADD VALUE can't run in a transaction before Postgres 12
+TRANSACTIONAL = False
+
+# (name, column) on guest, all GIN with gin_trgm_ops
+INDEXES = [
+    ("ix_guest_name_trgm", "name"),
+    ("ix_guest_email_trgm", "email"),
+    ("ix_guest_phone_trgm", "phone"),
+]
+
+
+def upgrade(op):
+    if op.dialect != "postgresql":
+        return op.skip("guest search indexes are Postgres-only")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in INDEXES:
+        op.create_index(name, "guest", [column], using="gin", ops="gin_trgm_ops")
+    # SQLAlchemy stores enum member names
+    if op.has_table("inventorychange"):
+        op.execute("ALTER TYPE changekind ADD VALUE IF NOT EXISTS 'GUEST'")
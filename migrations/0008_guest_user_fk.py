@@ -0,0 +1,22 @@
+"""Drop the foreign key from guest.user_id to user.id
+
+With several properties, users live only in the accounts property's database
+while each property keeps its own guest profiles, so the key cannot hold
+outside the accounts database. SQLite does not enforce it and keeps it.
+"""
+from sqlalchemy import inspect
+
+
+def upgrade(op):
+    if op.dialect != "postgresql":
+        return op.skip("foreign keys are not enforced")
+    if not op.has_table("guest"):
+        return op.skip("no guest table")
+    foreign_keys = [
+        fk for fk in inspect(op.conn).get_foreign_keys("guest")
+        if fk["name"] and fk["constrained_columns"] == ["user_id"]
+    ]
+    if not foreign_keys:
+        return op.skip("no foreign key on guest.user_id")
+    for fk in foreign_keys:
+        op.execute(f"ALTER TABLE {op.quote('guest')} DROP CONSTRAINT {op.quote(fk['name'])}")
@@ -0,0 +1,8 @@
+"""(property_id, check_out) index on reservation, so day sheets scan only stays that have not yet ended"""
+
+# Built with CREATE INDEX CONCURRENTLY on Postgres; bookings keep writing meanwhile
+TRANSACTIONAL = False
+
+
+def upgrade(op):
+    op.create_index("ix_reservation_property_check_out", "reservation", ["property_id", "check_out"])
@@ -0,0 +1,18 @@
+"""Trigram index on guest phone numbers reduced to their digits (Postgres)
+
+Guest search compares phone numbers as digits only, so "555 0101" finds
+"(555) 0101". The expression must stay identical to guest_search.phone_digits(),
+or the planner will not use the index. It replaces the plain phone index of 0007.
+"""
+
+# Built with CREATE INDEX CONCURRENTLY; bookings keep writing meanwhile
+TRANSACTIONAL = False
+
+PHONE_DIGITS = "(regexp_replace(phone, '[^0-9]', '', 'g'))"
+
+
+def upgrade(op):
+    if op.dialect != "postgresql":
+        return op.skip("guest search indexes are Postgres-only")
+    op.create_index("ix_guest_phone_digits_trgm", "guest", [PHONE_DIGITS], using="gin", ops="gin_trgm_ops")
+    op.drop_index("ix_guest_phone_trgm")
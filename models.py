@@ -1,7 +1,9 @@
 from enum import Enum
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import BigInteger, Column, Index, Integer, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
+from ids import UUIDKey
 
 class RoomType(str, Enum):
     STANDARD = "Standard"
@@ -14,6 +16,9 @@ class RoomStatus(str, Enum):
     DIRTY = "Dirty"
     MAINTENANCE = "Maintenance"
 
+# Property key used by single-hotel deployments
+DEFAULT_PROPERTY = "main"
+
 class GuestType(str, Enum):
     WALK_IN = "Walk-in"
     CORPORATE = "Corporate"
@@ -22,7 +27,7 @@ class GuestType(str, Enum):
 
 class User(SQLModel, table=True):
     __table_args__ = {"extend_existing": True}
-    id: Optional[str] = Field(default=None, primary_key=True)
+    id: Optional[str] = Field(default=None, primary_key=True, sa_type=UUIDKey)
     email: str = Field(unique=True, index=True)
     password_hash: str
     full_name: str
@@ -34,24 +39,31 @@ class User(SQLModel, table=True):
     otp_expires_at: Optional[datetime] = Field(default=None)
     
     # Relationship to guests (one user can have multiple guest profiles)
-    guests: List["Guest"] = Relationship(back_populates="user")
+    guests: List["Guest"] = Relationship(
+        back_populates="user", sa_relationship_kwargs={"primaryjoin": "User.id == foreign(Guest.user_id)"}
+    )
 
 class Guest(SQLModel, table=True):
     __table_args__ = {"extend_existing": True}
-    id: Optional[str] = Field(default=None, primary_key=True)
-    user_id: Optional[str] = Field(default=None, foreign_key="user.id")
-    name: str
+    id: Optional[str] = Field(default=None, primary_key=True, sa_type=UUIDKey)
+    # No foreign key: with several properties, users live only in the accounts database
+    # while their guest profiles live in each property's own (see PropertyRouter)
+    user_id: Optional[str] = Field(default=None, index=True, sa_type=UUIDKey)
+    name: str = Field(index=True)
     email: Optional[str] = None
     phone: Optional[str] = None
     type: GuestType = GuestType.WALK_IN
     loyalty_points: int = 0
     
-    user: Optional[User] = Relationship(back_populates="guests")
+    user: Optional[User] = Relationship(
+        back_populates="guests", sa_relationship_kwargs={"primaryjoin": "foreign(Guest.user_id) == User.id"}
+    )
     reservations: List["Reservation"] = Relationship(back_populates="guest")
 
 class Room(SQLModel, table=True):
     __table_args__ = {"extend_existing": True}
-    id: Optional[str] = Field(default=None, primary_key=True)
+    id: Optional[str] = Field(default=None, primary_key=True, sa_type=UUIDKey)
+    property_id: str = Field(default=DEFAULT_PROPERTY, index=True)
     number: str
     type: RoomType
     price_per_night: float
@@ -60,6 +72,33 @@ class Room(SQLModel, table=True):
 
     reservations: List["Reservation"] = Relationship(back_populates="room")
 
+class RoomRate(SQLModel, table=True):
+    """Nightly rate override for one room type on one date"""
+    __table_args__ = (UniqueConstraint("property_id", "room_type", "day"), {"extend_existing": True})
+    id: Optional[str] = Field(default=None, primary_key=True)
+    property_id: str = Field(default=DEFAULT_PROPERTY, index=True)
+    room_type: RoomType = Field(index=True)
+    day: date = Field(index=True)
+    price: float
+
+class RateRule(SQLModel, table=True):
+    """Rate multiplier by weekday, season or length of stay.
+
+    Rules with `min_nights` apply to the whole stay once it is at least that
+    long (the longest matching threshold wins), and with a weekday or season
+    only to stays arriving on a date it covers; all other rules multiply the
+    nightly rate of every date they match. A missing room_type matches all types.
+    """
+    __table_args__ = {"extend_existing": True}
+    id: Optional[str] = Field(default=None, primary_key=True)
+    property_id: str = Field(default=DEFAULT_PROPERTY, index=True)
+    room_type: Optional[RoomType] = None
+    weekday: Optional[int] = None  # 0 = Monday ... 6 = Sunday
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None  # Inclusive
+    min_nights: Optional[int] = None
+    multiplier: float = 1.0
+
 class ReservationStatus(str, Enum):
     CONFIRMED = "Confirmed"
     CHECKED_IN = "Checked In"
@@ -67,15 +106,224 @@ class ReservationStatus(str, Enum):
     CANCELLED = "Cancelled"
 
 class Reservation(SQLModel, table=True):
-    __table_args__ = {"extend_existing": True}
-    id: Optional[str] = Field(default=None, primary_key=True)
-    guest_id: str = Field(foreign_key="guest.id")
-    room_id: str = Field(foreign_key="room.id")
-    check_in: date
-    check_out: date
+    __table_args__ = (
+        # Overlap check behind availability and double-booking protection
+        Index("ix_reservation_room_dates", "room_id", "check_in", "check_out"),
+        # Day sheets and night audit scan one property's stays by date
+        Index("ix_reservation_property_check_in", "property_id", "check_in"),
+        # Stays touching a date window are found from their check-out, which bounds them to recent history
+        Index("ix_reservation_property_check_out", "property_id", "check_out"),
+        {"extend_existing": True},
+    )
+    id: Optional[str] = Field(default=None, primary_key=True, sa_type=UUIDKey)
+    property_id: str = Field(default=DEFAULT_PROPERTY, index=True)
+    guest_id: str = Field(foreign_key="guest.id", index=True, sa_type=UUIDKey)
+    room_id: str = Field(foreign_key="room.id", sa_type=UUIDKey)
+    check_in: date = Field(index=True)
+    check_out: date = Field(index=True)
     total_price: float
-    status: ReservationStatus = ReservationStatus.CONFIRMED
+    status: ReservationStatus = Field(default=ReservationStatus.CONFIRMED, index=True)
     created_at: datetime = Field(default_factory=datetime.now)
+    # The guest asked for this exact room; the allocation optimizer won't move it
+    room_locked: bool = False
+    # Set on every reservation of a group booking
+    group_id: Optional[str] = Field(default=None, index=True)
 
     guest: Optional[Guest] = Relationship(back_populates="reservations")
     room: Optional[Room] = Relationship(back_populates="reservations")
+
+class AllotmentBlock(SQLModel, table=True):
+    """Rooms of one type held for a group until its release date"""
+    __table_args__ = (
+        Index("ix_allotmentblock_property_dates", "property_id", "check_in", "check_out"),
+        {"extend_existing": True},
+    )
+    id: Optional[str] = Field(default=None, primary_key=True, sa_type=UUIDKey)
+    property_id: str = Field(default=DEFAULT_PROPERTY)
+    # Shared by the blocks (one per room type) of the same group
+    group_id: str = Field(index=True)
+    name: str = ""
+    guest_id: str = Field(foreign_key="guest.id", sa_type=UUIDKey)
+    room_type: RoomType
+    check_in: date
+    check_out: date
+    rooms_held: int
+    rooms_picked_up: int = 0
+    # Unpicked rooms return to general sale on this date
+    release_date: date
+    released_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+
+class ChangeKind(str, Enum):
+    RESERVATION = "reservation"
+    BLOCK = "block"
+    STATUS = "status"
+    ALLOCATION = "allocation"
+    RATE = "rate"
+    GUEST = "guest"
+
+class InventoryChange(SQLModel, table=True):
+    """Append-only log of writes that change availability, prices or guest profiles, read by changefeed.py"""
+    __table_args__ = (
+        # Readers scan by seq (the primary key); pruning goes by age
+        Index("ix_inventorychange_changed_at", "changed_at"),
+        {"extend_existing": True},
+    )
+    # BIGSERIAL on Postgres; SQLite only autoincrements a plain INTEGER primary key
+    seq: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    )
+    property_id: str = Field(default=DEFAULT_PROPERTY)
+    kind: ChangeKind
+    # Reservation, block, rate or guest id; None for bulk changes like a night audit step
+    entity_id: Optional[str] = None
+    room_type: Optional[RoomType] = None
+    # Affected nights [check_in, check_out); None leaves that side open
+    check_in: Optional[date] = None
+    check_out: Optional[date] = None
+    changed_at: datetime = Field(default_factory=datetime.now)
+
+class ArchivedReservation(SQLModel, table=True):
+    """A closed reservation moved out of the live table by archive.py"""
+    __tablename__ = "reservation_archive"
+    __table_args__ = (
+        Index("ix_reservation_archive_property_check_out", "property_id", "check_out"),
+        {"extend_existing": True},
+    )
+    id: str = Field(primary_key=True, sa_type=UUIDKey)
+    property_id: str = Field(default=DEFAULT_PROPERTY)
+    guest_id: str = Field(index=True, sa_type=UUIDKey)
+    room_id: str = Field(sa_type=UUIDKey)
+    check_in: date = Field(index=True)
+    check_out: date
+    total_price: float
+    status: ReservationStatus
+    created_at: datetime
+    archived_at: datetime = Field(default_factory=datetime.now)
+
+class GuestMatch(SQLModel):
+    """One guest search result; higher scores rank first"""
+    id: str
+    name: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    type: GuestType
+    score: float
+
+class ReservationView(str, Enum):
+    UPCOMING = "upcoming"
+    PAST = "past"
+    CANCELLED = "cancelled"
+
+class ReservationSummary(SQLModel):
+    """Compact, read-only reservation row for history listings"""
+    id: str
+    property_id: str = DEFAULT_PROPERTY
+    guest_id: str
+    guest_name: str
+    room_id: str
+    room_number: str
+    room_type: RoomType
+    check_in: date
+    check_out: date
+    total_price: float
+    status: ReservationStatus
+
+    @property
+    def cursor(self) -> Tuple[date, str]:
+        """Keyset cursor to pass as `after` when fetching the next page"""
+        return (self.check_in, self.id)
+
+class DaySheet(SQLModel):
+    """Front-desk view of one business date"""
+    day: date
+    arrivals: List[ReservationSummary] = []
+    departures: List[ReservationSummary] = []
+    in_house: List[ReservationSummary] = []
+    no_shows: List[ReservationSummary] = []
+
+    # Counts are filled even when the sheet is built without row detail
+    arrivals_count: int = 0
+    departures_count: int = 0
+    in_house_count: int = 0
+    no_shows_count: int = 0
+
+class NightAuditRun(SQLModel, table=True):
+    """One completed night-audit step; lets a re-run skip work already applied"""
+    __table_args__ = (UniqueConstraint("property_id", "business_date", "step"), {"extend_existing": True})
+    id: Optional[str] = Field(default=None, primary_key=True)
+    property_id: str = Field(default=DEFAULT_PROPERTY, index=True)
+    business_date: date = Field(index=True)
+    step: str
+    rows: int = 0
+    duration_ms: float = 0.0
+    completed_at: datetime = Field(default_factory=datetime.now)
+
+class NightAuditReport(SQLModel):
+    """Outcome of a night-audit run for one business date"""
+    business_date: date
+    property_id: str = DEFAULT_PROPERTY
+    rows: Dict[str, int] = {}
+    skipped: List[str] = []
+    duration_ms: float = 0.0
+
+class ArchiveReport(SQLModel):
+    """Outcome of one archive run"""
+    property_id: str = DEFAULT_PROPERTY
+    cutoff: date
+    rows: int = 0
+    batches: int = 0
+    remaining: int = 0
+    duration_ms: float = 0.0
+
+class ExportReport(SQLModel):
+    """Outcome of a reservation export"""
+    path: str
+    format: str
+    compressed: bool = False
+    rows: int = 0
+    bytes: int = 0
+    duration_ms: float = 0.0
+
+class RoomMove(SQLModel, table=True):
+    """One reservation moved to another room by the allocation optimizer (audit trail)"""
+    __table_args__ = {"extend_existing": True}
+    id: Optional[str] = Field(default=None, primary_key=True, sa_type=UUIDKey)
+    plan_id: str = Field(index=True)
+    property_id: str = Field(default=DEFAULT_PROPERTY)
+    reservation_id: str = Field(index=True, sa_type=UUIDKey)
+    from_room_id: str = Field(sa_type=UUIDKey)
+    to_room_id: str = Field(sa_type=UUIDKey)
+    check_in: date
+    check_out: date
+    applied_at: datetime = Field(default_factory=datetime.now)
+
+class PlannedMove(SQLModel):
+    """One reassignment in an AllocationPlan"""
+    reservation_id: str
+    from_room_id: str
+    to_room_id: str
+    check_in: date
+    check_out: date
+
+class AllocationPlan(SQLModel):
+    """Room reassignments proposed (or applied) by the allocation optimizer"""
+    plan_id: str
+    property_id: str = DEFAULT_PROPERTY
+    moves: List[PlannedMove] = []
+    reservations: int = 0
+    short_gaps_before: int = 0
+    short_gaps_after: int = 0
+    # Room types left as they were because no valid packing was found
+    skipped_types: List[RoomType] = []
+    applied: bool = False
+    duration_ms: float = 0.0
+
+class SchemaMigration(SQLModel, table=True):
+    """A versioned migration script applied by migrate.py"""
+    __tablename__ = "schema_migrations"
+    __table_args__ = {"extend_existing": True}
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: datetime = Field(default_factory=datetime.now)
+    duration_ms: float = 0.0
@@ -0,0 +1,189 @@
+"""
+Night audit: closes a business date by moving reservations and rooms through
+their lifecycle with set-based UPDATE statements.
+
+Run from cron once a day (after midnight) to close yesterday:
+    python night_audit.py
+or keep it running as a scheduler:
+    python night_audit.py --loop --at-hour 3
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import Update, func, update
+from sqlmodel import Session, select
+from models import Room, RoomStatus, Reservation, ReservationStatus, AllotmentBlock, NightAuditRun, NightAuditReport, ChangeKind, DEFAULT_PROPERTY
+from ids import new_id
+from changefeed import change, log_changes
+
+STEPS = ["check_out", "check_in", "no_show", "dirty_rooms", "occupied_rooms", "release_blocks"]
+
+# Steps that change availability, and how they appear in the change feed (Room.status only matters for maintenance)
+CHANGE_KINDS = {"check_out": ChangeKind.STATUS, "no_show": ChangeKind.STATUS, "release_blocks": ChangeKind.BLOCK}
+
+
+class NightAudit:
+    """Applies the end-of-day status transitions for a business date.
+
+    Every step is a single bulk UPDATE committed together with its
+    NightAuditRun record, so a crashed run resumes at the first step that
+    did not commit and re-running a completed date touches nothing.
+    """
+
+    def __init__(self, engine, property_id: str = DEFAULT_PROPERTY, auto_check_in: bool = True):
+        self.engine = engine
+        self.property_id = property_id
+        # Without a front-desk check-in flow, stays are checked in by the audit
+        self.auto_check_in = auto_check_in
+
+    def _statements(self, day: date) -> List[Tuple[str, Update]]:
+        prop = self.property_id
+        departed_rooms = select(Reservation.room_id).where(
+            Reservation.property_id == prop,
+            Reservation.status == ReservationStatus.CHECKED_OUT,
+            Reservation.check_out == day,
+        )
+        in_house_rooms = select(Reservation.room_id).where(
+            Reservation.property_id == prop,
+            Reservation.status == ReservationStatus.CHECKED_IN,
+            Reservation.check_in <= day,
+            Reservation.check_out > day,
+        )
+        steps = {
+            "check_out": update(Reservation)
+                .where(
+                    Reservation.property_id == prop,
+                    Reservation.status == ReservationStatus.CHECKED_IN,
+                    Reservation.check_out <= day,
+                )
+                .values(status=ReservationStatus.CHECKED_OUT),
+            "check_in": update(Reservation)
+                .where(
+                    Reservation.property_id == prop,
+                    Reservation.status == ReservationStatus.CONFIRMED,
+                    Reservation.check_in <= day,
+                    Reservation.check_out > day,
+                )
+                .values(status=ReservationStatus.CHECKED_IN),
+            # Whatever is still CONFIRMED with an arrival on or before today never showed up
+            "no_show": update(Reservation)
+                .where(
+                    Reservation.property_id == prop,
+                    Reservation.status == ReservationStatus.CONFIRMED,
+                    Reservation.check_in <= day,
+                )
+                .values(status=ReservationStatus.CANCELLED),
+            "dirty_rooms": update(Room)
+                .where(Room.property_id == prop, Room.status != RoomStatus.MAINTENANCE, Room.id.in_(departed_rooms))
+                .values(status=RoomStatus.DIRTY),
+            # Runs after dirty_rooms so same-day turnovers end up OCCUPIED
+            "occupied_rooms": update(Room)
+                .where(Room.property_id == prop, Room.status != RoomStatus.MAINTENANCE, Room.id.in_(in_house_rooms))
+                .values(status=RoomStatus.OCCUPIED),
+            # Availability already ignores blocks past their release date; this records it
+            "release_blocks": update(AllotmentBlock)
+                .where(
+                    AllotmentBlock.property_id == prop,
+                    AllotmentBlock.release_date <= day,
+                    AllotmentBlock.released_at.is_(None),
+                )
+                .values(released_at=datetime.now()),
+        }
+        if not self.auto_check_in:
+            del steps["check_in"]
+        return [(name, steps[name]) for name in STEPS if name in steps]
+
+    def run(self, business_date: Optional[date] = None) -> NightAuditReport:
+        """Close one business date (defaults to yesterday)"""
+        day = business_date or date.today() - timedelta(days=1)
+        started = time.perf_counter()
+        report = NightAuditReport(business_date=day, property_id=self.property_id)
+
+        with Session(self.engine) as session:
+            done = set(session.exec(
+                select(NightAuditRun.step).where(
+                    NightAuditRun.property_id == self.property_id,
+                    NightAuditRun.business_date == day,
+                )
+            ).all())
+
+            for name, statement in self._statements(day):
+                if name in done:
+                    report.skipped.append(name)
+                    continue
+                step_started = time.perf_counter()
+                rows = session.execute(statement, execution_options={"synchronize_session": False}).rowcount
+                session.add(NightAuditRun(
+                    id=new_id(),
+                    property_id=self.property_id,
+                    business_date=day,
+                    step=name,
+                    rows=rows,
+                    duration_ms=(time.perf_counter() - step_started) * 1000,
+                ))
+                if rows and name in CHANGE_KINDS:
+                    log_changes(session, [change(CHANGE_KINDS[name], self.property_id, check_in=day)])
+                session.commit()
+                report.rows[name] = rows
+
+        report.duration_ms = (time.perf_counter() - started) * 1000
+        return report
+
+    def run_pending(self, until: Optional[date] = None) -> List[NightAuditReport]:
+        """Close every business date since the last audit up to `until` (defaults to yesterday)"""
+        until = until or date.today() - timedelta(days=1)
+        with Session(self.engine) as session:
+            last = session.exec(
+                select(func.max(NightAuditRun.business_date)).where(NightAuditRun.property_id == self.property_id)
+            ).first()
+
+        # Resume the last date too, in case it stopped part-way
+        day = last if last and last <= until else until
+        reports = []
+        while day <= until:
+            reports.append(self.run(day))
+            day += timedelta(days=1)
+        return reports
+
+    def run_forever(self, at_hour: int = 3):
+        """Run pending audits every day at the given hour"""
+        while True:
+            now = datetime.now()
+            next_run = now.replace(hour=at_hour, minute=0, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            for report in self.run_pending():
+                print(format_report(report))
+            time.sleep((next_run - datetime.now()).total_seconds())
+
+
+def format_report(report: NightAuditReport) -> str:
+    touched = ", ".join(f"{step}={rows}" for step, rows in report.rows.items()) or "nothing to do"
+    line = f"Night audit {report.property_id} {report.business_date}: {touched} in {report.duration_ms:.1f} ms"
+    if report.skipped:
+        line += f" (already done: {', '.join(report.skipped)})"
+    return line
+
+
+if __name__ == "__main__":
+    from system import HotelSystem
+
+    parser = argparse.ArgumentParser(description="Run the hotel night audit")
+    parser.add_argument("--date", type=date.fromisoformat, help="Business date to close (default: yesterday)")
+    parser.add_argument("--loop", action="store_true", help="Keep running and audit once a day")
+    parser.add_argument("--at-hour", type=int, default=3, help="Hour of day for --loop runs")
+    parser.add_argument("--property", default=DEFAULT_PROPERTY, help="Property to audit")
+    parser.add_argument("--no-auto-check-in", action="store_true", help="Leave check-ins to the front desk")
+    args = parser.parse_args()
+
+    system = HotelSystem(db_url=os.environ.get("DATABASE_URL"), property_id=args.property)
+    audit = NightAudit(system.engine, system.property_id, auto_check_in=not args.no_auto_check_in)
+    if args.loop:
+        audit.run_forever(args.at_hour)
+    elif args.date:
+        print(format_report(audit.run(args.date)))
+    else:
+        for report in audit.run_pending():
+            print(format_report(report))
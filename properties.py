@@ -0,0 +1,129 @@
+"""
+Multi-property routing: one HotelSystem (and engine) per property, with
+cross-property reports fanned out in parallel and merged.
+
+Configuration maps each property to its own database, or to a Postgres schema
+within a shared database:
+
+    {
+        "mumbai": "postgresql://.../mumbai",
+        "goa": {"db_url": "postgresql://.../resorts", "schema": "goa"},
+        "pune": {"db_url": "postgresql://.../resorts", "schema": "pune"}
+    }
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
+from models import DaySheet, Reservation, ReservationSummary, ReservationView, DEFAULT_PROPERTY
+from system import HotelSystem
+
+T = TypeVar("T")
+
+
+class PropertyRouter:
+    """Maps property ids to their HotelSystem, creating each one on first use"""
+
+    def __init__(self, properties: Dict[str, Union[str, dict]], accounts_property: Optional[str] = None):
+        if not properties:
+            raise ValueError("At least one property must be configured")
+        self._config = {
+            prop: cfg if isinstance(cfg, dict) else {"db_url": cfg}
+            for prop, cfg in properties.items()
+        }
+        # User accounts live in one property's database so logins work chain-wide
+        self.accounts_property = accounts_property or next(iter(self._config))
+        if self.accounts_property not in self._config:
+            raise ValueError(f"Unknown accounts property: {self.accounts_property}")
+        self._systems: Dict[str, HotelSystem] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, variable: str = "HOTEL_PROPERTIES") -> "PropertyRouter":
+        """Build from a JSON mapping in an environment variable, falling back to DATABASE_URL"""
+        raw = os.environ.get(variable)
+        if raw:
+            return cls(json.loads(raw))
+        return cls({DEFAULT_PROPERTY: os.environ.get("DATABASE_URL")})
+
+    @property
+    def property_ids(self) -> List[str]:
+        return list(self._config)
+
+    def system(self, property_id: str) -> HotelSystem:
+        """The HotelSystem that owns a property's data"""
+        if property_id not in self._config:
+            raise ValueError(f"Unknown property: {property_id}")
+        system = self._systems.get(property_id)
+        if system is None:
+            with self._lock:
+                system = self._systems.get(property_id)
+                if system is None:
+                    cfg = self._config[property_id]
+                    system = HotelSystem(db_url=cfg.get("db_url"), property_id=property_id,
+                                         schema=cfg.get("schema"))
+                    self._systems[property_id] = system
+        return system
+
+    @property
+    def accounts(self) -> HotelSystem:
+        """The system that holds user accounts"""
+        return self.system(self.accounts_property)
+
+    def fan_out(self, fn: Callable[[HotelSystem], T], property_ids: Optional[List[str]] = None) -> Dict[str, T]:
+        """Run fn against every property in parallel; results keyed by property"""
+        targets = property_ids or self.property_ids
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            futures = {prop: pool.submit(lambda p: fn(self.system(p)), prop) for prop in targets}
+            return {prop: future.result() for prop, future in futures.items()}
+
+    # ==== CROSS-PROPERTY REPORTS ====
+
+    def get_room_stats(self):
+        """Occupied and total rooms across all properties"""
+        stats = self.fan_out(lambda s: s.get_room_stats())
+        return sum(o for o, _ in stats.values()), sum(t for _, t in stats.values())
+
+    def get_all_reservations(self) -> List[Reservation]:
+        """Reservations of every property, ordered by check-in"""
+        results = self.fan_out(lambda s: s.get_all_reservations())
+        merged = [r for rows in results.values() for r in rows]
+        merged.sort(key=lambda r: (r.check_in, r.property_id, r.id))
+        return merged
+
+    def get_user_reservations(
+        self,
+        user_id: str,
+        view: Optional[ReservationView] = None,
+        limit: Optional[int] = 20,
+        after: Optional[Tuple[date, str]] = None,
+    ) -> List[ReservationSummary]:
+        """One page of a user's reservations at every property, in HotelSystem.get_user_reservations order.
+
+        Each property returns its own page after the cursor; the merged page
+        keeps the first `limit`, so its last `cursor` works for the next one.
+        """
+        pages = self.fan_out(lambda s: s.get_user_reservations(user_id, view, limit, after))
+        merged = sorted(
+            (r for rows in pages.values() for r in rows),
+            key=lambda r: r.cursor,
+            reverse=view != ReservationView.UPCOMING,
+        )
+        return merged[:limit] if limit else merged
+
+    def get_day_sheet(self, day: date) -> DaySheet:
+        """One chain-wide day sheet with every property's rows and counts combined"""
+        sheets = self.fan_out(lambda s: s.get_day_sheet(day))
+        merged = DaySheet(day=day)
+        for sheet in sheets.values():
+            merged.arrivals.extend(sheet.arrivals)
+            merged.departures.extend(sheet.departures)
+            merged.in_house.extend(sheet.in_house)
+            merged.no_shows.extend(sheet.no_shows)
+            merged.arrivals_count += sheet.arrivals_count
+            merged.departures_count += sheet.departures_count
+            merged.in_house_count += sheet.in_house_count
+            merged.no_shows_count += sheet.no_shows_count
+        return merged
@@ -0,0 +1,288 @@
+"""
+Statement builders and row shaping shared by HotelSystem and AsyncHotelSystem,
+so the sync and async implementations run exactly the same SQL.
+"""
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, event, literal_column, or_, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlmodel import select
+from models import Room, RoomType, RoomStatus, Guest, Reservation, ArchivedReservation, AllotmentBlock, ReservationStatus, ReservationView, ReservationSummary, DaySheet
+
+ACTIVE_STATUSES = [ReservationStatus.CONFIRMED, ReservationStatus.CHECKED_IN]
+
+
+class likelihood(FunctionElement):
+    """A filter with the fraction of rows it is expected to keep, for SQLite's planner.
+
+    SQLite keeps no statistics on value ranges, so it cannot tell a range over
+    recent dates from one over all of history; elsewhere only the filter is rendered.
+    """
+    # Untyped: as a Boolean, SQLite would get "likelihood(...) = 1", which no index serves
+    inherit_cache = True
+
+    def __init__(self, condition, fraction: float):
+        super().__init__(condition, literal_column(repr(float(fraction))))
+
+
+@compiles(likelihood)
+def _likelihood(element, compiler, **kw):
+    return compiler.process(element.clauses.clauses[0], **kw)
+
+
+@compiles(likelihood, "sqlite")
+def _likelihood_sqlite(element, compiler, **kw):
+    condition, fraction = element.clauses.clauses
+    return f"likelihood({compiler.process(condition, **kw)}, {fraction.name})"
+
+
+def available_rooms(property_id: str, check_in: date, check_out: date, room_type: Optional[RoomType] = None):
+    """Rooms of a property with no active reservation overlapping the stay, in one query"""
+    overlapping = select(Reservation.id).where(
+        Reservation.room_id == Room.id,
+        Reservation.status.in_(ACTIVE_STATUSES),
+        Reservation.check_in < check_out,
+        Reservation.check_out > check_in,
+    )
+    # Room.status is the room's state tonight; only maintenance takes it off sale
+    statement = select(Room).where(
+        Room.property_id == property_id,
+        Room.status != RoomStatus.MAINTENANCE,
+        ~overlapping.exists(),
+    )
+    if room_type:
+        statement = statement.where(Room.type == room_type)
+    return statement.order_by(Room.number)
+
+
+# Reservation columns shared by the live and archive tables
+HISTORY_COLUMNS = ["id", "property_id", "guest_id", "room_id", "check_in", "check_out", "total_price", "status", "created_at"]
+
+
+def room_conflicts(room_id: str, check_in: date, check_out: date):
+    """Active reservations of a room overlapping the stay"""
+    return select(Reservation.id).where(
+        Reservation.room_id == room_id,
+        Reservation.status.in_(ACTIVE_STATUSES),
+        Reservation.check_in < check_out,
+        Reservation.check_out > check_in,
+    ).limit(1)
+
+
+def lock_rooms(property_id: str, room_types: Optional[Sequence[RoomType]] = None):
+    """Room rows to lock (FOR UPDATE, in id order) before allocating them"""
+    statement = select(Room.id).where(Room.property_id == property_id)
+    if room_types:
+        statement = statement.where(Room.type.in_(list(room_types)))
+    return statement.order_by(Room.id).with_for_update()
+
+
+# Session.connection() options for a booking transaction: its availability check and insert
+# must not interleave with another booking's. FOR UPDATE does that on Postgres; SQLite has no
+# row locks and pysqlite sends no BEGIN before a SELECT, so there the transaction starts with
+# BEGIN IMMEDIATE and holds the database's write lock from its first read.
+BOOKING_TRANSACTION = {"sqlite_begin": "IMMEDIATE"}
+
+
+def begin_sqlite_transactions(engine):
+    """Honour the `sqlite_begin` execution option (see BOOKING_TRANSACTION) on a SQLite engine"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "begin")
+    def begin(conn):
+        mode = conn.get_execution_options().get("sqlite_begin")
+        if mode:
+            # pysqlite sees the open transaction and issues no BEGIN of its own
+            conn.exec_driver_sql(f"BEGIN {mode}")
+
+
+def active_holds(property_id: str, check_in: date, check_out: date, today: date,
+                 exclude_group: Optional[str] = None):
+    """Allotment blocks still holding rooms on any night of the stay.
+
+    Blocks stop holding on their release date even before the night audit
+    marks them released.
+    """
+    statement = select(
+        AllotmentBlock.room_type,
+        AllotmentBlock.check_in,
+        AllotmentBlock.check_out,
+        (AllotmentBlock.rooms_held - AllotmentBlock.rooms_picked_up).label("rooms"),
+    ).where(
+        AllotmentBlock.property_id == property_id,
+        AllotmentBlock.release_date > today,
+        AllotmentBlock.rooms_held > AllotmentBlock.rooms_picked_up,
+        AllotmentBlock.check_in < check_out,
+        AllotmentBlock.check_out > check_in,
+    )
+    if exclude_group:
+        statement = statement.where(AllotmentBlock.group_id != exclude_group)
+    return statement
+
+
+def held_by_type(holds, check_in: date, check_out: date) -> Dict[RoomType, int]:
+    """Rooms per type that holds keep off sale for the stay (the busiest night counts)"""
+    per_night: Dict[RoomType, Counter] = defaultdict(Counter)
+    for room_type, block_in, block_out, rooms in holds:
+        day = max(block_in, check_in)
+        while day < min(block_out, check_out):
+            per_night[room_type][day] += rooms
+            day += timedelta(days=1)
+    return {room_type: max(nights.values()) for room_type, nights in per_night.items()}
+
+
+def without_held(rooms: List[Room], held: Dict[RoomType, int]) -> List[Room]:
+    """Drop held inventory from an availability list, highest room numbers first"""
+    if not held:
+        return rooms
+    keep = Counter({t: 0 for t in held})
+    for room in rooms:
+        keep[room.type] += 1
+    for room_type, count in held.items():
+        keep[room_type] -= count
+    result = []
+    for room in rooms:
+        if room.type in held:
+            if keep[room.type] <= 0:
+                continue
+            keep[room.type] -= 1
+        result.append(room)
+    return result
+
+
+def pick_rooms(available: List[Room], requested: Dict[RoomType, int]) -> List[Room]:
+    """The first free rooms of each requested type, or ValueError if any type falls short"""
+    by_type = defaultdict(list)
+    for room in available:
+        by_type[room.type].append(room)
+    short = {t: n - len(by_type[t]) for t, n in requested.items() if len(by_type[t]) < n}
+    if short:
+        missing = ", ".join(f"{n} {t.value}" for t, n in short.items())
+        raise ValueError(f"Not enough rooms available: short by {missing}")
+    return [room for t, n in requested.items() for room in by_type[t][:n]]
+
+
+def reservation_history():
+    """Live and archived reservations as one selectable, for views that reach into the past"""
+    return union_all(
+        select(*(getattr(Reservation, c) for c in HISTORY_COLUMNS)),
+        select(*(getattr(ArchivedReservation, c) for c in HISTORY_COLUMNS)),
+    ).subquery("reservation_history")
+
+
+def reservation_summaries(source=None):
+    """Reservations (live table by default) joined with guest and room, shaped as ReservationSummary columns"""
+    r = Reservation.__table__ if source is None else source
+    return (
+        select(
+            r.c.id,
+            r.c.property_id,
+            r.c.guest_id,
+            Guest.name.label("guest_name"),
+            r.c.room_id,
+            Room.number.label("room_number"),
+            Room.type.label("room_type"),
+            r.c.check_in,
+            r.c.check_out,
+            r.c.total_price,
+            r.c.status,
+        )
+        .select_from(r)
+        .join(Guest, r.c.guest_id == Guest.id)
+        .join(Room, r.c.room_id == Room.id)
+    )
+
+
+def reservation_summary(reservation_id: str):
+    """One live reservation as a ReservationSummary row"""
+    return reservation_summaries().where(Reservation.id == reservation_id)
+
+
+def user_reservations(property_id: str, user_id: str, view: Optional[ReservationView], limit: Optional[int],
+                      after: Optional[Tuple[date, str]], today: date):
+    """One keyset-paginated page of a user's reservation history at a property"""
+    # Upcoming stays are never archived; every other view also reads the archive
+    r = Reservation.__table__ if view == ReservationView.UPCOMING else reservation_history()
+    statement = reservation_summaries(r).where(r.c.property_id == property_id, Guest.user_id == user_id)
+
+    if view == ReservationView.UPCOMING:
+        statement = statement.where(r.c.status.in_(ACTIVE_STATUSES), r.c.check_out >= today)
+    elif view == ReservationView.PAST:
+        statement = statement.where(
+            r.c.status != ReservationStatus.CANCELLED,
+            or_(r.c.status == ReservationStatus.CHECKED_OUT, r.c.check_out < today),
+        )
+    elif view == ReservationView.CANCELLED:
+        statement = statement.where(r.c.status == ReservationStatus.CANCELLED)
+
+    # Keyset pagination on (check_in, id) so deep pages cost the same as the first one
+    ascending = view == ReservationView.UPCOMING
+    if after:
+        after_check_in, after_id = after
+        if ascending:
+            statement = statement.where(or_(
+                r.c.check_in > after_check_in,
+                and_(r.c.check_in == after_check_in, r.c.id > after_id),
+            ))
+        else:
+            statement = statement.where(or_(
+                r.c.check_in < after_check_in,
+                and_(r.c.check_in == after_check_in, r.c.id < after_id),
+            ))
+    if ascending:
+        statement = statement.order_by(r.c.check_in, r.c.id)
+    else:
+        statement = statement.order_by(r.c.check_in.desc(), r.c.id.desc())
+    if limit:
+        statement = statement.limit(limit)
+    return statement
+
+
+def day_sheet_rows(property_id: str, start: date, end: date):
+    """Every non-cancelled stay touching the date window, ordered by check-in"""
+    return (
+        reservation_summaries()
+        .where(
+            Reservation.property_id == property_id,
+            Reservation.status != ReservationStatus.CANCELLED,
+            # Nearly every stay began before the window and few end after it, so this scans
+            # ix_reservation_property_check_out from the window on, not check_in from the start of history
+            likelihood(Reservation.check_in <= end, 0.9),
+            likelihood(Reservation.check_out >= start, 0.01),
+        )
+        .order_by(Reservation.check_in, Reservation.id)
+    )
+
+
+def build_day_sheet(active: List[ReservationSummary], day: date, today: date, with_rows: bool) -> DaySheet:
+    """Classify the stays touching `day` into a DaySheet.
+
+    In-house covers every stay occupying that night, arrivals included.
+    """
+    sheet = DaySheet(day=day)
+    for r in active:
+        # A stay whose arrival date passed without check-in is a no-show
+        no_show = r.status == ReservationStatus.CONFIRMED and r.check_in < today
+        if r.check_in == day:
+            if no_show:
+                sheet.no_shows_count += 1
+                if with_rows:
+                    sheet.no_shows.append(r)
+                continue
+            sheet.arrivals_count += 1
+            if with_rows:
+                sheet.arrivals.append(r)
+        if no_show:
+            continue
+        if r.check_out == day:
+            sheet.departures_count += 1
+            if with_rows:
+                sheet.departures.append(r)
+        elif r.check_in <= day:
+            sheet.in_house_count += 1
+            if with_rows:
+                sheet.in_house.append(r)
+    return sheet
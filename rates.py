@@ -0,0 +1,193 @@
+import threading
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, select
+from models import Room, RoomType, RoomRate, RateRule, DEFAULT_PROPERTY
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# How far ahead of today the calendar is built by default
+DEFAULT_HORIZON_DAYS = 400
+
+
+class RateCalendar:
+    """In-memory nightly rate table per RoomType, priced with NumPy.
+
+    Nightly rates are the type's base rate (the lowest `price_per_night` of its
+    rooms) times every matching weekday/season rule, replaced by a `RoomRate`
+    override where one exists. Stay totals come from prefix sums, so any number
+    of stays is priced with a couple of array lookups. The table is built on
+    first use and rebuilt after `invalidate()`.
+    """
+
+    def __init__(self, engine, property_id: str = DEFAULT_PROPERTY):
+        self.engine = engine
+        self.property_id = property_id
+        # Guards only the swap of _table; never held across a database read, which
+        # could wait on a pool checkout or (async callers) on the event loop itself
+        self._lock = threading.Lock()
+        self._table: Optional[dict] = None
+        self._generation = 0
+
+    def invalidate(self):
+        """Drop the cached table; the next quote reloads it from the database"""
+        with self._lock:
+            self._table = None
+            self._generation += 1
+
+    def _get_table(self, start: date, end: date, session: Optional[Session] = None) -> dict:
+        table = self._table
+        if table is not None and table["origin"] <= start and end <= table["end"]:
+            return table
+        with self._lock:
+            table, generation = self._table, self._generation
+        today = date.today()
+        origin = min(start, today)
+        if table is not None:
+            origin = min(origin, table["origin"])
+        horizon = max(end, today + timedelta(days=DEFAULT_HORIZON_DAYS))
+        # Concurrent callers on a cold calendar may each build; the last one wins
+        if session is None:
+            with Session(self.engine) as session:
+                table = self._build(origin, horizon, session)
+        else:
+            table = self._build(origin, horizon, session)
+        with self._lock:
+            # A table read before an invalidate() is still fine for this quote, but not for the next
+            if self._generation == generation:
+                self._table = table
+        return table
+
+    def _build(self, origin: date, end: date, session: Session) -> dict:
+        # NumPy is only loaded once something is actually priced
+        import numpy as np
+        days = np.arange(np.datetime64(origin, "D"), np.datetime64(end, "D") + 1)
+        # 1970-01-01 was a Thursday
+        weekdays = (days.astype(np.int64) + 3) % 7
+        types = list(RoomType)
+        type_index = {t: i for i, t in enumerate(types)}
+
+        base = dict(session.exec(
+            select(Room.type, func.min(Room.price_per_night))
+            .where(Room.property_id == self.property_id)
+            .group_by(Room.type)
+        ).all())
+        rules = session.exec(select(RateRule).where(RateRule.property_id == self.property_id)).all()
+        overrides = session.exec(
+            select(RoomRate).where(
+                RoomRate.property_id == self.property_id,
+                RoomRate.day >= origin,
+                RoomRate.day <= end,
+            )
+        ).all()
+
+        nightly = np.zeros((len(types), len(days)))
+        for t, i in type_index.items():
+            nightly[i, :] = base.get(t, 0.0)
+
+        def matching_days(rule: RateRule) -> Optional["np.ndarray"]:
+            """Days the rule's weekday and season cover; None if it has neither"""
+            if rule.weekday is None and not rule.start_date and not rule.end_date:
+                return None
+            mask = np.ones(len(days), dtype=bool)
+            if rule.weekday is not None:
+                mask &= weekdays == rule.weekday
+            if rule.start_date:
+                mask &= days >= np.datetime64(rule.start_date, "D")
+            if rule.end_date:
+                mask &= days <= np.datetime64(rule.end_date, "D")
+            return mask
+
+        los: Dict[int, List[Tuple[int, float, Optional["np.ndarray"]]]] = {i: [] for i in type_index.values()}
+        for rule in rules:
+            rows = [type_index[rule.room_type]] if rule.room_type else list(type_index.values())
+            mask = matching_days(rule)
+            if rule.min_nights:
+                # Weekday and season select the arrival dates the discount is offered for
+                for i in rows:
+                    los[i].append((rule.min_nights, rule.multiplier, mask))
+                continue
+            columns = np.arange(len(days)) if mask is None else np.flatnonzero(mask)
+            nightly[np.ix_(rows, columns)] *= rule.multiplier
+
+        for override in overrides:
+            nightly[type_index[override.room_type], (override.day - origin).days] = override.price
+
+        # prefix[t, k] is the sum of the first k nightly rates of type t
+        prefix = np.zeros((len(types), len(days) + 1))
+        np.cumsum(nightly, axis=1, out=prefix[:, 1:])
+
+        # Length-of-stay rules per type, ascending by threshold
+        for entries in los.values():
+            entries.sort(key=lambda e: (e[0], e[1]))
+
+        return {
+            "origin": origin,
+            "end": end,
+            "type_index": type_index,
+            "base": base,
+            "nightly": nightly,
+            "prefix": prefix,
+            "los": los,
+        }
+
+    def nightly_rates(self, room_type: RoomType, check_in: date, check_out: date) -> "np.ndarray":
+        """Nightly base-room rates for each night of a stay"""
+        table = self._get_table(check_in, check_out)
+        i = table["type_index"][room_type]
+        origin = table["origin"]
+        return table["nightly"][i, (check_in - origin).days:(check_out - origin).days].copy()
+
+    def quote_many(self, room_types: Sequence[RoomType], check_ins: Sequence[date],
+                   check_outs: Sequence[date], base_prices: Optional[Sequence[float]] = None,
+                   session: Optional[Session] = None) -> "np.ndarray":
+        """Total price for many stays at once.
+
+        `base_prices`, when given, scales each stay by the room's own
+        price_per_night relative to its type's base rate, so premium rooms keep
+        their premium. `session` is used if the table has to be (re)loaded,
+        which lets async callers price through `run_sync`.
+        """
+        import numpy as np
+        if not len(room_types):
+            return np.zeros(0)
+        table = self._get_table(min(check_ins), max(check_outs), session)
+        origin = np.datetime64(table["origin"], "D")
+        types = np.array([table["type_index"][t] for t in room_types], dtype=np.int64)
+        start = (np.array(check_ins, dtype="datetime64[D]") - origin).astype(np.int64)
+        stop = (np.array(check_outs, dtype="datetime64[D]") - origin).astype(np.int64)
+
+        prefix = table["prefix"]
+        totals = prefix[types, stop] - prefix[types, start]
+
+        nights = stop - start
+        for i, rules in table["los"].items():
+            if not rules:
+                continue
+            mask = types == i
+            if not mask.any():
+                continue
+            stay_nights, arrivals = nights[mask], start[mask]
+            factor = np.ones(len(stay_nights))
+            # Ascending thresholds, so the longest one that applies is written last
+            for min_nights, multiplier, arrival_days in rules:
+                applies = stay_nights >= min_nights
+                if arrival_days is not None:
+                    applies &= arrival_days[arrivals]
+                factor[applies] = multiplier
+            totals[mask] *= factor
+
+        if base_prices is not None:
+            type_base = np.array([table["base"].get(t, 0.0) for t in room_types])
+            prices = np.asarray(base_prices, dtype=np.float64)
+            totals *= np.divide(prices, type_base, out=np.ones_like(prices), where=type_base > 0)
+
+        return np.round(totals, 2)
+
+    def quote(self, room_type: RoomType, check_in: date, check_out: date,
+              base_price: Optional[float] = None, session: Optional[Session] = None) -> float:
+        """Total price for a single stay"""
+        base_prices = None if base_price is None else [base_price]
+        return float(self.quote_many([room_type], [check_in], [check_out], base_prices, session)[0])
@@ -0,0 +1,106 @@
+"""
+Read/write splitting for HotelSystem.
+
+Read-only queries go to a healthy read replica (round robin), writes and
+everything else to the primary. A session that just wrote is pinned to the
+primary for a few seconds so it reads its own booking even while replicas
+lag. Replicas that fail a health check or drop connections are skipped until
+they pass again; with none healthy, reads fall back to the primary.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+# Identifies the caller (e.g. the logged-in user) for read-your-writes stickiness
+current_session: ContextVar[Optional[str]] = ContextVar("hotel_session", default=None)
+
+
+class ReplicaSet:
+    """Chooses the engine for each read"""
+
+    def __init__(self, primary: Engine, replicas: Optional[List[Engine]] = None,
+                 sticky_seconds: float = 5.0, health_interval: float = 10.0):
+        self.primary = primary
+        self.replicas = list(replicas or [])
+        self.sticky_seconds = sticky_seconds
+        self.health_interval = health_interval
+        self._round_robin = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._lock = threading.Lock()
+        self._sticky_until: Dict[str, float] = {}
+        # replica index -> (healthy, checked_at)
+        self._health: Dict[int, tuple] = {}
+        for i, engine in enumerate(self.replicas):
+            event.listen(engine, "handle_error", self._error_listener(i))
+
+    @property
+    def engines(self) -> List[Engine]:
+        return [self.primary] + self.replicas
+
+    def _error_listener(self, index: int):
+        def on_error(context):
+            if context.is_disconnect:
+                self.mark_unhealthy(index)
+        return on_error
+
+    def mark_unhealthy(self, index: int):
+        with self._lock:
+            self._health[index] = (False, time.monotonic())
+
+    def _is_healthy(self, index: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self._health.get(index, (None, 0.0))
+        if healthy is not None and now - checked_at < self.health_interval:
+            return healthy
+        try:
+            with self.replicas[index].connect() as conn:
+                conn.execute(text("SELECT 1"))
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._lock:
+            self._health[index] = (healthy, now)
+        return healthy
+
+    def note_write(self, key: Optional[str] = None):
+        """Pin the current session to the primary for sticky_seconds"""
+        key = key or current_session.get()
+        if not key or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._sticky_until[key] = now + self.sticky_seconds
+            if len(self._sticky_until) > 10_000:
+                self._sticky_until = {k: t for k, t in self._sticky_until.items() if t > now}
+
+    def for_read(self) -> Engine:
+        """Engine for a read-only query"""
+        if not self.replicas:
+            return self.primary
+        key = current_session.get()
+        if key:
+            with self._lock:
+                pinned = self._sticky_until.get(key, 0.0) > time.monotonic()
+            if pinned:
+                return self.primary
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                index = next(self._round_robin)
+            if self._is_healthy(index):
+                return self.replicas[index]
+        return self.primary
+
+
+@contextmanager
+def session_scope(key: Optional[str]):
+    """Attribute the reads and writes inside the block to one session"""
+    token = current_session.set(key)
+    try:
+        yield
+    finally:
+        current_session.reset(token)
@@ -1,46 +1,101 @@
-import uuid
-from datetime import date, datetime
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from contextvars import Token
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import insert, text
 from sqlmodel import Session, SQLModel, create_engine, select
-from models import Room, RoomType, RoomStatus, Guest, GuestType, Reservation, ReservationStatus, User
+from models import Room, RoomType, RoomStatus, Guest, GuestType, Reservation, ReservationStatus, User, DEFAULT_PROPERTY, ReservationView, ReservationSummary, DaySheet, RoomRate, RateRule, NightAuditReport, ArchiveReport, ExportReport, AllocationPlan, AllotmentBlock, ChangeKind, InventoryChange, GuestMatch
+from ids import new_id
+import queries
+from rates import RateCalendar
+from night_audit import NightAudit
+from archive import ReservationArchiver, DEFAULT_HORIZON_DAYS
+import export
+from allocation import RoomAllocator
+from changefeed import ChangeFeed, ChangeCursor, change, log_changes, rate_rule_change
+import guest_search
+from instrumentation import QueryProfiler
+from replicas import ReplicaSet, current_session
 from auth import AuthManager
 
+# Demo room seed for an empty property: (Prefix, Count, Type, Price)
+DEMO_ROOMS = [
+    ("1", 8, RoomType.STANDARD, 800.0),
+    ("2", 6, RoomType.DELUXE, 1200.0),
+    ("3", 4, RoomType.SUITE, 2000.0),
+]
+
 class HotelSystem:
-    def __init__(self, db_url: Optional[str] = None):
-        if db_url:
-            # Supabase/Postgres usually requires SSL
-            connect_args = {}
-            if "postgresql" in db_url:
-                connect_args = {"sslmode": "require"}
-            self.engine = create_engine(db_url, connect_args=connect_args)
-        else:
-            self.engine = create_engine("sqlite:///hotel_inr.db")
+    def __init__(self, db_url: Optional[str] = None, property_id: str = DEFAULT_PROPERTY,
+                 schema: Optional[str] = None, replica_urls: Optional[List[str]] = None):
+        # One HotelSystem serves one property; PropertyRouter maps properties to systems
+        self.property_id = property_id
+        self.schema = schema
+        self.engine = self._make_engine(db_url or "sqlite:///hotel_inr.db")
+        # Read-only methods go to replicas when configured; writes always use self.engine
+        self.replicas = ReplicaSet(self.engine, [self._make_engine(url) for url in replica_urls or []])
         
         self._create_db_and_tables()
         self._initialize_mock_data()
+        self.rates = RateCalendar(self.engine, property_id)
+        self.profiler: Optional[QueryProfiler] = None
+        # Writes from other app instances reach this one's caches through sync_changes()
+        self.changes = ChangeCursor(ChangeFeed(self.engine, property_id))
+        self.changes.subscribe(self._apply_changes)
+        self.guest_search = guest_search.for_engine(self.engine)
+
+    def enable_profiling(self, n_plus_one_threshold: int = 5) -> QueryProfiler:
+        """Start recording per-method query counts and latencies"""
+        if self.profiler is None:
+            self.profiler = QueryProfiler(n_plus_one_threshold)
+            self.profiler.attach(self, self.replicas.engines)
+        return self.profiler
+
+    def disable_profiling(self):
+        """Stop recording and remove all profiling hooks"""
+        if self.profiler is not None:
+            self.profiler.detach()
+            self.profiler = None
+
+    def _make_engine(self, db_url: str):
+        connect_args = {}
+        # Supabase/Postgres usually requires SSL; an explicit sslmode in the URL wins
+        if "postgresql" in db_url and "sslmode=" not in db_url:
+            connect_args = {"sslmode": "require"}
+        engine = create_engine(db_url, connect_args=connect_args)
+        queries.begin_sqlite_transactions(engine)
+        if self.schema:
+            # Postgres schema per property: unqualified tables resolve to this schema
+            engine = engine.execution_options(schema_translate_map={None: self.schema})
+        return engine
+
+    def set_session_key(self, key: Optional[str]) -> Token:
+        """Attribute this thread's following calls to one caller (e.g. the logged-in user).
+
+        After that caller writes, its reads stay on the primary for a few
+        seconds so it sees its own booking even if replicas lag. Set it at the
+        start of every request, None for anonymous ones, or pass the returned
+        token to current_session.reset(); replicas.session_scope does both.
+        """
+        return current_session.set(key)
 
     def _create_db_and_tables(self):
+        if self.schema:
+            with self.engine.begin() as conn:
+                conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{self.schema}"'))
         SQLModel.metadata.create_all(self.engine)
 
     def _initialize_mock_data(self):
         with Session(self.engine) as session:
             # Check if rooms exist
-            statement = select(Room)
+            statement = select(Room).where(Room.property_id == self.property_id)
             results = session.exec(statement).all()
             if not results:
                 # Create some rooms
-                # Define configurations: (Prefix, Count, Type, Price)
-                configs = [
-                    ("1", 8, RoomType.STANDARD, 800.0),
-                    ("2", 6, RoomType.DELUXE, 1200.0),
-                    ("3", 4, RoomType.SUITE, 2000.0),
-                ]
-                
-                for prefix, count, r_type, price in configs:
+                for prefix, count, r_type, price in DEMO_ROOMS:
                     for i in range(1, count + 1):
                         num = f"{prefix}{i:02d}" # e.g., 101, 102...
-                        r_id = str(uuid.uuid4())
-                        room = Room(id=r_id, number=num, type=r_type, price_per_night=price)
+                        r_id = new_id()
+                        room = Room(id=r_id, property_id=self.property_id, number=num, type=r_type, price_per_night=price)
                         session.add(room)
                 session.commit()
 
@@ -56,55 +111,59 @@ class HotelSystem:
             if existing:
                 return existing
                 
-            g_id = str(uuid.uuid4())
+            g_id = new_id()
             guest = Guest(id=g_id, name=name, type=guest_type)
             session.add(guest)
+            log_changes(session, [change(ChangeKind.GUEST, self.property_id, g_id)])
             session.commit()
             session.refresh(guest)
+            self.guest_search.add([guest])
             return guest
 
-    def check_availability(self, check_in: date, check_out: date, room_type: Optional[RoomType] = None) -> List[Room]:
-        with Session(self.engine) as session:
-            statement = select(Room).where(Room.status == RoomStatus.AVAILABLE)
+    def search_guests(self, query: str, limit: int = guest_search.DEFAULT_LIMIT) -> List[GuestMatch]:
+        """Best matches for a partial name, email or phone number, as typed at the front desk"""
+        return self.guest_search.search(query, limit)
+
+    def get_rooms(self, room_type: Optional[RoomType] = None) -> List[Room]:
+        """All rooms of this property, optionally of one type"""
+        with Session(self.replicas.for_read()) as session:
+            statement = select(Room).where(Room.property_id == self.property_id)
             if room_type:
                 statement = statement.where(Room.type == room_type)
-            
+            return session.exec(statement.order_by(Room.number)).all()
+
+    def check_availability(self, check_in: date, check_out: date, room_type: Optional[RoomType] = None) -> List[Room]:
+        with Session(self.replicas.for_read()) as session:
+            statement = queries.available_rooms(self.property_id, check_in, check_out, room_type)
             rooms = session.exec(statement).all()
-            available_rooms = []
-            
-            for room in rooms:
-                # Check overlap with existing confirmed/checked-in reservations
-                res_statement = select(Reservation).where(
-                    Reservation.room_id == room.id,
-                    Reservation.status.in_([ReservationStatus.CONFIRMED, ReservationStatus.CHECKED_IN])
-                )
-                reservations = session.exec(res_statement).all()
-                
-                is_booked = False
-                for res in reservations:
-                    if not (check_out <= res.check_in or check_in >= res.check_out):
-                        is_booked = True
-                        break
-                
-                if not is_booked:
-                    available_rooms.append(room)
-            
-            return available_rooms
+            holds = session.exec(queries.active_holds(self.property_id, check_in, check_out, date.today())).all()
+            return queries.without_held(rooms, queries.held_by_type(holds, check_in, check_out))
 
     def create_reservation(self, guest_id: str, room_id: str, check_in: date, check_out: date) -> Reservation:
         with Session(self.engine) as session:
-            room = session.get(Room, room_id)
-            if not room:
+            # The row lock (BEGIN IMMEDIATE on SQLite) serializes concurrent bookings of the same room
+            session.connection(execution_options=queries.BOOKING_TRANSACTION)
+            room = session.exec(select(Room).where(Room.id == room_id).with_for_update()).first()
+            if not room or room.property_id != self.property_id:
                 raise ValueError("Room not found")
             
             nights = (check_out - check_in).days
             if nights < 1:
                 raise ValueError("Stay must be at least 1 night")
+            if session.exec(queries.room_conflicts(room_id, check_in, check_out)).first():
+                raise ValueError("Room is already booked for these dates")
+            holds = session.exec(queries.active_holds(self.property_id, check_in, check_out, date.today())).all()
+            held = queries.held_by_type(holds, check_in, check_out).get(room.type, 0)
+            if held:
+                free = session.exec(queries.available_rooms(self.property_id, check_in, check_out, room.type)).all()
+                if len(free) <= held:
+                    raise ValueError("The remaining rooms of this type are held for a group")
 
-            total_price = room.price_per_night * nights
-            res_id = str(uuid.uuid4())
+            total_price = self.rates.quote(room.type, check_in, check_out, room.price_per_night, session=session)
+            res_id = new_id()
             reservation = Reservation(
                 id=res_id,
+                property_id=self.property_id,
                 guest_id=guest_id,
                 room_id=room_id,
                 check_in=check_in,
@@ -112,28 +171,265 @@ class HotelSystem:
                 total_price=total_price
             )
             session.add(reservation)
+            log_changes(session, [change(ChangeKind.RESERVATION, self.property_id, res_id, room.type, check_in, check_out)])
             session.commit()
             session.refresh(reservation)
+            self.replicas.note_write()
             return reservation
 
-    def get_checkouts(self, day: date) -> List[Reservation]:
+    def _free_after_holds(self, session: Session, requested: Dict[RoomType, int], check_in: date,
+                          check_out: date, exclude_group: Optional[str] = None) -> List[Room]:
+        """Lock the requested types' rooms, then list those free for the stay and not held"""
+        session.connection(execution_options=queries.BOOKING_TRANSACTION)
+        session.exec(queries.lock_rooms(self.property_id, list(requested))).all()
+        available = session.exec(queries.available_rooms(self.property_id, check_in, check_out)).all()
+        holds = session.exec(queries.active_holds(
+            self.property_id, check_in, check_out, date.today(), exclude_group=exclude_group
+        )).all()
+        return queries.without_held(available, queries.held_by_type(holds, check_in, check_out))
+
+    def book_group(self, guest_id: str, check_in: date, check_out: date, rooms: Dict[RoomType, int],
+                   group_id: Optional[str] = None) -> List[Reservation]:
+        """Book several rooms for the same dates, all or nothing.
+
+        One availability check covers the whole request and the reservations
+        go in as a single batched insert. Passing the `group_id` of an
+        allotment block books against the rooms it holds and counts them as
+        picked up.
+        """
+        requested = {t: n for t, n in rooms.items() if n > 0}
+        if not requested:
+            raise ValueError("Request at least one room")
+        if (check_out - check_in).days < 1:
+            raise ValueError("Stay must be at least 1 night")
+
+        with Session(self.engine) as session:
+            chosen = queries.pick_rooms(
+                self._free_after_holds(session, requested, check_in, check_out, group_id), requested
+            )
+
+            n = len(chosen)
+            prices = self.rates.quote_many([r.type for r in chosen], [check_in] * n, [check_out] * n,
+                                           [r.price_per_night for r in chosen], session=session)
+            group_id = group_id or new_id()
+            rows = [
+                dict(id=new_id(), property_id=self.property_id, guest_id=guest_id, room_id=room.id,
+                     check_in=check_in, check_out=check_out, total_price=float(price),
+                     status=ReservationStatus.CONFIRMED, group_id=group_id, created_at=datetime.now())
+                for room, price in zip(chosen, prices)
+            ]
+            session.execute(insert(Reservation), rows)
+            log_changes(session, [
+                change(ChangeKind.RESERVATION, self.property_id, row["id"], room.type, check_in, check_out)
+                for row, room in zip(rows, chosen)
+            ])
+
+            blocks = session.exec(select(AllotmentBlock).where(
+                AllotmentBlock.property_id == self.property_id, AllotmentBlock.group_id == group_id
+            )).all()
+            for block in blocks:
+                block.rooms_picked_up = min(block.rooms_held, block.rooms_picked_up + requested.get(block.room_type, 0))
+                session.add(block)
+            session.commit()
+            self.replicas.note_write()
+            return [Reservation(**row) for row in rows]
+
+    def create_block(self, guest_id: str, check_in: date, check_out: date, rooms: Dict[RoomType, int],
+                     release_date: date, name: str = "") -> List[AllotmentBlock]:
+        """Hold rooms for a group until `release_date`; book them later with book_group(group_id=...)"""
+        requested = {t: n for t, n in rooms.items() if n > 0}
+        if not requested:
+            raise ValueError("Request at least one room")
+        if (check_out - check_in).days < 1:
+            raise ValueError("Stay must be at least 1 night")
+        if release_date > check_in:
+            raise ValueError("Release date must be on or before check-in")
+
         with Session(self.engine) as session:
+            queries.pick_rooms(self._free_after_holds(session, requested, check_in, check_out), requested)
+
+            group_id = new_id()
+            blocks = [
+                AllotmentBlock(id=new_id(), property_id=self.property_id, group_id=group_id, name=name,
+                               guest_id=guest_id, room_type=room_type, check_in=check_in, check_out=check_out,
+                               rooms_held=count, release_date=release_date)
+                for room_type, count in requested.items()
+            ]
+            session.add_all(blocks)
+            log_changes(session, [
+                change(ChangeKind.BLOCK, self.property_id, block.id, block.room_type, check_in, check_out)
+                for block in blocks
+            ])
+            session.commit()
+            for block in blocks:
+                session.refresh(block)
+            self.replicas.note_write()
+            return blocks
+
+    def get_checkouts(self, day: date) -> List[Reservation]:
+        with Session(self.replicas.for_read()) as session:
             statement = select(Reservation).where(
+                Reservation.property_id == self.property_id,
                 Reservation.check_out == day,
                 Reservation.status == ReservationStatus.CHECKED_IN
             )
             return session.exec(statement).all()
             
-    def get_all_reservations(self) -> List[Reservation]:
+    def get_day_sheet(self, day: date) -> DaySheet:
+        """Arrivals, departures, in-house stays and no-shows for one date"""
+        return next(self.iter_day_sheets(day, day))
+
+    def iter_day_sheets(self, start: date, end: date, with_rows: bool = True) -> Iterator[DaySheet]:
+        """Stream one DaySheet per date from start to end (inclusive).
+
+        Runs a single query ordered by check-in and sweeps it date by date, so
+        a 30-day operations view never holds more than the stays in house on
+        the current date. In-house covers every stay occupying that night,
+        arrivals included. With `with_rows=False` only the counts are filled.
+        """
+        today = date.today()
+        statement = queries.day_sheet_rows(self.property_id, start, end).execution_options(yield_per=500)
+
+        with Session(self.replicas.for_read()) as session:
+            rows = (ReservationSummary(**row._mapping) for row in session.exec(statement))
+            upcoming = next(rows, None)
+            active: List[ReservationSummary] = []
+
+            day = start
+            while day <= end:
+                while upcoming is not None and upcoming.check_in <= day:
+                    active.append(upcoming)
+                    upcoming = next(rows, None)
+                active = [r for r in active if r.check_out >= day]
+                yield queries.build_day_sheet(active, day, today, with_rows)
+                day += timedelta(days=1)
+
+    def run_night_audit(self, business_date: Optional[date] = None, auto_check_in: bool = True) -> NightAuditReport:
+        """Close a business date (defaults to yesterday); safe to re-run"""
+        return NightAudit(self.engine, self.property_id, auto_check_in).run(business_date)
+
+    def archive_reservations(self, horizon_days: int = DEFAULT_HORIZON_DAYS,
+                             max_batches: Optional[int] = None) -> ArchiveReport:
+        """Move closed stays older than the horizon to the archive table; safe to re-run"""
+        return ReservationArchiver(self.engine, self.property_id, horizon_days).run(max_batches=max_batches)
+
+    def export_reservations(self, path: str, start: Optional[date] = None, end: Optional[date] = None,
+                            statuses: Optional[List[ReservationStatus]] = None, **options) -> ExportReport:
+        """Stream reservations with guest and room details to CSV/JSONL/Parquet (see export.py)"""
+        return export.export_reservations(self.replicas.for_read(), path, property_id=self.property_id,
+                                          start=start, end=end, statuses=statuses, **options)
+
+    def optimize_allocation(self, room_type: Optional[RoomType] = None, apply: bool = False) -> AllocationPlan:
+        """Repack unlocked future stays within their room type to close short gaps.
+
+        Without `apply` only the move plan is returned; with it the moves are
+        made and recorded as RoomMove rows.
+        """
+        allocator = RoomAllocator(self.engine, self.property_id)
+        return allocator.optimize(room_type) if apply else allocator.plan(room_type)
+
+    def set_room_lock(self, reservation_id: str, locked: bool = True) -> bool:
+        """Pin a reservation to its room so the allocation optimizer leaves it there"""
         with Session(self.engine) as session:
-            return session.exec(select(Reservation)).all()
+            reservation = session.get(Reservation, reservation_id)
+            if not reservation or reservation.property_id != self.property_id:
+                return False
+            reservation.room_locked = locked
+            session.add(reservation)
+            session.commit()
+            return True
+
+    def get_all_reservations(self) -> List[Reservation]:
+        """Live reservations of this property (archived stays are excluded)"""
+        with Session(self.replicas.for_read()) as session:
+            return session.exec(select(Reservation).where(Reservation.property_id == self.property_id)).all()
 
     def get_room_stats(self):
-        with Session(self.engine) as session:
-            total = session.exec(select(Room)).all()
+        with Session(self.replicas.for_read()) as session:
+            total = session.exec(select(Room).where(Room.property_id == self.property_id)).all()
             occupied = [r for r in total if r.status == RoomStatus.OCCUPIED] # Simplified logic
             return len(occupied), len(total)
     
+    # ==== RATE MANAGEMENT METHODS ====
+
+    def quote_rooms(self, rooms: List[Room], check_in: date, check_out: date) -> List[float]:
+        """Total stay price for each room, in the same order"""
+        n = len(rooms)
+        totals = self.rates.quote_many(
+            [r.type for r in rooms], [check_in] * n, [check_out] * n, [r.price_per_night for r in rooms]
+        )
+        return totals.tolist()
+
+    def set_room_rate(self, room_type: RoomType, day: date, price: float) -> RoomRate:
+        """Set (or replace) the nightly rate of a room type on one date"""
+        with Session(self.engine) as session:
+            rate = session.exec(
+                select(RoomRate).where(
+                    RoomRate.property_id == self.property_id,
+                    RoomRate.room_type == room_type,
+                    RoomRate.day == day,
+                )
+            ).first()
+            if rate:
+                rate.price = price
+            else:
+                rate = RoomRate(id=new_id(), property_id=self.property_id,
+                                room_type=room_type, day=day, price=price)
+            session.add(rate)
+            log_changes(session, [change(ChangeKind.RATE, self.property_id, rate.id, room_type, day, day + timedelta(days=1))])
+            session.commit()
+            session.refresh(rate)
+        self.rates.invalidate()
+        return rate
+
+    def add_rate_rule(self, multiplier: float, room_type: Optional[RoomType] = None,
+                      weekday: Optional[int] = None, start_date: Optional[date] = None,
+                      end_date: Optional[date] = None, min_nights: Optional[int] = None) -> RateRule:
+        """Add a weekday, season or length-of-stay multiplier"""
+        rule = RateRule(
+            id=new_id(),
+            property_id=self.property_id,
+            room_type=room_type,
+            weekday=weekday,
+            start_date=start_date,
+            end_date=end_date,
+            min_nights=min_nights,
+            multiplier=multiplier,
+        )
+        with Session(self.engine) as session:
+            session.add(rule)
+            log_changes(session, [rate_rule_change(rule)])
+            session.commit()
+            session.refresh(rule)
+        self.rates.invalidate()
+        return rule
+
+    def remove_rate_rule(self, rule_id: str) -> bool:
+        """Delete a rate rule"""
+        with Session(self.engine) as session:
+            rule = session.get(RateRule, rule_id)
+            if not rule or rule.property_id != self.property_id:
+                return False
+            session.delete(rule)
+            log_changes(session, [rate_rule_change(rule)])
+            session.commit()
+        self.rates.invalidate()
+        return True
+
+    # ==== CHANGE FEED ====
+
+    def sync_changes(self) -> List[InventoryChange]:
+        """Apply changes committed since the last call (by any app instance) to local caches and the guest index"""
+        return self.changes.poll()
+
+    def _apply_changes(self, changes: List[InventoryChange]):
+        if any(c.kind == ChangeKind.RATE for c in changes):
+            self.rates.invalidate()
+        guest_ids = [c.entity_id for c in changes if c.kind == ChangeKind.GUEST]
+        if guest_ids:
+            with Session(self.engine) as session:
+                self.guest_search.add(session.exec(select(Guest).where(Guest.id.in_(guest_ids))).all())
+
     # ==== USER MANAGEMENT METHODS ====
     
     def create_user(self, email: str, password: str, full_name: str) -> Optional[User]:
@@ -145,7 +441,7 @@ class HotelSystem:
                 return None  # Email already registered
             
             # Create new user
-            user_id = str(uuid.uuid4())
+            user_id = new_id()
             password_hash = AuthManager.hash_password(password)
             user = User(
                 id=user_id,
@@ -156,6 +452,7 @@ class HotelSystem:
             session.add(user)
             session.commit()
             session.refresh(user)
+            self.replicas.note_write()
             return user
     
     def auto_verify_user(self, user_id: str) -> bool:
@@ -190,20 +487,42 @@ class HotelSystem:
         with Session(self.engine) as session:
             return session.get(User, user_id)
     
-    def get_user_reservations(self, user_id: str) -> List[Reservation]:
-        """Get all reservations for a specific user"""
+    def get_or_create_guest_for_user(self, user_id: str, name: str, email: Optional[str] = None) -> Guest:
+        """Get the guest profile linked to a user account, creating it on first booking"""
         with Session(self.engine) as session:
-            # Get all guests associated with this user
-            guests = session.exec(select(Guest).where(Guest.user_id == user_id)).all()
-            guest_ids = [g.id for g in guests]
-            
-            # Get all reservations for these guests
-            if guest_ids:
-                reservations = session.exec(
-                    select(Reservation).where(Reservation.guest_id.in_(guest_ids))
-                ).all()
-                return reservations
-            return []
+            guest = session.exec(select(Guest).where(Guest.user_id == user_id)).first()
+            if guest:
+                return guest
+            guest = Guest(id=new_id(), user_id=user_id, name=name, email=email)
+            session.add(guest)
+            log_changes(session, [change(ChangeKind.GUEST, self.property_id, guest.id)])
+            session.commit()
+            session.refresh(guest)
+            self.replicas.note_write()
+            self.guest_search.add([guest])
+            return guest
+    
+    def get_user_reservations(
+        self,
+        user_id: str,
+        view: Optional[ReservationView] = None,
+        limit: Optional[int] = 20,
+        after: Optional[Tuple[date, str]] = None,
+    ) -> List[ReservationSummary]:
+        """Get one page of a user's reservations at this property, newest first (upcoming stays soonest first).
+
+        Pass the last row's `cursor` as `after` to fetch the next page.
+        """
+        with Session(self.replicas.for_read()) as session:
+            statement = queries.user_reservations(self.property_id, user_id, view, limit, after, date.today())
+            return [ReservationSummary(**row._mapping) for row in session.exec(statement)]
+
+    def get_reservation_summary(self, reservation_id: str) -> Optional[ReservationSummary]:
+        """A live reservation with its guest name and room, e.g. to confirm a booking just made"""
+        # From the primary, which already has a booking made a moment ago
+        with Session(self.engine) as session:
+            row = session.exec(queries.reservation_summary(reservation_id)).first()
+            return ReservationSummary(**row._mapping) if row else None
     
     def send_verification_otp(self, user_id: str) -> bool:
         """Generate and send OTP to user's email"""
@@ -0,0 +1,156 @@
+"""
+Parity check: runs the same operations through HotelSystem and AsyncHotelSystem
+on one database and compares the results.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from system import HotelSystem
+from async_system import AsyncHotelSystem
+from models import RoomType, ReservationView
+
+failures = []
+
+def check(label, sync_value, async_value):
+    ok = sync_value == async_value
+    print(f"{'OK  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        failures.append(label)
+        print(f"     sync:  {sync_value}")
+        print(f"     async: {async_value}")
+
+def ids(rows):
+    return [r.id for r in rows]
+
+async def verify(db_url: str):
+    print("Initializing both systems on", db_url)
+    system = HotelSystem(db_url=db_url)
+    async_system = await AsyncHotelSystem.create(db_url)
+    today = date.today()
+    check_in, check_out = today + timedelta(days=1), today + timedelta(days=3)
+
+    print("\n--- Writes through async, reads through both ---")
+    user = await async_system.create_user("parity@example.com", "parity-pw", "Parity Guest")
+    check("duplicate email rejected", system.create_user("parity@example.com", "x", "y"),
+          await async_system.create_user("parity@example.com", "x", "y"))
+    check("verify_login", system.verify_login(user.email, "parity-pw").id,
+          (await async_system.verify_login(user.email, "parity-pw")).id)
+    check("verify_login wrong password", system.verify_login(user.email, "nope"),
+          await async_system.verify_login(user.email, "nope"))
+
+    guest = await async_system.get_or_create_guest_for_user(user.id, user.full_name, user.email)
+    check("guest for user", system.get_or_create_guest_for_user(user.id, "x").id, guest.id)
+
+    print("\n--- Guest search ---")
+    check("search_guests", system.search_guests("parity gu"), await async_system.search_guests("parity gu"))
+    # The first poll starts each cursor at the head of the change log
+    system.sync_changes()
+    await async_system.sync_changes()
+    walk_in = await async_system.create_guest("Parity Walk-In")
+    system.sync_changes()
+    check("search_guests finds a guest created through async", [walk_in.id],
+          [m.id for m in system.search_guests("parity walk")])
+    drop_in = system.create_guest("Parity Drop-In")
+    await async_system.sync_changes()
+    check("async search_guests finds a guest created through sync", [drop_in.id],
+          [m.id for m in await async_system.search_guests("parity drop")])
+
+    await async_system.add_rate_rule(1.25, weekday=5)
+    system.rates.invalidate()
+    check("get_rooms", ids(system.get_rooms()), ids(await async_system.get_rooms()))
+    for r_type in RoomType:
+        rooms = system.check_availability(check_in, check_out, r_type)
+        check(f"check_availability {r_type.value}", ids(rooms),
+              ids(await async_system.check_availability(check_in, check_out, r_type)))
+        check(f"quote_rooms {r_type.value}", system.quote_rooms(rooms, check_in, check_out + timedelta(days=5)),
+              await async_system.quote_rooms(rooms, check_in, check_out + timedelta(days=5)))
+
+    rooms = system.check_availability(check_in, check_out)
+    # Coroutines share the loop thread, so a cold calendar must not make one wait on another's load
+    async_system.rates.invalidate()
+    quotes = await asyncio.gather(*(async_system.quote_rooms(rooms, check_in, check_out) for _ in range(4)))
+    check("concurrent quotes on a cold calendar", [system.quote_rooms(rooms, check_in, check_out)] * 4, list(quotes))
+    booked = await async_system.create_reservation(guest.id, rooms[0].id, check_in, check_out)
+    other = system.create_reservation(guest.id, rooms[1].id, today - timedelta(days=2), today + timedelta(days=1))
+    check("get_reservation_summary", system.get_reservation_summary(booked.id),
+          await async_system.get_reservation_summary(booked.id))
+    check("booked room gone", ids(system.check_availability(check_in, check_out)),
+          ids(await async_system.check_availability(check_in, check_out)))
+    check("reservation price", other.total_price, (await async_system.create_reservation(
+        guest.id, rooms[2].id, today - timedelta(days=2), today + timedelta(days=1))).total_price)
+
+    print("\n--- Concurrent bookings of one room ---")
+    def attempt(book):
+        try:
+            return book()
+        except ValueError:
+            return None
+    free = system.check_availability(today + timedelta(days=20), today + timedelta(days=22))
+    stay = (today + timedelta(days=20), today + timedelta(days=22))
+    with ThreadPoolExecutor(8) as pool:
+        won = list(pool.map(lambda _: attempt(lambda: system.create_reservation(guest.id, free[0].id, *stay)), range(8)))
+    check("one of 8 threads books the room", 1, sum(r is not None for r in won))
+    async def attempt_async():
+        try:
+            return await async_system.create_reservation(guest.id, free[1].id, *stay)
+        except ValueError:
+            return None
+    won = await asyncio.gather(*(attempt_async() for _ in range(8)))
+    check("one of 8 coroutines books the room", 1, sum(r is not None for r in won))
+    with ThreadPoolExecutor(4) as pool:
+        groups = list(pool.map(lambda _: attempt(lambda: system.book_group(
+            guest.id, *stay, {RoomType.SUITE: len(system.check_availability(*stay, RoomType.SUITE))})), range(4)))
+    check("one of 4 threads books every free suite", 1, sum(g is not None for g in groups))
+
+    print("\n--- Listings and reports ---")
+    for view in [None, *ReservationView]:
+        check(f"get_user_reservations {view}", system.get_user_reservations(user.id, view),
+              await async_system.get_user_reservations(user.id, view))
+    page = system.get_user_reservations(user.id, limit=1)
+    check("get_user_reservations next page", system.get_user_reservations(user.id, limit=1, after=page[0].cursor),
+          await async_system.get_user_reservations(user.id, limit=1, after=page[0].cursor))
+    check("get_all_reservations", sorted(ids(system.get_all_reservations())),
+          sorted(ids(await async_system.get_all_reservations())))
+    check("get_room_stats", system.get_room_stats(), await async_system.get_room_stats())
+    check("day sheets", list(system.iter_day_sheets(today - timedelta(days=3), today + timedelta(days=5))),
+          [s async for s in async_system.iter_day_sheets(today - timedelta(days=3), today + timedelta(days=5))])
+
+    export_dir = tempfile.mkdtemp()
+    for fmt in ["csv", "jsonl"]:
+        paths = [os.path.join(export_dir, f"{side}.{fmt}") for side in ("sync", "async")]
+        system.export_reservations(paths[0])
+        await async_system.export_reservations(paths[1])
+        check(f"export_reservations {fmt}", *(open(path).read() for path in paths))
+
+    print("\n--- Night audit ---")
+    report = await async_system.run_night_audit(today)
+    check("night audit re-run is a no-op", [], list(system.run_night_audit(today).rows))
+    check("get_room_stats after audit", system.get_room_stats(), await async_system.get_room_stats())
+    check("get_checkouts", ids(system.get_checkouts(today + timedelta(days=1))),
+          ids(await async_system.get_checkouts(today + timedelta(days=1))))
+    print(f"Async audit touched: {report.rows}")
+
+    print("\n--- Room allocation ---")
+    check("set_room_lock", system.set_room_lock(booked.id), await async_system.set_room_lock(booked.id, False))
+    check("allocation plan", system.optimize_allocation().moves, (await async_system.optimize_allocation()).moves)
+
+    print("\n--- Concurrent dashboard queries ---")
+    stats, departures, recent = await asyncio.gather(
+        async_system.get_room_stats(),
+        async_system.get_checkouts(today + timedelta(days=1)),
+        async_system.get_all_reservations(),
+    )
+    print(f"Stats {stats}, {len(departures)} departures, {len(recent)} reservations")
+
+    await async_system.close()
+
+if __name__ == "__main__":
+    db_url = sys.argv[1] if len(sys.argv) > 1 else "sqlite:///" + os.path.join(tempfile.mkdtemp(), "parity.db")
+    asyncio.run(verify(db_url))
+    if failures:
+        print(f"\n{len(failures)} parity check(s) failed")
+        sys.exit(1)
+    print("\nAll parity checks passed")
@@ -0,0 +1,87 @@
+"""
+Replica routing check with local stand-ins: a primary SQLite file, a copy of it
+that never receives later writes (a lagging replica) and a replica URL that
+cannot be opened.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from system import HotelSystem
+from replicas import current_session, session_scope
+
+failures = []
+
+def check(label, expected, actual):
+    ok = expected == actual
+    print(f"{'OK  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        failures.append(label)
+        print(f"     expected: {expected}")
+        print(f"     actual:   {actual}")
+
+def ids(rows):
+    return sorted(r.id for r in rows)
+
+def verify(directory: str):
+    primary = os.path.join(directory, "primary.db")
+    lagging = os.path.join(directory, "replica.db")
+    unreachable = os.path.join(directory, "missing", "replica.db")
+    HotelSystem(db_url=f"sqlite:///{primary}")
+    shutil.copy(primary, lagging)
+
+    system = HotelSystem(db_url=f"sqlite:///{primary}", replica_urls=[f"sqlite:///{unreachable}", f"sqlite:///{lagging}"])
+    replicas = system.replicas
+    check_in, check_out = date.today() + timedelta(days=1), date.today() + timedelta(days=3)
+
+    print("--- Routing ---")
+    check("reads skip the unreachable replica", [replicas.replicas[1]] * 4, [replicas.for_read() for _ in range(4)])
+
+    print("\n--- Read-your-writes ---")
+    guest = system.create_guest("Replica Guest")
+    room = system.check_availability(check_in, check_out)[0]
+    replicas.sticky_seconds = 0.5
+    with session_scope("writer"):
+        booked = system.create_reservation(guest.id, room.id, check_in, check_out)
+        check("writer reads its booking from the primary", True, booked.id in ids(system.get_all_reservations()))
+    with session_scope("reader"):
+        check("another session reads the lagging replica", False, booked.id in ids(system.get_all_reservations()))
+    check("no session reads the lagging replica", False, booked.id in ids(system.get_all_reservations()))
+    time.sleep(replicas.sticky_seconds)
+    with session_scope("writer"):
+        check("writer returns to the replica once the window ends", False,
+              booked.id in ids(system.get_all_reservations()))
+
+    print("\n--- Session keys ---")
+    token = system.set_session_key("writer")
+    current_session.reset(token)
+    check("set_session_key token resets the key", None, current_session.get())
+    with session_scope("writer"):
+        pass
+    check("session_scope resets the key", None, current_session.get())
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(current_session.get()))
+    system.set_session_key("writer")
+    thread.start()
+    thread.join()
+    system.set_session_key(None)
+    check("a new thread starts without a key", [None], seen)
+
+    print("\n--- Fallback ---")
+    replicas.mark_unhealthy(1)
+    check("no healthy replica: reads use the primary", replicas.primary, replicas.for_read())
+    check("primary read sees the booking", True, booked.id in ids(system.get_all_reservations()))
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    try:
+        verify(directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if failures:
+        print(f"\n{len(failures)} replica check(s) failed")
+        sys.exit(1)
+    print("\nAll replica checks passed")